@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the OpenSubtitles hash against the original per-8-byte implementation.
+
+Run with ``python benchmarks/hash_opensubtitles.py``.
+
+"""
+from __future__ import print_function
+import os
+import shutil
+import struct
+import tempfile
+import timeit
+
+from subliminal.utils import hash_opensubtitles
+
+
+def hash_opensubtitles_reference(video_path):
+    """Original implementation reading and unpacking 8 bytes at a time."""
+    bytesize = struct.calcsize(b'<q')
+    with open(video_path, 'rb') as f:
+        filesize = os.path.getsize(video_path)
+        filehash = filesize
+        if filesize < 65536 * 2:
+            return
+        for _ in range(65536 // bytesize):
+            filebuffer = f.read(bytesize)
+            (l_value,) = struct.unpack(b'<q', filebuffer)
+            filehash += l_value
+            filehash &= 0xFFFFFFFFFFFFFFFF  # to remain as 64bit number
+        f.seek(max(0, filesize - 65536), 0)
+        for _ in range(65536 // bytesize):
+            filebuffer = f.read(bytesize)
+            (l_value,) = struct.unpack(b'<q', filebuffer)
+            filehash += l_value
+            filehash &= 0xFFFFFFFFFFFFFFFF
+    returnedhash = '%016x' % filehash
+
+    return returnedhash
+
+
+def main(number=200):
+    directory = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(directory, 'video.mkv')
+        with open(video_path, 'wb') as f:
+            f.write(os.urandom(1024 * 1024))
+
+        assert hash_opensubtitles(video_path) == hash_opensubtitles_reference(video_path)
+
+        for func in (hash_opensubtitles_reference, hash_opensubtitles):
+            duration = timeit.timeit(lambda: func(video_path), number=number)
+            print('%-30s %8.1f us per call' % (func.__name__, duration / number * 1e6))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Memory benchmark of the slotted videos and subtitles against equivalent objects with a per-instance ``__dict__``.
+
+The strings of each object are new copies, as when parsed from a guess or a provider response, so that the interning
+of the repeated values is accounted for.
+
+Run with ``python benchmarks/memory.py`` on Python 3.4+.
+
+"""
+from __future__ import print_function
+import gc
+import tracemalloc
+
+from babelfish import Language
+
+from subliminal.providers.addic7ed import Addic7edSubtitle
+from subliminal.providers.opensubtitles import OpenSubtitlesSubtitle
+from subliminal.video import Episode, Movie
+
+
+class Unslotted(object):
+    """Object with a per-instance ``__dict__``, as the videos and subtitles were."""
+
+
+def copy(string):
+    """Get a new copy of `string`."""
+    return ''.join(list(string))
+
+
+def unslotted(factory):
+    """Wrap `factory` to get an :class:`Unslotted` object with the same attributes as the created object."""
+    def wrapper(i):
+        obj = Unslotted()
+        obj.__dict__.update(factory(i).__getstate__())
+        return obj
+    return wrapper
+
+
+def episode(i):
+    return Episode(copy('/videos/The.Big.Bang.Theory.S07E%02d.720p.HDTV.X264-DIMENSION.mkv' % (i % 24)),
+                   copy('The Big Bang Theory'), 7, i % 24, title=copy('The Workplace Proximity'), year=2007,
+                   format=copy('HDTV'), release_group=copy('DIMENSION'), resolution=copy('720p'),
+                   video_codec=copy('h264'), audio_codec=copy('AC3'), size=1000000 + i,
+                   hashes={'opensubtitles': '%016x' % i})
+
+
+def movie(i):
+    return Movie(copy('/videos/Man.of.Steel.2013.720p.BluRay.x264-Felony.%d.mkv' % i), copy('Man of Steel'),
+                 year=2013, format=copy('BluRay'), release_group=copy('Felony'), resolution=copy('720p'),
+                 video_codec=copy('h264'), audio_codec=copy('DTS'), size=1000000 + i)
+
+
+language = Language('eng')
+
+
+def addic7ed_subtitle(i):
+    return Addic7edSubtitle(language, i % 2 == 0, copy('http://www.addic7ed.com/serie/%d' % i),
+                            copy('The Big Bang Theory'), 7, 5, copy('The Workplace Proximity'), 2007,
+                            copy('DIMENSION'), copy('/updated/1/%d/0' % i))
+
+
+def opensubtitles_subtitle(i):
+    return OpenSubtitlesSubtitle(language, False, copy('http://www.opensubtitles.org/subtitles/%d' % i), str(i),
+                                 copy('moviehash'), copy('movie'), '%016x' % i, copy('Man of Steel'),
+                                 copy('Man.of.Steel.2013.720p.BluRay.x264-Felony'), 2013, 770828, None, None,
+                                 copy('man.of.steel.2013.720p.bluray.x264-felony.srt'), copy('utf-8'))
+
+
+def measure(factory, count):
+    """Measure the memory allocated per object created by `factory`."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        objects = [factory(i) for i in range(count)]
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del objects
+
+    return size / count
+
+
+def main(count=10000):
+    for factory in (episode, movie, addic7ed_subtitle, opensubtitles_subtitle):
+        before = measure(unslotted(factory), count)
+        after = measure(factory, count)
+        change = (after - before) / before * 100
+        print('%-25s %8.0f bytes per object before, %8.0f after (%.0f%%)' % (factory.__name__, before, after, change))
+
+
+if __name__ == '__main__':
+    main()
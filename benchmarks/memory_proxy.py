@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the reads of a cached value with and without the :class:`~subliminal.cache.MemoryProxy`.
+
+The value is a dict of show ids, like the one of Addic7ed read for every episode. The memory spares the reads of the
+backend, but each hit still loads a copy of the pickled value.
+
+Run with ``python benchmarks/memory_proxy.py``.
+
+"""
+from __future__ import print_function
+import os
+import shutil
+import tempfile
+import timeit
+
+from dogpile.cache import make_region
+
+import subliminal.cache  # noqa: F401 (registers the subliminal.sqlite backend)
+from subliminal.cache import MemoryProxy
+
+
+def main(number=1000, count=5000):
+    value = {'show %d' % i: i for i in range(count)}
+    directory = tempfile.mkdtemp()
+    try:
+        for backend in ('subliminal.sqlite', 'dogpile.cache.dbm'):
+            for wrap in ([], [MemoryProxy()]):
+                filename = os.path.join(directory, '%s-%d' % (backend, len(wrap)))
+                region = make_region().configure(backend, wrap=wrap, arguments={'filename': filename})
+                region.set('show_ids', value)
+                assert region.get('show_ids') == value
+
+                duration = timeit.timeit(lambda: region.get('show_ids'), number=number)
+                print('%-20s %-15s %8.1f us per read' % (backend, 'memory' if wrap else 'no memory',
+                                                         duration / number * 1e6))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
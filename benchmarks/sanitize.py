@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the memoized :func:`~subliminal.utils.sanitize` against the original implementation, on the
+scoring of the subtitles of an episode.
+
+Run with ``python benchmarks/sanitize.py``.
+
+"""
+from __future__ import print_function
+import random
+import re
+import timeit
+
+from babelfish import Language
+
+from subliminal.providers import tvsubtitles
+from subliminal.providers.tvsubtitles import TVsubtitlesSubtitle
+from subliminal.score import score_subtitles
+from subliminal.utils import sanitize, sanitize_cache
+from subliminal.video import Episode
+
+
+def sanitize_reference(string, ignore_characters=None):
+    """Original implementation building the patterns on every call."""
+    if string is None:
+        return
+
+    ignore_characters = ignore_characters or set()
+    characters = {'-', ':', '(', ')', '.'} - ignore_characters
+    if characters:
+        string = re.sub(r'[%s]' % re.escape(''.join(characters)), ' ', string)
+    characters = {'\''} - ignore_characters
+    if characters:
+        string = re.sub(r'[%s]' % re.escape(''.join(characters)), '', string)
+    string = re.sub(r'\s+', ' ', string)
+
+    return string.strip().lower()
+
+
+def main(number=20, count=500):
+    video = Episode('Marvels.Agents.of.S.H.I.E.L.D.S03E06.720p.HDTV.x264-KILLERS.mkv',
+                    'Marvel\'s Agents of S.H.I.E.L.D.', 3, 6, year=2013, release_group='KILLERS')
+    rng = random.Random(42)
+
+    # without rip nor release, so that guessit does not dominate the timings
+    series = ['Marvel\'s Agents of S.H.I.E.L.D.', 'Marvels Agents of S.H.I.E.L.D.', 'Agents of S.H.I.E.L.D.',
+              'Marvel\'s Agents of S.H.I.E.L.D. (2013)']
+    subtitles = [TVsubtitlesSubtitle(Language('eng'), None, i, rng.choice(series), 3, rng.choice([5, 6]), None,
+                                     None, None) for i in range(count)]
+
+    for name, func in (('sanitize_reference', sanitize_reference), ('sanitize', sanitize)):
+        tvsubtitles.sanitize = func
+        sanitize_cache.clear()
+        duration = timeit.timeit(lambda: score_subtitles(video, subtitles), number=number)
+        print('%-30s %8.1f ms per %d subtitles' % (name, duration / number * 1e3, count))
+    print('sanitize cache: %d hits, %d misses' % (sanitize_cache.hits, sanitize_cache.misses))
+
+
+if __name__ == '__main__':
+    main()
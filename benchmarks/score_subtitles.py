@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of :func:`~subliminal.score.score_subtitles` against :func:`~subliminal.score.compute_score`.
+
+Run with ``python benchmarks/score_subtitles.py``.
+
+"""
+from __future__ import print_function
+import random
+import timeit
+
+from babelfish import Language
+
+from subliminal.providers.tvsubtitles import TVsubtitlesSubtitle
+from subliminal.score import compute_score, score_subtitles
+from subliminal.video import Episode
+
+
+def main(number=20, count=500):
+    video = Episode('The.Big.Bang.Theory.S07E05.720p.HDTV.X264-DIMENSION.mkv', 'The Big Bang Theory', 7, 5,
+                    title='The Workplace Proximity', year=2007, format='HDTV', release_group='DIMENSION',
+                    resolution='720p', video_codec='h264')
+    rng = random.Random(42)
+
+    # without rip nor release, so that guessit does not dominate the timings
+    subtitles = [TVsubtitlesSubtitle(Language('eng'), None, i,
+                                     rng.choice(['The Big Bang Theory', 'the big BANG theory', 'Big Bang']), 7,
+                                     rng.choice([4, 5]), rng.choice([2007, None]), None, None) for i in range(count)]
+
+    def compute_scores():
+        return [compute_score(s, video, hearing_impaired=True) for s in subtitles]
+
+    assert score_subtitles(video, subtitles, hearing_impaired=True) == compute_scores()
+
+    for name, func in (('compute_score', compute_scores),
+                       ('score_subtitles', lambda: score_subtitles(video, subtitles, hearing_impaired=True))):
+        duration = timeit.timeit(func, number=number)
+        print('%-30s %8.1f ms per %d subtitles' % (name, duration / number * 1e3, count))
+
+
+if __name__ == '__main__':
+    main()
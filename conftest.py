@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+import sys
+
+# asyncio support requires Python 3.5+
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.extend(['subliminal/aio.py', 'tests/test_aio.py'])
@@ -33,6 +33,8 @@ install_requirements = ['guessit>=2.0.1', 'babelfish>=0.5.2', 'enzyme>=0.4.1', '
                         'pytz>=2012c']
 if sys.version_info < (3, 2):
     install_requirements.append('futures>=3.0')
+if sys.version_info < (3, 5):
+    install_requirements.append('scandir>=1.5')
 
 test_requirements = ['sympy', 'vcrpy>=1.6.1', 'pytest', 'pytest-pep8', 'pytest-flakes', 'pytest-cov']
 if sys.version_info < (3, 3):
@@ -96,6 +98,7 @@ setup(name='subliminal',
       install_requires=install_requirements,
       tests_require=test_requirements,
       extras_require={
+          'aio': ['aiohttp>=3.3'],
           'test': test_requirements,
           'dev': dev_requirements
       })
@@ -0,0 +1,660 @@
+# -*- coding: utf-8 -*-
+"""Support for :mod:`asyncio`, requires Python 3.5+.
+
+Non-blocking requests require `aiohttp <https://aiohttp.readthedocs.io>`_, without it all the providers run in a pool
+of threads.
+
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import socket
+import threading
+
+from dogpile.cache.api import NO_VALUE
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .core import ProviderPool, check_video
+from .extensions import provider_manager
+from .providers.napiprojekt import NapiProjektProvider
+from .providers.podnapisi import PodnapisiProvider
+from .providers.shooter import ShooterProvider
+from .providers.thesubdb import TheSubDBProvider
+from .providers.tvsubtitles import TVsubtitlesProvider
+from .subtitle import fix_line_ending
+from .video import Episode, Movie
+
+logger = logging.getLogger(__name__)
+
+
+class Response(object):
+    """Response of :meth:`AsyncProvider.request` with the subset of the :class:`requests.Response` API used by the
+    providers.
+
+    :param str url: url of the response.
+    :param int status_code: HTTP status code.
+    :param bytes content: content of the response.
+    :param str encoding: encoding of the content, if known.
+
+    """
+    def __init__(self, url, status_code, content, encoding=None):
+        #: Url of the response
+        self.url = url
+
+        #: HTTP status code
+        self.status_code = status_code
+
+        #: Content of the response
+        self.content = content
+
+        #: Encoding of the content, if known
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        """Content of the response, decoded"""
+        return self.content.decode(self.encoding or 'utf-8', 'replace')
+
+    def raise_for_status(self):
+        """Raise a :class:`requests.HTTPError` on client and server errors."""
+        if 400 <= self.status_code < 600:
+            raise requests.HTTPError('%d Error for url: %s' % (self.status_code, self.url))
+
+
+class AsyncProvider(object):
+    """Mixin for the optional coroutine interface of a :class:`~subliminal.providers.Provider`.
+
+    The :class:`AsyncioProviderPool` awaits :meth:`async_list_subtitles` and :meth:`async_download_subtitle` of the
+    providers implementing them instead of running the blocking methods in its executor. Requests are made with
+    :meth:`request`, through the session given to :meth:`async_initialize` and with the headers of the
+    :class:`requests.Session` of the provider.
+
+    """
+    #: Session for the non-blocking requests, set by :meth:`async_initialize`
+    async_session = None
+
+    def async_initialize(self, session):
+        """Initialize the coroutine interface, after :meth:`~subliminal.providers.Provider.initialize`.
+
+        :param session: session to use for the requests, owned by the caller.
+        :type session: :class:`aiohttp.ClientSession`
+
+        """
+        self.async_session = session
+
+    async def request(self, method, url, params=None, data=None, timeout=10):
+        """Make a non-blocking request.
+
+        :param str method: HTTP method.
+        :param str url: url to request.
+        :param dict params: query parameters, `None` values are left out.
+        :param dict data: form data.
+        :param int timeout: timeout in seconds.
+        :return: the response.
+        :rtype: :class:`Response`
+
+        """
+        if params is not None:
+            params = {k: v for k, v in params.items() if v is not None}
+        headers = dict(self.session.headers)
+        async with self.async_session.request(method, url, params=params, data=data, headers=headers,
+                                              timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+            return Response(str(r.url), r.status, await r.read(), r.charset)
+
+    async def async_list_subtitles(self, video, languages):
+        """Coroutine version of :meth:`~subliminal.providers.Provider.list_subtitles`."""
+        raise NotImplementedError
+
+    async def async_download_subtitle(self, subtitle):
+        """Coroutine version of :meth:`~subliminal.providers.Provider.download_subtitle`."""
+        raise NotImplementedError
+
+
+class AsyncNapiProjektProvider(AsyncProvider, NapiProjektProvider):
+    """NapiProjekt Provider with the coroutine interface."""
+    async def async_query(self, language, hash):
+        params = self.get_query_params(language, hash)
+        logger.info('Searching subtitle %r', params)
+        r = await self.request('GET', self.server_url, params=params)
+        r.raise_for_status()
+
+        return self.parse_subtitle(r.content, language, hash)
+
+    async def async_list_subtitles(self, video, languages):
+        subtitles = await asyncio.gather(*[self.async_query(l, video.hashes['napiprojekt']) for l in languages])
+        return [s for s in subtitles if s is not None]
+
+    async def async_download_subtitle(self, subtitle):
+        # there is no download step, content is already filled from listing subtitles
+        pass
+
+
+class AsyncPodnapisiProvider(AsyncProvider, PodnapisiProvider):
+    """Podnapisi Provider with the coroutine interface."""
+    async def async_query(self, language, keyword, season=None, episode=None, year=None):
+        params, is_episode = self.get_search_params(language, keyword, season=season, episode=episode, year=year)
+
+        # loop over paginated results
+        logger.info('Searching subtitles %r', params)
+        subtitles = []
+        pids = set()
+        while True:
+            r = await self.request('GET', self.server_url + 'search/old', params=params)
+            r.raise_for_status()
+            page_subtitles, page = self.parse_search_page(r.content, is_episode, pids)
+            subtitles.extend(page_subtitles)
+
+            # stop on last page
+            if page is None:
+                break
+
+            # increment current page
+            params['page'] = page
+            logger.debug('Getting page %d', params['page'])
+
+        return subtitles
+
+    async def async_list_subtitles(self, video, languages):
+        if isinstance(video, Episode):
+            queries = [self.async_query(l, video.series, season=video.season, episode=video.episode, year=video.year)
+                       for l in languages]
+        elif isinstance(video, Movie):
+            queries = [self.async_query(l, video.title, year=video.year) for l in languages]
+        else:
+            return []
+
+        return [s for subtitles in await asyncio.gather(*queries) for s in subtitles]
+
+    async def async_download_subtitle(self, subtitle):
+        logger.info('Downloading subtitle %r', subtitle)
+        r = await self.request('GET', self.server_url + subtitle.pid + '/download', params={'container': 'zip'})
+        r.raise_for_status()
+
+        subtitle.content = self.extract_content(r.content)
+
+
+class AsyncShooterProvider(AsyncProvider, ShooterProvider):
+    """Shooter Provider with the coroutine interface."""
+    async def async_query(self, language, filename, hash=None):
+        params = {'filehash': hash, 'pathinfo': os.path.realpath(filename), 'format': 'json', 'lang': language.shooter}
+        logger.debug('Searching subtitles %r', params)
+        r = await self.request('POST', self.server_url, params=params)
+        r.raise_for_status()
+
+        return self.parse_subtitles(r.content, language, hash)
+
+    async def async_list_subtitles(self, video, languages):
+        queries = [self.async_query(l, video.name, video.hashes.get('shooter')) for l in languages]
+        return [s for subtitles in await asyncio.gather(*queries) for s in subtitles]
+
+    async def async_download_subtitle(self, subtitle):
+        logger.info('Downloading subtitle %r', subtitle)
+        r = await self.request('GET', subtitle.download_link)
+        r.raise_for_status()
+
+        subtitle.content = fix_line_ending(r.content)
+
+
+class AsyncTheSubDBProvider(AsyncProvider, TheSubDBProvider):
+    """TheSubDB Provider with the coroutine interface."""
+    async def async_query(self, hash):
+        params = {'action': 'search', 'hash': hash}
+        logger.info('Searching subtitles %r', params)
+        r = await self.request('GET', self.server_url, params=params)
+
+        # handle subtitles not found and errors
+        if r.status_code == 404:
+            logger.debug('No subtitles found')
+            return []
+        r.raise_for_status()
+
+        return self.parse_subtitles(r.text, hash)
+
+    async def async_list_subtitles(self, video, languages):
+        return [s for s in await self.async_query(video.hashes['thesubdb']) if s.language in languages]
+
+    async def async_download_subtitle(self, subtitle):
+        logger.info('Downloading subtitle %r', subtitle)
+        params = {'action': 'download', 'hash': subtitle.hash, 'language': subtitle.language.alpha2}
+        r = await self.request('GET', self.server_url, params=params)
+        r.raise_for_status()
+
+        subtitle.content = fix_line_ending(r.content)
+
+
+class AsyncTVsubtitlesProvider(AsyncProvider, TVsubtitlesProvider):
+    """TVsubtitles Provider with the coroutine interface.
+
+    The show and episode ids are read from and written to the same cache as the ones of the
+    :class:`~subliminal.providers.tvsubtitles.TVsubtitlesProvider`, and memoized for the life of the provider, so that
+    concurrent lookups of the same show share their requests.
+
+    """
+    def async_initialize(self, session):
+        super(AsyncTVsubtitlesProvider, self).async_initialize(session)
+
+        #: Show id searches by series and year
+        self.show_ids = {}
+
+        #: Episode ids requests by show id and season
+        self.episode_ids = {}
+
+    async def _search_show_id(self, series, year=None):
+        show_id = TVsubtitlesProvider.search_show_id.get_cached(self, series, year)
+        if show_id is not NO_VALUE:
+            return show_id
+
+        logger.info('Searching show id for %r', series)
+        r = await self.request('POST', self.server_url + 'search.php', data={'q': series})
+        r.raise_for_status()
+        show_id = self.parse_show_id(r.content, series, year)
+        TVsubtitlesProvider.search_show_id.set_cached(show_id, self, series, year)
+
+        return show_id
+
+    async def _get_episode_ids(self, show_id, season):
+        episode_ids = TVsubtitlesProvider.get_episode_ids.get_cached(self, show_id, season)
+        if episode_ids is not NO_VALUE:
+            return episode_ids
+
+        logger.info('Getting the page of show id %d, season %d', show_id, season)
+        r = await self.request('GET', self.server_url + 'tvshow-%d-%d.html' % (show_id, season))
+        episode_ids = self.parse_episode_ids(r.content)
+        TVsubtitlesProvider.get_episode_ids.set_cached(episode_ids, self, show_id, season)
+
+        return episode_ids
+
+    async def async_search_show_id(self, series, year=None):
+        """Coroutine version of :meth:`~subliminal.providers.tvsubtitles.TVsubtitlesProvider.search_show_id`."""
+        if (series, year) not in self.show_ids:
+            self.show_ids[series, year] = asyncio.ensure_future(self._search_show_id(series, year))
+
+        return await asyncio.shield(self.show_ids[series, year])
+
+    async def async_get_episode_ids(self, show_id, season):
+        """Coroutine version of :meth:`~subliminal.providers.tvsubtitles.TVsubtitlesProvider.get_episode_ids`."""
+        if (show_id, season) not in self.episode_ids:
+            self.episode_ids[show_id, season] = asyncio.ensure_future(self._get_episode_ids(show_id, season))
+
+        return await asyncio.shield(self.episode_ids[show_id, season])
+
+    async def async_query(self, series, season, episode, year=None):
+        # search the show id
+        show_id = await self.async_search_show_id(series, year)
+        if show_id is None:
+            logger.error('No show id found for %r (%r)', series, {'year': year})
+            return []
+
+        # get the episode ids
+        episode_ids = await self.async_get_episode_ids(show_id, season)
+        if episode not in episode_ids:
+            logger.error('Episode %d not found', episode)
+            return []
+
+        # get the episode page
+        logger.info('Getting the page for episode %d', episode_ids[episode])
+        r = await self.request('GET', self.server_url + 'episode-%d.html' % episode_ids[episode])
+
+        return self.parse_episode(r.content, series, season, episode, year)
+
+    async def async_list_subtitles(self, video, languages):
+        subtitles = await self.async_query(video.series, video.season, video.episode, video.year)
+        return [s for s in subtitles if s.language in languages]
+
+    async def async_download_subtitle(self, subtitle):
+        logger.info('Downloading subtitle %r', subtitle)
+        r = await self.request('GET', self.server_url + 'download-%d.html' % subtitle.subtitle_id)
+        r.raise_for_status()
+
+        subtitle.content = self.extract_content(r.content)
+
+
+#: Providers with the coroutine interface, by name, used in place of the ones of the
+#: :data:`~subliminal.extensions.provider_manager`
+async_providers = {
+    'napiprojekt': AsyncNapiProjektProvider,
+    'podnapisi': AsyncPodnapisiProvider,
+    'shooter': AsyncShooterProvider,
+    'thesubdb': AsyncTheSubDBProvider,
+    'tvsubtitles': AsyncTVsubtitlesProvider
+}
+
+
+class AsyncioProviderPool(ProviderPool):
+    """Subclass of :class:`~subliminal.core.ProviderPool` for :mod:`asyncio`.
+
+    :meth:`list_subtitles_provider`, :meth:`list_subtitles`, :meth:`list_subtitles_videos`, :meth:`download_subtitle`,
+    :meth:`download_best_subtitles` and :meth:`terminate` are coroutines and it supports the `async with` statement.
+
+    Providers implementing the coroutine interface of :class:`AsyncProvider`, including the ones of
+    :data:`async_providers`, make non-blocking requests with a shared :class:`aiohttp.ClientSession`. The other
+    providers, and all of them when aiohttp is not installed, run in a pool of threads with at most
+    :attr:`provider_max_workers` concurrent calls each.
+
+    :param int max_workers: maximum number of threads to use. If `None`, :attr:`max_workers` will be set
+        to the number of :attr:`~subliminal.core.ProviderPool.providers`.
+    :param dict provider_max_workers: maximum number of concurrent calls per provider name running in the threads,
+        1 for unspecified providers.
+    :param int max_concurrency: maximum number of concurrent calls to the providers with the coroutine interface.
+    :param session: session to use for the non-blocking requests, created when needed if aiohttp is installed.
+    :type session: :class:`aiohttp.ClientSession`
+
+    """
+    def __init__(self, max_workers=None, provider_max_workers=None, max_concurrency=100, session=None, *args,
+                 **kwargs):
+        super(AsyncioProviderPool, self).__init__(*args, **kwargs)
+
+        #: Maximum number of threads to use
+        self.max_workers = max_workers or len(self.providers)
+
+        #: Maximum number of concurrent calls per provider name running in the threads
+        self.provider_max_workers = provider_max_workers or {}
+
+        #: Maximum number of concurrent calls to the providers with the coroutine interface
+        self.max_concurrency = max_concurrency
+
+        #: Session for the non-blocking requests
+        self.session = session
+
+        #: Whether the :attr:`session` is owned by the pool
+        self.own_session = False
+
+        #: Executor of the blocking calls, created when needed
+        self.executor = None
+
+        #: Lock for the initialization of the providers
+        self.lock = threading.Lock()
+
+        # semaphores of the concurrent calls, created in the event loop
+        self._semaphore = None
+        self._provider_semaphores = {}
+
+        # initializations of the providers, by name
+        self._initializations = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.terminate()
+
+    def __enter__(self):
+        raise TypeError('Use async with')
+
+    def __getitem__(self, name):
+        if name not in self.providers:
+            raise KeyError
+        with self.lock:
+            if name not in self.initialized_providers:
+                logger.info('Initializing provider %s', name)
+                provider_class = provider_manager[name].plugin
+                if self.session is not None or aiohttp is not None:
+                    provider_class = async_providers.get(name, provider_class)
+                provider = provider_class(**self.provider_configs.get(name, {}))
+                provider.initialize()
+                self.initialized_providers[name] = provider
+
+        return self.initialized_providers[name]
+
+    def get_session(self):
+        """Get the :attr:`session`, creating it if needed.
+
+        :return: the session.
+        :rtype: :class:`aiohttp.ClientSession`
+
+        """
+        if self.session is None:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_concurrency))
+            self.own_session = True
+
+        return self.session
+
+    async def run(self, func, *args):
+        """Run a blocking `func` with `args` in the executor.
+
+        :return: the result of `func`.
+
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.max_workers)
+
+        return await asyncio.get_event_loop().run_in_executor(self.executor, func, *args)
+
+    async def get_provider(self, name):
+        """Get an initialized provider, initializing it in the executor.
+
+        The coroutine interface of the provider is initialized as well, if the provider implements it.
+
+        :param str name: name of the provider.
+        :return: the provider.
+        :rtype: :class:`~subliminal.providers.Provider`
+
+        """
+        async def initialize():
+            provider = await self.run(self.__getitem__, name)
+            if isinstance(provider, AsyncProvider):
+                provider.async_initialize(self.get_session())
+            return provider
+
+        if name not in self._initializations:
+            self._initializations[name] = asyncio.ensure_future(initialize())
+
+        return await asyncio.shield(self._initializations[name])
+
+    def limit(self, name):
+        """Get the semaphore limiting the concurrent calls to an initialized provider.
+
+        :param str name: name of the provider.
+        :return: the semaphore.
+        :rtype: :class:`asyncio.Semaphore`
+
+        """
+        if isinstance(self.initialized_providers[name], AsyncProvider):
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            return self._semaphore
+
+        if name not in self._provider_semaphores:
+            self._provider_semaphores[name] = asyncio.Semaphore(self.provider_max_workers.get(name, 1))
+        return self._provider_semaphores[name]
+
+    async def list_subtitles_provider(self, provider, video, languages):
+        provider_languages = self._get_provider_languages(provider, video, languages)
+        if not provider_languages:
+            return []
+
+        # list subtitles
+        logger.info('Listing subtitles with provider %r and languages %r', provider, provider_languages)
+        try:
+            instance = await self.get_provider(provider)
+            async with self.limit(provider):
+                if isinstance(instance, AsyncProvider):
+                    return await instance.async_list_subtitles(video, provider_languages)
+                return await self.run(instance.list_subtitles, video, provider_languages)
+        except asyncio.CancelledError:
+            raise
+        except (requests.Timeout, socket.timeout, asyncio.TimeoutError):
+            logger.error('Provider %r timed out', provider)
+        except Exception:
+            logger.exception('Unexpected error in provider %r', provider)
+
+    async def list_subtitles(self, video, languages):
+        names = [n for n in self._get_providers() if n not in self.discarded_providers]
+        tasks = [asyncio.ensure_future(self.list_subtitles_provider(n, video, languages)) for n in names]
+        try:
+            # stop on hash matches, cancelling the remaining providers
+            if self.stop_on_hash_match:
+                hash_languages = set()
+                pending = {t for n, t in zip(names, tasks) if provider_manager[n].plugin.hash_match}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        hash_languages |= self._get_hash_matched_languages(task.result() or [], video)
+                    if languages <= hash_languages:
+                        logger.info('Matched by hash in all languages, cancelling the remaining providers')
+                        for task in tasks:
+                            task.cancel()
+                        break
+
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        subtitles = []
+        for name, task in zip(names, tasks):
+            if task.cancelled():
+                continue
+            provider_subtitles = task.result()
+
+            # discard provider that failed
+            if provider_subtitles is None:
+                logger.info('Discarding provider %s', name)
+                self.discarded_providers.add(name)
+                continue
+
+            # add subtitles
+            subtitles.extend(provider_subtitles)
+
+        return subtitles
+
+    async def list_subtitles_videos(self, videos, languages):
+        """List subtitles for many videos concurrently.
+
+        For each video, the `languages` already in its :attr:`~subliminal.video.Video.subtitle_languages` are not
+        searched for.
+
+        :param videos: videos to list subtitles for.
+        :type videos: iterable of :class:`~subliminal.video.Video`
+        :param languages: languages to search for.
+        :type languages: set of :class:`~babelfish.language.Language`
+        :return: the videos with their found subtitles.
+        :rtype: list of tuple(:class:`~subliminal.video.Video`, list of :class:`~subliminal.subtitle.Subtitle`)
+
+        """
+        videos = list(videos)
+        results = await asyncio.gather(*[self.list_subtitles(v, languages - v.subtitle_languages) for v in videos])
+
+        return list(zip(videos, results))
+
+    async def download_subtitle(self, subtitle):
+        # check discarded providers
+        if subtitle.provider_name in self.discarded_providers:
+            logger.warning('Provider %r is discarded', subtitle.provider_name)
+            return False
+
+        logger.info('Downloading subtitle %r', subtitle)
+        try:
+            instance = await self.get_provider(subtitle.provider_name)
+            async with self.limit(subtitle.provider_name):
+                if isinstance(instance, AsyncProvider):
+                    await instance.async_download_subtitle(subtitle)
+                else:
+                    await self.run(instance.download_subtitle, subtitle)
+        except (requests.Timeout, socket.timeout, asyncio.TimeoutError):
+            logger.error('Provider %r timed out, discarding it', subtitle.provider_name)
+            self.discarded_providers.add(subtitle.provider_name)
+            return False
+        except Exception:
+            logger.exception('Unexpected error in provider %r, discarding it', subtitle.provider_name)
+            self.discarded_providers.add(subtitle.provider_name)
+            return False
+
+        # check subtitle validity
+        if not subtitle.is_valid():
+            logger.error('Invalid subtitle')
+            return False
+
+        return True
+
+    async def download_best_subtitles(self, subtitles, video, languages, min_score=0, hearing_impaired=False,
+                                      only_one=False, compute_score=None):
+        # sort subtitles by score
+        scored_subtitles = self._sort_subtitles(subtitles, video, hearing_impaired, compute_score)
+
+        # download best subtitles, falling back on the next on error
+        downloaded_subtitles = []
+        for subtitle, score in scored_subtitles:
+            # check score
+            if score < min_score:
+                logger.info('Score %d is below min_score (%d)', score, min_score)
+                break
+
+            # check downloaded languages
+            if subtitle.language in set(s.language for s in downloaded_subtitles):
+                logger.debug('Skipping subtitle: %r already downloaded', subtitle.language)
+                continue
+
+            # download
+            if await self.download_subtitle(subtitle):
+                downloaded_subtitles.append(subtitle)
+
+            # stop when all languages are downloaded
+            if set(s.language for s in downloaded_subtitles) == languages:
+                logger.debug('All languages downloaded')
+                break
+
+            # stop if only one subtitle is requested
+            if only_one:
+                logger.debug('Only one subtitle downloaded')
+                break
+
+        return downloaded_subtitles
+
+    async def terminate(self):
+        """Terminate all the :attr:`~subliminal.core.ProviderPool.initialized_providers` and close the
+        :attr:`session` if owned."""
+        if self.executor is not None:
+            await self.run(super(AsyncioProviderPool, self).terminate)
+            self.executor.shutdown()
+            self.executor = None
+        else:
+            super(AsyncioProviderPool, self).terminate()
+        self._initializations.clear()
+
+        if self.own_session:
+            await self.session.close()
+            self.session = None
+            self.own_session = False
+
+
+async def download_best_subtitles(videos, languages, min_score=0, hearing_impaired=False, only_one=False,
+                                  compute_score=None, **kwargs):
+    """Coroutine version of :func:`~subliminal.core.download_best_subtitles` with an :class:`AsyncioProviderPool`.
+
+    The subtitles of all the `videos` are listed and downloaded concurrently.
+
+    :param \\*\\*kwargs: additional parameters for the :class:`AsyncioProviderPool` constructor.
+    :return: downloaded subtitles per video.
+    :rtype: dict of :class:`~subliminal.video.Video` to list of :class:`~subliminal.subtitle.Subtitle`
+
+    """
+    # check videos
+    checked_videos = []
+    for video in videos:
+        if not check_video(video, languages=languages, undefined=only_one):
+            logger.info('Skipping video %r', video)
+            continue
+        checked_videos.append(video)
+
+    async def download(pool, video):
+        logger.info('Downloading best subtitles for %r', video)
+        subtitles = await pool.list_subtitles(video, languages - video.subtitle_languages)
+        subtitles = await pool.download_best_subtitles(subtitles, video, languages, min_score=min_score,
+                                                       hearing_impaired=hearing_impaired, only_one=only_one,
+                                                       compute_score=compute_score)
+        logger.info('Downloaded %d subtitle(s) for %r', len(subtitles), video)
+        return subtitles
+
+    # download best subtitles
+    async with AsyncioProviderPool(**kwargs) as pool:
+        results = await asyncio.gather(*[download(pool, v) for v in checked_videos])
+
+    return dict(zip(checked_videos, results))
@@ -1,7 +1,28 @@
 # -*- coding: utf-8 -*-
 import datetime
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
 
-from dogpile.cache import make_region
+from dogpile.cache import make_region, register_backend
+from dogpile.cache.api import NO_VALUE, CacheBackend
+from dogpile.cache.proxy import ProxyBackend
+import six
+from six.moves import cPickle as pickle
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .utils import LRUCache
+
+logger = logging.getLogger(__name__)
 
 #: Expiration time for show caching
 SHOW_EXPIRATION_TIME = datetime.timedelta(weeks=3).total_seconds()
@@ -12,5 +33,601 @@ EPISODE_EXPIRATION_TIME = datetime.timedelta(days=3).total_seconds()
 #: Expiration time for scraper searches
 REFINER_EXPIRATION_TIME = datetime.timedelta(weeks=1).total_seconds()
 
+#: Expiration time for the misses of the lookups cached with :func:`cache_on_arguments`
+MISS_EXPIRATION_TIME = datetime.timedelta(days=1).total_seconds()
+
+#: Maximum total size of the files of the :data:`file_store`, in bytes
+FILE_STORE_MAX_SIZE = 200 * 1024 * 1024
+
+
+#: Expiration times of the lookups served stale while refreshed in the background, see :func:`cache_on_arguments`
+stale_expiration_times = set()
+
+# state of the lookups of the current thread
+_lookups = threading.local()
+
+
+class AsyncCreationRunner(object):
+    """Refresh expired values in background threads, the stale values being returned meanwhile.
+
+    This is the `async_creation_runner` of the :data:`region`. It is only true within the lookups of
+    :func:`cache_on_arguments` whose expiration time is in :data:`stale_expiration_times`: elsewhere, dogpile.cache
+    finds no runner and creates the expired values before returning them.
+
+    The threads of the refreshes still running are kept, so that they can be waited for with :meth:`join`.
+
+    """
+    def __init__(self):
+        #: Threads of the refreshes still running
+        self.threads = set()
+
+        #: Lock for the :attr:`threads`
+        self.lock = threading.Lock()
+
+    def __bool__(self):
+        return getattr(_lookups, 'stale', False)
+
+    __nonzero__ = __bool__
+
+    def __call__(self, cache, key, creator, mutex):
+        def refresh():
+            try:
+                cache.set(key, creator())
+            except Exception:
+                logger.exception('Failed to refresh %r in the background', key)
+            finally:
+                mutex.release()
+                with self.lock:
+                    self.threads.discard(thread)
+
+        logger.debug('Refreshing %r in the background', key)
+        thread = threading.Thread(target=refresh, name='refresh-%s' % key)
+        thread.daemon = True
+        with self.lock:
+            self.threads.add(thread)
+        thread.start()
+
+    def join(self, timeout=None):
+        """Wait for the refreshes running in the background to complete.
+
+        :param int timeout: maximum time to wait for each refresh, in seconds. If `None`, wait until completed.
+
+        """
+        with self.lock:
+            threads = list(self.threads)
+        for thread in threads:
+            thread.join(timeout)
+
+
+#: The :class:`AsyncCreationRunner` of the :data:`region`
+async_creation_runner = AsyncCreationRunner()
+
+region = make_region(async_creation_runner=async_creation_runner)
+
+
+class Miss(object):
+    """A cached miss of a lookup, see :func:`cache_on_arguments`.
+
+    :param value: the value returned by the lookup.
+
+    """
+    def __init__(self, value):
+        #: Value returned by the lookup
+        self.value = value
+
+        #: Time of the lookup
+        self.created = time.time()
+
+    def is_expired(self, expiration_time):
+        """Whether the miss is older than `expiration_time`, in seconds."""
+        return time.time() - self.created > expiration_time
+
+    def __repr__(self):
+        return '<%s [%r]>' % (self.__class__.__name__, self.value)
+
+
+def is_miss(value):
+    """Default policy of :func:`cache_on_arguments`: empty values, like `None` or an empty `dict`, are misses."""
+    return not value
+
+
+def cache_on_arguments(expiration_time, miss_expiration_time=MISS_EXPIRATION_TIME, is_miss=is_miss):
+    """Decorator caching the results of a lookup in the :data:`region`, with a shorter expiration time for the misses.
+
+    The misses are cached as :class:`Miss`, with the same keys as ``region.cache_on_arguments``, and looked up again
+    once older than `miss_expiration_time`. The errors raised by the lookup are not cached.
+
+    If `expiration_time` is in :data:`stale_expiration_times`, the expired results are returned while refreshed in the
+    background, see :class:`AsyncCreationRunner`.
+
+    The decorated function also has a ``get_cached`` function, returning the cached result for the arguments or
+    ``NO_VALUE``, and a ``set_cached`` function, caching a result given first with the arguments. They give access to
+    the same cache to the coroutines making the lookup on their own.
+
+    :param int expiration_time: expiration time of the results, in seconds.
+    :param int miss_expiration_time: expiration time of the misses, in seconds.
+    :param is_miss: function that takes a result and returns whether it is a miss.
+    :return: the decorator.
+
+    """
+    def decorator(fn):
+        def create(*args, **kwargs):
+            value = fn(*args, **kwargs)
+            if is_miss(value):
+                logger.debug('Caching miss of %s for %d seconds', fn.__name__, miss_expiration_time)
+                return Miss(value)
+
+            return value
+
+        # the keys are generated from the arguments of the lookup
+        def function_key_generator(namespace, _, **kwargs):
+            return region.function_key_generator(namespace, fn, **kwargs)
+
+        cache_region = region
+        key_generator = cache_region.function_key_generator(None, fn)
+        cached = cache_region.cache_on_arguments(expiration_time=expiration_time,
+                                                 function_key_generator=function_key_generator)(create)
+
+        @functools.wraps(fn)
+        def lookup(*args, **kwargs):
+            # let the async creation runner know whether the value can be stale
+            stale = getattr(_lookups, 'stale', False)
+            _lookups.stale = expiration_time in stale_expiration_times
+            try:
+                value = cached(*args, **kwargs)
+            finally:
+                _lookups.stale = stale
+            if isinstance(value, Miss) and value.is_expired(miss_expiration_time):
+                value = cached.refresh(*args, **kwargs)
+            if isinstance(value, Miss):
+                return value.value
+
+            return value
+
+        def get_cached(*args, **kwargs):
+            value = cache_region.get(key_generator(*args, **kwargs), expiration_time=expiration_time)
+            if isinstance(value, Miss):
+                if value.is_expired(miss_expiration_time):
+                    return NO_VALUE
+                return value.value
+
+            return value
+
+        def set_cached(value, *args, **kwargs):
+            cache_region.set(key_generator(*args, **kwargs), Miss(value) if is_miss(value) else value)
+
+        lookup.invalidate = cached.invalidate
+        lookup.get_cached = get_cached
+        lookup.set_cached = set_cached
+
+        return lookup
+
+    return decorator
+
+
+def is_cached(value):
+    """Whether a `value` returned by a backend is in the cache."""
+    return value is not NO_VALUE and value is not None
+
+
+class MemoryProxy(ProxyBackend):
+    """A dogpile.cache proxy keeping the values of its backend in an in-process :class:`~subliminal.utils.LRUCache`.
+
+    The values read are kept in memory, sparing the reads of the backend. The values written and deleted go through to
+    the backend. The values keep the creation time given by the region, so they expire with the expiration time of the
+    region and of each of its functions.
+
+    The values are kept pickled, as the serializing backends return them, so that each hit loads a new copy that the
+    caller can change without changing the cached value: only the reads of the backend are spared, not the loading.
+
+    The `ttl` bounds the time a value changed in the backend by another process can stay unseen.
+
+    :param int maxsize: maximum number of values in memory.
+    :param int ttl: time to live of the values in memory, in seconds. If `None`, they are kept until evicted.
+
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        super(MemoryProxy, self).__init__()
+
+        #: Values in memory
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def hits(self):
+        """Number of values found in memory"""
+        return self.memory.hits
+
+    @property
+    def misses(self):
+        """Number of values read from the backend"""
+        return self.memory.misses
+
+    def get(self, key):
+        def load():
+            value = self.proxied.get(key)
+            return pickle.dumps(value, pickle.HIGHEST_PROTOCOL) if is_cached(value) else value
+
+        value = self.memory.get(key, load, should_cache_fn=is_cached)
+
+        return pickle.loads(value) if is_cached(value) else value
+
+    def get_multi(self, keys):
+        return [self.get(key) for key in keys]
+
+    def get_serialized(self, key):
+        return self.memory.get(key, lambda: self.proxied.get_serialized(key), should_cache_fn=is_cached)
+
+    def get_serialized_multi(self, keys):
+        return [self.get_serialized(key) for key in keys]
+
+    def set(self, key, value):
+        self.proxied.set(key, value)
+        self.memory.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def set_multi(self, mapping):
+        self.proxied.set_multi(mapping)
+        for key, value in mapping.items():
+            self.memory.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def set_serialized(self, key, value):
+        self.proxied.set_serialized(key, value)
+        self.memory.set(key, value)
+
+    def set_serialized_multi(self, mapping):
+        self.proxied.set_serialized_multi(mapping)
+        for key, value in mapping.items():
+            self.memory.set(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        self.proxied.delete(key)
+
+    def delete_multi(self, keys):
+        for key in keys:
+            self.memory.delete(key)
+        self.proxied.delete_multi(keys)
+
+    def __repr__(self):
+        return '<%s [hits=%d, misses=%d, size=%d]>' % (self.__class__.__name__, self.hits, self.misses,
+                                                       len(self.memory))
+
+
+class FileStore(object):
+    """Store of files in a directory, bounded in size by evicting the least recently used files first.
+
+    The files are named after the SHA-1 of their key and written to a temporary file renamed once complete, so that a
+    file is never read partially written, even by another process. Getting a file marks it as used by updating its
+    modification time, used to pick the files to evict.
+
+    A file can be evicted at any time by another thread or process, so its path is only valid until then: a file is
+    read with :meth:`read` or through the file object of :meth:`open`, which keeps reading the file once evicted. On
+    Windows, the files held open cannot be evicted, and are only evicted once closed.
+
+    The store is disabled, nothing being stored, until it has a `directory`, see :meth:`configure`.
+
+    :param str directory: directory of the files.
+    :param int max_size: maximum total size of the files, in bytes.
+
+    """
+    def __init__(self, directory=None, max_size=FILE_STORE_MAX_SIZE):
+        #: Directory of the files
+        self.directory = directory
+
+        #: Maximum total size of the files, in bytes
+        self.max_size = max_size
+
+        #: Lock for the eviction
+        self.lock = threading.Lock()
+
+    def configure(self, directory, max_size=None):
+        """Configure the store, creating its `directory` if needed.
+
+        The parameters are the same as the ones of the constructor, `None` keeping the current value of `max_size`.
+
+        """
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+
+        self.directory = directory
+        if max_size is not None:
+            self.max_size = max_size
+
+    def get_path(self, key):
+        """Get the path of the file of `key`, whether stored or not.
+
+        :param str key: key of the file.
+        :return: the path.
+        :rtype: str
+
+        """
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        """Get the path of the file of `key`, marking it as used.
+
+        :param str key: key of the file.
+        :return: the path of the file, or `None` if not stored.
+        :rtype: str
+
+        """
+        if self.directory is None:
+            return None
+
+        path = self.get_path(key)
+        try:
+            os.utime(path, None)
+        except OSError:
+            return None
+
+        return path
+
+    def open(self, key):
+        """Open the file of `key` for reading, marking it as used.
+
+        The returned file object keeps reading the file if evicted meanwhile, and must be closed by the caller.
+
+        :param str key: key of the file.
+        :return: the file object, or `None` if not stored.
+        :rtype: file
+
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+
+        try:
+            return open(path, 'rb')
+        except (IOError, OSError):
+            return None
+
+    def read(self, key):
+        """Read the content of the file of `key` at once, marking it as used.
+
+        :param str key: key of the file.
+        :return: the content of the file, or `None` if not stored.
+        :rtype: bytes
+
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def set(self, key, content):
+        """Store the `content` as the file of `key`, evicting the least recently used files if needed.
+
+        :param str key: key of the file.
+        :param bytes content: content of the file.
+        :return: the path of the file, or `None` if the store is disabled.
+        :rtype: str
+
+        """
+        if self.directory is None:
+            return None
+
+        # write to a hidden temporary file, ignored by the eviction, and rename it once complete
+        path = self.get_path(key)
+        fd, temp_path = tempfile.mkstemp(prefix='.', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            getattr(os, 'replace', os.rename)(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        self.evict(keep=path)
+
+        return path
+
+    def delete(self, key):
+        """Delete the file of `key`, if stored.
+
+        :param str key: key of the file.
+
+        """
+        if self.directory is None:
+            return
+
+        try:
+            os.remove(self.get_path(key))
+        except OSError:
+            pass
+
+    def evict(self, keep=None):
+        """Delete the least recently used files until their total size is within :attr:`max_size`.
+
+        :param str keep: path of a file not to delete.
+
+        """
+        with self.lock:
+            files = []
+            for name in os.listdir(self.directory):
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            size = sum(file_size for _, file_size, _ in files)
+            for _, file_size, path in sorted(files):
+                if size <= self.max_size:
+                    break
+                if path == keep:
+                    continue
+
+                # files still open may fail to be deleted, e.g. on Windows
+                try:
+                    os.remove(path)
+                except OSError:
+                    logger.debug('Failed to evict %s', path)
+                    continue
+                logger.debug('Evicted %s', path)
+                size -= file_size
+
+
+#: The :class:`FileStore` of the providers downloading large files, like archives of subtitles
+file_store = FileStore()
+
+
+class FileMutex(object):
+    """Mutex on a byte of a lock file, exclusive across the processes and the threads of each process.
+
+    The byte-range locks of the file are held by the process, so a lock per byte also excludes the threads of the
+    process. Without :mod:`fcntl`, e.g. on Windows, only the threads are excluded.
+
+    :param int fd: file descriptor of the lock file.
+    :param int offset: offset of the byte to lock.
+    :param thread_lock: lock of the byte for the threads of the process.
+    :type thread_lock: :class:`threading.Lock`
+
+    """
+    def __init__(self, fd, offset, thread_lock):
+        #: File descriptor of the lock file
+        self.fd = fd
+
+        #: Offset of the byte to lock
+        self.offset = offset
+
+        #: Lock for the threads of the process
+        self.thread_lock = thread_lock
+
+    def acquire(self, wait=True):
+        if not self.thread_lock.acquire(wait):
+            return False
+
+        if fcntl is not None:
+            try:
+                fcntl.lockf(self.fd, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self.offset)
+            except (IOError, OSError):
+                self.thread_lock.release()
+                if wait:
+                    raise
+                return False
+
+        return True
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, self.offset)
+        self.thread_lock.release()
+
+    def locked(self):
+        return self.thread_lock.locked()
+
+
+class SQLiteBackend(CacheBackend):
+    """A dogpile.cache backend storing the values in a SQLite database, safe to share between processes.
+
+    The database is in WAL mode, so that the readers do not block the writer and concurrent readers do not block each
+    other. Each thread of each process has its own connection. The creation of the values is guarded by
+    :class:`FileMutex` locks on a lock file next to the database, so that a value missing in several processes is
+    created only once.
+
+    It is registered as ``subliminal.sqlite``. The `arguments` are:
+
+        * ``filename``: path to the database file.
+        * ``timeout``: timeout to wait for the locks of the database, in seconds, defaults to 30.
+        * ``lock_slots``: number of locks shared by the keys, defaults to 1024.
+
+    """
+    def __init__(self, arguments):
+        #: Path to the database file
+        self.filename = os.path.abspath(arguments['filename'])
+
+        #: Timeout to wait for the locks of the database
+        self.timeout = arguments.get('timeout', 30)
+
+        #: Number of locks shared by the keys
+        self.lock_slots = arguments.get('lock_slots', 1024)
+
+        #: Path to the lock file
+        self.lock_filename = self.filename + '.lock'
+
+        # connections by thread, locks and lock file of the process
+        self._local = threading.local()
+        self._pid = None
+        self._thread_locks = None
+        self._lock_fd = None
+        self._init_lock = threading.Lock()
+
+        # create the database
+        connection = self._get_connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB)')
+
+    def _get_connection(self):
+        """Get the connection of the current thread, creating it if needed, also after a fork."""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = sqlite3.connect(self.filename, timeout=self.timeout, isolation_level=None)
+            self._local.connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.pid = os.getpid()
+
+        return self._local.connection
+
+    def get_mutex(self, key):
+        with self._init_lock:
+            # open the lock file once per process
+            if self._pid != os.getpid():
+                self._thread_locks = [threading.Lock() for _ in range(self.lock_slots)]
+                self._lock_fd = os.open(self.lock_filename, os.O_RDWR | os.O_CREAT, 0o644)
+                self._pid = os.getpid()
+
+        # keys are spread over the slots with a hash that is the same in all the processes
+        if isinstance(key, six.text_type):
+            key = key.encode('utf-8')
+        slot = zlib.crc32(key) % self.lock_slots
+
+        return FileMutex(self._lock_fd, slot, self._thread_locks[slot])
+
+    def get(self, key):
+        row = self._get_connection().execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return NO_VALUE
+
+        try:
+            return pickle.loads(bytes(row[0]))
+        except Exception:
+            logger.exception('Failed to load the cached value of %r', key)
+            return NO_VALUE
+
+    def get_multi(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value):
+        self.set_multi({key: value})
+
+    def set_multi(self, mapping):
+        rows = [(k, sqlite3.Binary(pickle.dumps(v, protocol=2))) for k, v in mapping.items()]
+        self._execute_many('INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)', rows)
+
+    def delete(self, key):
+        self.delete_multi([key])
+
+    def delete_multi(self, keys):
+        self._execute_many('DELETE FROM cache WHERE key = ?', [(k,) for k in keys])
+
+    def _execute_many(self, sql, rows):
+        """Execute a statement for all the `rows` in a single write transaction."""
+        connection = self._get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(sql, rows)
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
 
-region = make_region()
+register_backend('subliminal.sqlite', 'subliminal.cache', 'SQLiteBackend')
@@ -20,8 +20,14 @@ from dogpile.util.readwrite_lock import ReadWriteMutex
 from six.moves import configparser
 
 from subliminal import (AsyncProviderPool, Episode, Movie, Video, __version__, check_video, compute_score, get_scores,
-                        provider_manager, refine, refiner_manager, region, save_subtitles, scan_video, scan_videos)
+                        iter_videos, provider_manager, refine, refiner_manager, region, save_subtitles, scan_video)
+from subliminal.cache import (EPISODE_EXPIRATION_TIME, FILE_STORE_MAX_SIZE, REFINER_EXPIRATION_TIME,
+                              SHOW_EXPIRATION_TIME, MemoryProxy, async_creation_runner, file_store,
+                              stale_expiration_times)
 from subliminal.core import ARCHIVE_EXTENSIONS, search_external_subtitles
+from subliminal.index import DirectoryIndex, ScanIndex
+from subliminal.transport import session_factory
+from subliminal.utils import iter_buffered
 
 logger = logging.getLogger(__name__)
 
@@ -210,7 +216,12 @@ REFINER = click.Choice(sorted(refiner_manager.names()))
 
 dirs = AppDirs('subliminal')
 cache_file = 'subliminal.dbm'
+sqlite_cache_file = 'subliminal.sqlite'
+index_file = 'index.db'
 config_file = 'config.ini'
+file_store_dir = 'files'
+expiration_times = {'show': SHOW_EXPIRATION_TIME, 'episode': EPISODE_EXPIRATION_TIME,
+                    'refiner': REFINER_EXPIRATION_TIME}
 
 
 @click.group(context_settings={'max_content_width': 100}, epilog='Suggestions and bug reports are greatly appreciated: '
@@ -222,10 +233,24 @@ config_file = 'config.ini'
 @click.option('--subscenter', type=click.STRING, nargs=2, metavar='USERNAME PASSWORD', help='SubsCenter configuration.')
 @click.option('--cache-dir', type=click.Path(writable=True, file_okay=False), default=dirs.user_cache_dir,
               show_default=True, expose_value=True, help='Path to the cache directory.')
+@click.option('--cache-backend', type=click.Choice(['dbm', 'sqlite']), default='dbm', show_default=True,
+              help='Backend of the cache, sqlite is safe to share between concurrent processes.')
+@click.option('--memory-cache-size', type=click.IntRange(0), default=1024, show_default=True, help='Maximum number of '
+              'cached values to also keep in memory, 0 to disable.')
+@click.option('--memory-cache-ttl', type=click.IntRange(1), default=3600, show_default=True, help='Time to live of '
+              'the cached values kept in memory, in seconds.')
+@click.option('--file-cache-size', type=click.IntRange(0), default=FILE_STORE_MAX_SIZE // (1024 * 1024),
+              show_default=True, help='Maximum size of the cached files, like the archives of subtitles, in MiB, 0 to '
+              'disable.')
+@click.option('--max-connections', type=click.IntRange(1), default=10, show_default=True, help='Maximum number of '
+              'connections to keep open per host.')
+@click.option('--refresh-in-background', type=click.Choice(sorted(expiration_times)), multiple=True, help='Kind of '
+              'cached lookups to use while refreshed in the background once expired (can be used multiple times).')
 @click.option('--debug', is_flag=True, help='Print useful information for debugging subliminal and for reporting bugs.')
 @click.version_option(__version__)
 @click.pass_context
-def subliminal(ctx, addic7ed, legendastv, opensubtitles, subscenter, cache_dir, debug):
+def subliminal(ctx, addic7ed, legendastv, opensubtitles, subscenter, cache_dir, cache_backend, memory_cache_size,
+               memory_cache_ttl, file_cache_size, max_connections, refresh_in_background, debug):
     """Subtitles, faster than your thoughts."""
     # create cache directory
     try:
@@ -235,8 +260,25 @@ def subliminal(ctx, addic7ed, legendastv, opensubtitles, subscenter, cache_dir,
             raise
 
     # configure cache
-    region.configure('dogpile.cache.dbm', expiration_time=timedelta(days=30),
-                     arguments={'filename': os.path.join(cache_dir, cache_file), 'lock_factory': MutexLock})
+    stale_expiration_times.update(expiration_times[k] for k in refresh_in_background)
+    if refresh_in_background:
+        ctx.call_on_close(async_creation_runner.join)
+    wrap = []
+    if memory_cache_size:
+        memory_proxy = MemoryProxy(maxsize=memory_cache_size, ttl=memory_cache_ttl)
+        ctx.call_on_close(lambda: logger.debug('Memory cache %r', memory_proxy))
+        wrap.append(memory_proxy)
+    if cache_backend == 'sqlite':
+        region.configure('subliminal.sqlite', expiration_time=timedelta(days=30), wrap=wrap,
+                         arguments={'filename': os.path.join(cache_dir, sqlite_cache_file)})
+    else:
+        region.configure('dogpile.cache.dbm', expiration_time=timedelta(days=30), wrap=wrap,
+                         arguments={'filename': os.path.join(cache_dir, cache_file), 'lock_factory': MutexLock})
+    if file_cache_size:
+        file_store.configure(os.path.join(cache_dir, file_store_dir), max_size=file_cache_size * 1024 * 1024)
+
+    # configure the connections
+    session_factory.configure(pool_maxsize=max_connections)
 
     # configure logging
     if debug:
@@ -245,8 +287,12 @@ def subliminal(ctx, addic7ed, legendastv, opensubtitles, subscenter, cache_dir,
         logging.getLogger('subliminal').addHandler(handler)
         logging.getLogger('subliminal').setLevel(logging.DEBUG)
 
+    # scan index
+    index = ScanIndex(os.path.join(cache_dir, index_file))
+    ctx.call_on_close(index.close)
+
     # provider configs
-    ctx.obj = {'provider_configs': {}}
+    ctx.obj = {'provider_configs': {}, 'index': index}
     if addic7ed:
         ctx.obj['provider_configs']['addic7ed'] = {'username': addic7ed[0], 'password': addic7ed[1]}
     if legendastv:
@@ -260,14 +306,25 @@ def subliminal(ctx, addic7ed, legendastv, opensubtitles, subscenter, cache_dir,
 @subliminal.command()
 @click.option('--clear-subliminal', is_flag=True, help='Clear subliminal\'s cache. Use this ONLY if your cache is '
               'corrupted or if you experience issues.')
+@click.option('--clear-index', is_flag=True, help='Clear the scan index so that all videos are scanned again.')
+@click.option('--prune-index', is_flag=True, help='Remove deleted or modified videos from the scan index.')
 @click.pass_context
-def cache(ctx, clear_subliminal):
+def cache(ctx, clear_subliminal, clear_index, prune_index):
     """Cache management."""
     if clear_subliminal:
-        for file in glob.glob(os.path.join(ctx.parent.params['cache_dir'], cache_file) + '*'):
+        for filename in (cache_file, sqlite_cache_file):
+            for file in glob.glob(os.path.join(ctx.parent.params['cache_dir'], filename) + '*'):
+                os.remove(file)
+        for file in glob.glob(os.path.join(ctx.parent.params['cache_dir'], file_store_dir, '*')):
             os.remove(file)
         click.echo('Subliminal\'s cache cleared.')
-    else:
+    if clear_index:
+        ctx.obj['index'].clear()
+        click.echo('Scan index cleared.')
+    if prune_index:
+        pruned = ctx.obj['index'].prune()
+        click.echo('%d video%s pruned from the scan index.' % (pruned, 's' if pruned > 1 else ''))
+    if not (clear_subliminal or clear_index or prune_index):
         click.echo('Nothing done.')
 
 
@@ -288,13 +345,21 @@ def cache(ctx, clear_subliminal):
 @click.option('-m', '--min-score', type=click.IntRange(0, 100), default=0, help='Minimum score for a subtitle '
               'to be downloaded (0 to 100).')
 @click.option('-w', '--max-workers', type=click.IntRange(1, 50), default=None, help='Maximum number of threads to use.')
+@click.option('--queue-size', type=click.IntRange(1), default=10, show_default=True, help='Maximum number of collected '
+              'videos waiting for their subtitles to be downloaded.')
+@click.option('--speculative-downloads', type=click.IntRange(1), default=None, metavar='N', help='Download the N best '
+              'subtitles of each language concurrently, default is to download them one at a time.')
+@click.option('--stop-on-hash-match', is_flag=True, default=False, help='Query the providers that can match by hash '
+              'first and stop searching a video once matched by hash in all languages.')
+@click.option('--batch-size', type=click.IntRange(1), default=None, metavar='N', help='Search N videos at once with '
+              'the providers supporting it, default is to search them one by one.')
 @click.option('-z/-Z', '--archives/--no-archives', default=True, show_default=True, help='Scan archives for videos '
               '(supported extensions: %s).' % ', '.join(ARCHIVE_EXTENSIONS))
 @click.option('-v', '--verbose', count=True, help='Increase verbosity.')
 @click.argument('path', type=click.Path(), required=True, nargs=-1)
 @click.pass_obj
 def download(obj, provider, refiner, language, age, directory, encoding, single, force, hearing_impaired, min_score,
-             max_workers, archives, verbose, path):
+             max_workers, queue_size, speculative_downloads, stop_on_hash_match, batch_size, archives, verbose, path):
     """Download best subtitles.
 
     PATH can be an directory containing videos, a video file path or a video file name. It can be used multiple times.
@@ -306,12 +371,13 @@ def download(obj, provider, refiner, language, age, directory, encoding, single,
     # process parameters
     language = set(language)
 
-    # scan videos
-    videos = []
+    # collect videos
     ignored_videos = []
     errored_paths = []
-    with click.progressbar(path, label='Collecting videos', item_show_func=lambda p: p or '') as bar:
-        for p in bar:
+    directory_index = DirectoryIndex()
+
+    def collect_videos():
+        for p in path:
             logger.debug('Collecting path %s', p)
 
             # non-existing
@@ -323,45 +389,66 @@ def download(obj, provider, refiner, language, age, directory, encoding, single,
                     errored_paths.append(p)
                     continue
                 if not force:
-                    video.subtitle_languages |= set(search_external_subtitles(video.name, directory=directory).values())
+                    video.subtitle_languages |= set(search_external_subtitles(video.name, directory=directory,
+                                                                              index=directory_index).values())
                 refine(video, episode_refiners=refiner, movie_refiners=refiner, embedded_subtitles=not force)
-                videos.append(video)
+                yield video
                 continue
 
             # directories
             if os.path.isdir(p):
                 try:
-                    scanned_videos = scan_videos(p, age=age, archives=archives)
+                    for video in iter_videos(p, age=age, archives=archives, providers=provider, index=obj['index'],
+                                             directory_index=directory_index):
+                        if not force:
+                            video.subtitle_languages |= set(search_external_subtitles(video.name, directory=directory,
+                                                                                      index=directory_index).values())
+                        if check_video(video, languages=language, age=age, undefined=single):
+                            refine(video, episode_refiners=refiner, movie_refiners=refiner,
+                                   embedded_subtitles=not force)
+                            yield video
+                        else:
+                            ignored_videos.append(video)
                 except:
                     logger.exception('Unexpected error while collecting directory path %s', p)
                     errored_paths.append(p)
-                    continue
-                for video in scanned_videos:
-                    if not force:
-                        video.subtitle_languages |= set(search_external_subtitles(video.name,
-                                                                                  directory=directory).values())
-                    if check_video(video, languages=language, age=age, undefined=single):
-                        refine(video, episode_refiners=refiner, movie_refiners=refiner, embedded_subtitles=not force)
-                        videos.append(video)
-                    else:
-                        ignored_videos.append(video)
                 continue
 
             # other inputs
             try:
-                video = scan_video(p)
+                video = scan_video(p, providers=provider)
             except:
                 logger.exception('Unexpected error while collecting path %s', p)
                 errored_paths.append(p)
                 continue
             if not force:
-                video.subtitle_languages |= set(search_external_subtitles(video.name, directory=directory).values())
+                video.subtitle_languages |= set(search_external_subtitles(video.name, directory=directory,
+                                                                          index=directory_index).values())
             if check_video(video, languages=language, age=age, undefined=single):
                 refine(video, episode_refiners=refiner, movie_refiners=refiner, embedded_subtitles=not force)
-                videos.append(video)
+                yield video
             else:
                 ignored_videos.append(video)
 
+    # download best subtitles while the videos are being collected
+    downloaded_subtitles = defaultdict(list)
+    with AsyncProviderPool(max_workers=max_workers, speculative_downloads=speculative_downloads,
+                           stop_on_hash_match=stop_on_hash_match, batch_size=batch_size, providers=provider,
+                           provider_configs=obj['provider_configs']) as p:
+        listed_videos = p.list_subtitles_videos(iter_buffered(collect_videos(), maxsize=queue_size), language)
+        with click.progressbar(listed_videos, label='Downloading subtitles',
+                               item_show_func=lambda i: os.path.split(i[0].name)[1] if i is not None else '') as bar:
+            for v, subtitles in bar:
+                scores = get_scores(v)
+                subtitles = p.download_best_subtitles(subtitles, v, language,
+                                                      min_score=scores['hash'] * min_score / 100,
+                                                      hearing_impaired=hearing_impaired, only_one=single)
+                downloaded_subtitles[v] = subtitles
+
+        if p.discarded_providers:
+            click.secho('Some providers have been discarded due to unexpected errors: %s' %
+                        ', '.join(p.discarded_providers), fg='yellow')
+
     # output errored paths
     if verbose > 0:
         for p in errored_paths:
@@ -379,8 +466,8 @@ def download(obj, provider, refiner, language, age, directory, encoding, single,
 
     # report collected videos
     click.echo('%s video%s collected / %s video%s ignored / %s error%s' % (
-        click.style(str(len(videos)), bold=True, fg='green' if videos else None),
-        's' if len(videos) > 1 else '',
+        click.style(str(len(downloaded_subtitles)), bold=True, fg='green' if downloaded_subtitles else None),
+        's' if len(downloaded_subtitles) > 1 else '',
         click.style(str(len(ignored_videos)), bold=True, fg='yellow' if ignored_videos else None),
         's' if len(ignored_videos) > 1 else '',
         click.style(str(len(errored_paths)), bold=True, fg='red' if errored_paths else None),
@@ -388,25 +475,9 @@ def download(obj, provider, refiner, language, age, directory, encoding, single,
     ))
 
     # exit if no video collected
-    if not videos:
+    if not downloaded_subtitles:
         return
 
-    # download best subtitles
-    downloaded_subtitles = defaultdict(list)
-    with AsyncProviderPool(max_workers=max_workers, providers=provider, provider_configs=obj['provider_configs']) as p:
-        with click.progressbar(videos, label='Downloading subtitles',
-                               item_show_func=lambda v: os.path.split(v.name)[1] if v is not None else '') as bar:
-            for v in bar:
-                scores = get_scores(v)
-                subtitles = p.download_best_subtitles(p.list_subtitles(v, language - v.subtitle_languages),
-                                                      v, language, min_score=scores['hash'] * min_score / 100,
-                                                      hearing_impaired=hearing_impaired, only_one=single)
-                downloaded_subtitles[v] = subtitles
-
-        if p.discarded_providers:
-            click.secho('Some providers have been discarded due to unexpected errors: %s' %
-                        ', '.join(p.discarded_providers), fg='yellow')
-
     # save subtitles
     total_subtitles = 0
     for v, subtitles in downloaded_subtitles.items():
@@ -1,23 +1,30 @@
 # -*- coding: utf-8 -*-
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime
 import io
-import itertools
+from itertools import islice
 import logging
+from multiprocessing import cpu_count
 import operator
 import os.path
 import socket
+import threading
 
 from babelfish import Language, LanguageReverseError
 from guessit import guessit
 from rarfile import NotRarFile, RarCannotExec, RarFile
 import requests
+from six.moves import queue
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
 
 from .extensions import provider_manager, refiner_manager
-from .score import compute_score as default_compute_score
+from .score import get_scores, score_subtitles
 from .subtitle import SUBTITLE_EXTENSIONS, get_subtitle_path
-from .utils import hash_napiprojekt, hash_opensubtitles, hash_shooter, hash_thesubdb
+from .utils import hash_video, iter_buffered, video_hashes
 from .video import VIDEO_EXTENSIONS, Episode, Movie, Video
 
 #: Supported archive extensions
@@ -34,19 +41,32 @@ class ProviderPool(object):
         * Lazy loads providers when needed and supports the `with` statement to :meth:`terminate`
           the providers on exit.
         * Automatically discard providers on failure.
+        * Optionally stop listing subtitles for a video once matched by hash, see :attr:`stop_on_hash_match`.
+        * Optionally list subtitles for many videos at once with the providers supporting it, see :attr:`batch_size`.
 
     :param list providers: name of providers to use, if not all.
     :param dict provider_configs: provider configuration as keyword arguments per provider name to pass when
         instanciating the :class:`~subliminal.providers.Provider`.
+    :param bool stop_on_hash_match: query the providers that can match by hash first, then the others by
+        :attr:`~subliminal.providers.Provider.cost`, and stop listing subtitles for a video once a subtitle matched
+        by hash is found for every language.
+    :param int batch_size: number of videos of :meth:`list_subtitles_videos` to list at once with the providers
+        supporting :attr:`~subliminal.providers.Provider.batch_listing`. If `None`, the videos are listed one by one.
 
     """
-    def __init__(self, providers=None, provider_configs=None):
+    def __init__(self, providers=None, provider_configs=None, stop_on_hash_match=False, batch_size=None):
         #: Name of providers to use
         self.providers = providers or provider_manager.names()
 
         #: Provider configuration
         self.provider_configs = provider_configs or {}
 
+        #: Whether to stop listing subtitles for a video once matched by hash in every language
+        self.stop_on_hash_match = stop_on_hash_match
+
+        #: Number of videos to list at once with the providers supporting it
+        self.batch_size = batch_size
+
         #: Initialized providers
         self.initialized_providers = {}
 
@@ -87,29 +107,76 @@ class ProviderPool(object):
     def __iter__(self):
         return iter(self.initialized_providers)
 
-    def list_subtitles_provider(self, provider, video, languages):
-        """List subtitles with a single provider.
+    def _get_providers(self):
+        """Get the names of the :attr:`providers` in the order to query them.
 
-        The video and languages are checked against the provider.
+        With :attr:`stop_on_hash_match`, the providers that can match by hash come first, then the others, the
+        cheapest first. Otherwise, the order of the :attr:`providers` is kept.
+
+        :return: the names of the providers.
+        :rtype: list of str
+
+        """
+        if not self.stop_on_hash_match:
+            return list(self.providers)
+
+        return sorted(self.providers, key=lambda name: (not provider_manager[name].plugin.hash_match,
+                                                        provider_manager[name].plugin.cost))
+
+    @staticmethod
+    def _get_hash_matched_languages(subtitles, video):
+        """Get the languages of the `subtitles` matched by hash, the ones with a perfect score.
+
+        :return: the languages.
+        :rtype: set of :class:`~babelfish.language.Language`
+
+        """
+        subtitles = list(subtitles)
+        hash_score = get_scores(video)['hash']
+
+        return {s.language for s, score in zip(subtitles, score_subtitles(video, subtitles)) if score >= hash_score}
+
+    @staticmethod
+    def _get_provider_languages(provider, video, languages):
+        """Get the languages to search for with a single provider.
 
         :param str provider: name of the provider.
         :param video: video to list subtitles for.
         :type video: :class:`~subliminal.video.Video`
         :param languages: languages to search for.
         :type languages: set of :class:`~babelfish.language.Language`
-        :return: found subtitles.
-        :rtype: list of :class:`~subliminal.subtitle.Subtitle` or None
+        :return: the languages supported by the provider, empty if the provider must be skipped.
+        :rtype: set of :class:`~babelfish.language.Language`
 
         """
         # check video validity
         if not provider_manager[provider].plugin.check(video):
             logger.info('Skipping provider %r: not a valid video', provider)
-            return []
+            return set()
 
         # check supported languages
         provider_languages = provider_manager[provider].plugin.languages & languages
         if not provider_languages:
             logger.info('Skipping provider %r: no language to search for', provider)
+
+        return provider_languages
+
+    def list_subtitles_provider(self, provider, video, languages):
+        """List subtitles with a single provider.
+
+        The video and languages are checked against the provider.
+
+        :param str provider: name of the provider.
+        :param video: video to list subtitles for.
+        :type video: :class:`~subliminal.video.Video`
+        :param languages: languages to search for.
+        :type languages: set of :class:`~babelfish.language.Language`
+        :return: found subtitles.
+        :rtype: list of :class:`~subliminal.subtitle.Subtitle` or None
+
+        """
+        provider_languages = self._get_provider_languages(provider, video, languages)
+        if not provider_languages:
             return []
 
         # list subtitles
@@ -121,6 +188,82 @@ class ProviderPool(object):
         except:
             logger.exception('Unexpected error in provider %r', provider)
 
+    def list_subtitles_provider_batch(self, provider, pairs):
+        """List subtitles for many videos at once with a single provider.
+
+        The videos and languages are checked against the provider, see :meth:`list_subtitles_provider`.
+
+        :param str provider: name of the provider.
+        :param pairs: videos with the languages to search for.
+        :type pairs: list of tuple(:class:`~subliminal.video.Video`, set of :class:`~babelfish.language.Language`)
+        :return: found subtitles, for each video in order.
+        :rtype: list of list of :class:`~subliminal.subtitle.Subtitle` or None
+
+        """
+        provider_pairs = [(video, self._get_provider_languages(provider, video, languages))
+                          for video, languages in pairs]
+        listed = [i for i, (_, provider_languages) in enumerate(provider_pairs) if provider_languages]
+        subtitles = [[] for _ in pairs]
+        if not listed:
+            return subtitles
+
+        # list subtitles
+        logger.info('Listing subtitles for %d video(s) with provider %r', len(listed), provider)
+        try:
+            listed_subtitles = self[provider].list_subtitles_batch([provider_pairs[i] for i in listed])
+        except (requests.Timeout, socket.timeout):
+            logger.error('Provider %r timed out', provider)
+            return
+        except Exception:
+            logger.exception('Unexpected error in provider %r', provider)
+            return
+
+        for i, video_subtitles in zip(listed, listed_subtitles):
+            subtitles[i] = video_subtitles
+
+        return subtitles
+
+    def _iter_batches(self, pairs):
+        """List subtitles for batches of :attr:`batch_size` `pairs` with the providers supporting it.
+
+        :param pairs: videos with the languages to search for.
+        :type pairs: iterable of tuple(:class:`~subliminal.video.Video`, set of :class:`~babelfish.language.Language`)
+        :return: the videos with their languages and their subtitles by name of the providers listed.
+        :rtype: generator of tuple(:class:`~subliminal.video.Video`, set of :class:`~babelfish.language.Language`,
+            dict)
+
+        """
+        names = [n for n in self._get_providers() if provider_manager[n].plugin.batch_listing]
+        if not self.batch_size or not names:
+            for video, languages in pairs:
+                yield video, languages, {}
+            return
+
+        pairs = iter(pairs)
+        while True:
+            batch = list(islice(pairs, self.batch_size))
+            if not batch:
+                return
+
+            listed = [{} for _ in batch]
+            for name in names:
+                # check discarded providers
+                if name in self.discarded_providers:
+                    continue
+
+                # list subtitles
+                provider_subtitles = self.list_subtitles_provider_batch(name, batch)
+                if provider_subtitles is None:
+                    logger.info('Discarding provider %s', name)
+                    self.discarded_providers.add(name)
+                    continue
+
+                for video_listed, video_subtitles in zip(listed, provider_subtitles):
+                    video_listed[name] = video_subtitles
+
+            for (video, languages), video_listed in zip(batch, listed):
+                yield video, languages, video_listed
+
     def list_subtitles(self, video, languages):
         """List subtitles.
 
@@ -132,16 +275,25 @@ class ProviderPool(object):
         :rtype: list of :class:`~subliminal.subtitle.Subtitle`
 
         """
+        return self._list_subtitles(video, languages)
+
+    def _list_subtitles(self, video, languages, listed=None):
+        """List subtitles, with the subtitles already `listed` by name of provider, see :meth:`_iter_batches`."""
         subtitles = []
+        hash_languages = set()
+        listed = listed or {}
 
-        for name in self.providers:
+        for name in self._get_providers():
             # check discarded providers
-            if name in self.discarded_providers:
+            if name in self.discarded_providers and name not in listed:
                 logger.debug('Skipping discarded provider %r', name)
                 continue
 
             # list subtitles
-            provider_subtitles = self.list_subtitles_provider(name, video, languages)
+            if name in listed:
+                provider_subtitles = listed[name]
+            else:
+                provider_subtitles = self.list_subtitles_provider(name, video, languages)
             if provider_subtitles is None:
                 logger.info('Discarding provider %s', name)
                 self.discarded_providers.add(name)
@@ -150,8 +302,73 @@ class ProviderPool(object):
             # add the subtitles
             subtitles.extend(provider_subtitles)
 
+            # stop on hash matches
+            if self.stop_on_hash_match and provider_manager[name].plugin.hash_match:
+                hash_languages |= self._get_hash_matched_languages(provider_subtitles, video)
+                if languages <= hash_languages:
+                    logger.info('Matched by hash in all languages, skipping the remaining providers')
+                    break
+
         return subtitles
 
+    def iter_subtitles(self, video, languages):
+        """Iterate over the subtitles, provider by provider.
+
+        This is the lazy equivalent of :meth:`list_subtitles`: the subtitles are yielded as the providers find them
+        with :meth:`~subliminal.providers.Provider.iter_subtitles`, so that the caller can stop early, e.g. on a hash
+        match or a perfect score, by breaking out of the loop or closing the generator. The remaining pages and
+        providers are then never queried.
+
+        :param video: video to list subtitles for.
+        :type video: :class:`~subliminal.video.Video`
+        :param languages: languages to search for.
+        :type languages: set of :class:`~babelfish.language.Language`
+        :return: found subtitles, as soon as they are found.
+        :rtype: generator of :class:`~subliminal.subtitle.Subtitle`
+
+        """
+        for name in self._get_providers():
+            # check discarded providers
+            if name in self.discarded_providers:
+                logger.debug('Skipping discarded provider %r', name)
+                continue
+
+            provider_languages = self._get_provider_languages(name, video, languages)
+            if not provider_languages:
+                continue
+
+            # iterate over subtitles
+            logger.info('Iterating over subtitles with provider %r and languages %r', name, provider_languages)
+            try:
+                for subtitle in self[name].iter_subtitles(video, provider_languages):
+                    yield subtitle
+                continue
+            except (requests.Timeout, socket.timeout):
+                logger.error('Provider %r timed out', name)
+            except Exception:
+                logger.exception('Unexpected error in provider %r', name)
+
+            logger.info('Discarding provider %s', name)
+            self.discarded_providers.add(name)
+
+    def list_subtitles_videos(self, videos, languages):
+        """List subtitles for many videos.
+
+        For each video, the `languages` already in its :attr:`~subliminal.video.Video.subtitle_languages` are not
+        searched for. With a :attr:`batch_size`, the videos are listed by batches with the providers supporting it.
+
+        :param videos: videos to list subtitles for.
+        :type videos: iterable of :class:`~subliminal.video.Video`
+        :param languages: languages to search for.
+        :type languages: set of :class:`~babelfish.language.Language`
+        :return: the videos with their found subtitles, as soon as they are listed.
+        :rtype: generator of tuple(:class:`~subliminal.video.Video`, list of :class:`~subliminal.subtitle.Subtitle`)
+
+        """
+        pairs = ((video, languages - video.subtitle_languages) for video in videos)
+        for video, video_languages, listed in self._iter_batches(pairs):
+            yield video, self._list_subtitles(video, video_languages, listed)
+
     def download_subtitle(self, subtitle):
         """Download `subtitle`'s :attr:`~subliminal.subtitle.Subtitle.content`.
 
@@ -166,17 +383,83 @@ class ProviderPool(object):
             logger.warning('Provider %r is discarded', subtitle.provider_name)
             return False
 
+        downloaded = self._download_subtitle(subtitle)
+
+        # discard provider that failed
+        if downloaded is None:
+            logger.info('Discarding provider %s', subtitle.provider_name)
+            self.discarded_providers.add(subtitle.provider_name)
+            return False
+
+        return downloaded
+
+    def download_subtitles(self, subtitles):
+        """Download the :attr:`~subliminal.subtitle.Subtitle.content` of many `subtitles`.
+
+        The subtitles are grouped by provider, each downloading its subtitles with
+        :meth:`~subliminal.providers.Provider.download_subtitles`.
+
+        :param subtitles: subtitles to download.
+        :type subtitles: list of :class:`~subliminal.subtitle.Subtitle`
+        :return: the subtitles successfully downloaded.
+        :rtype: list of :class:`~subliminal.subtitle.Subtitle`
+
+        """
+        # group the subtitles by provider
+        provider_subtitles = defaultdict(list)
+        for subtitle in subtitles:
+            provider_subtitles[subtitle.provider_name].append(subtitle)
+
+        downloaded_subtitles = []
+        for name in sorted(provider_subtitles):
+            # check discarded providers
+            if name in self.discarded_providers:
+                logger.warning('Provider %r is discarded', name)
+                continue
+
+            # download subtitles
+            logger.info('Downloading %d subtitle(s) with provider %r', len(provider_subtitles[name]), name)
+            try:
+                self[name].download_subtitles(provider_subtitles[name])
+            except (requests.Timeout, socket.timeout):
+                logger.error('Provider %r timed out, discarding it', name)
+                self.discarded_providers.add(name)
+            except Exception:
+                logger.exception('Unexpected error in provider %r, discarding it', name)
+                self.discarded_providers.add(name)
+
+            # check subtitles validity, keeping the ones downloaded before a failure
+            failed = name in self.discarded_providers
+            for subtitle in provider_subtitles[name]:
+                if failed and subtitle.content is None:
+                    logger.info('Subtitle %r not downloaded', subtitle)
+                    continue
+                if not subtitle.is_valid():
+                    logger.error('Invalid subtitle %r', subtitle)
+                    continue
+                downloaded_subtitles.append(subtitle)
+
+        return downloaded_subtitles
+
+    def _download_subtitle(self, subtitle):
+        """Download `subtitle`'s :attr:`~subliminal.subtitle.Subtitle.content`, without discarding its provider.
+
+        :param subtitle: subtitle to download.
+        :type subtitle: :class:`~subliminal.subtitle.Subtitle`
+        :return: `True` if the subtitle has been successfully downloaded, `False` if it is invalid and `None` if the
+            provider failed.
+        :rtype: bool
+
+        """
         logger.info('Downloading subtitle %r', subtitle)
         try:
             self[subtitle.provider_name].download_subtitle(subtitle)
         except (requests.Timeout, socket.timeout):
-            logger.error('Provider %r timed out, discarding it', subtitle.provider_name)
-            self.discarded_providers.add(subtitle.provider_name)
-            return False
+            logger.error('Provider %r timed out', subtitle.provider_name)
+            return None
         except:
-            logger.exception('Unexpected error in provider %r, discarding it', subtitle.provider_name)
-            self.discarded_providers.add(subtitle.provider_name)
-            return False
+            logger.exception('Unexpected error in provider %r', subtitle.provider_name)
+            return None
 
         # check subtitle validity
         if not subtitle.is_valid():
@@ -199,16 +482,14 @@ class ProviderPool(object):
         :param bool hearing_impaired: hearing impaired preference.
         :param bool only_one: download only one subtitle, not one per language.
         :param compute_score: function that takes `subtitle` and `video` as positional arguments,
-            `hearing_impaired` as keyword argument and returns the score.
+            `hearing_impaired` as keyword argument and returns the score. If `None`, the scores are computed with
+            :func:`~subliminal.score.score_subtitles`.
         :return: downloaded subtitles.
         :rtype: list of :class:`~subliminal.subtitle.Subtitle`
 
         """
-        compute_score = compute_score or default_compute_score
-
         # sort subtitles by score
-        scored_subtitles = sorted([(s, compute_score(s, video, hearing_impaired=hearing_impaired))
-                                  for s in subtitles], key=operator.itemgetter(1), reverse=True)
+        scored_subtitles = self._sort_subtitles(subtitles, video, hearing_impaired, compute_score)
 
         # download best subtitles, falling back on the next on error
         downloaded_subtitles = []
@@ -239,6 +520,22 @@ class ProviderPool(object):
 
         return downloaded_subtitles
 
+    @staticmethod
+    def _sort_subtitles(subtitles, video, hearing_impaired=False, compute_score=None):
+        """Sort the `subtitles` by score, best first.
+
+        :return: the subtitles with their score.
+        :rtype: list of tuple(:class:`~subliminal.subtitle.Subtitle`, int)
+
+        """
+        subtitles = list(subtitles)
+        if compute_score is None:
+            scores = score_subtitles(video, subtitles, hearing_impaired=hearing_impaired)
+        else:
+            scores = [compute_score(s, video, hearing_impaired=hearing_impaired) for s in subtitles]
+
+        return sorted(zip(subtitles, scores), key=operator.itemgetter(1), reverse=True)
+
     def terminate(self):
         """Terminate all the :attr:`initialized_providers`."""
         logger.debug('Terminating initialized providers')
@@ -249,36 +546,288 @@ class ProviderPool(object):
 class AsyncProviderPool(ProviderPool):
     """Subclass of :class:`ProviderPool` with asynchronous support for :meth:`~ProviderPool.list_subtitles`.
 
+    The subtitles are listed in a pool of threads that lives as long as the pool, until :meth:`terminate`. With
+    :meth:`list_subtitles_videos`, the pairs of video and provider of a batch of videos are scheduled together so
+    that the providers are kept busy, each with at most its :attr:`provider_max_workers` concurrent calls.
+
     :param int max_workers: maximum number of threads to use. If `None`, :attr:`max_workers` will be set
         to the number of :attr:`~ProviderPool.providers`.
+    :param dict provider_max_workers: maximum number of concurrent calls per provider name, 1 for unspecified
+        providers.
+    :param int speculative_downloads: number of the best subtitles of each missing language to download concurrently
+        in :meth:`download_best_subtitles`. If `None`, they are downloaded one at a time.
 
     """
-    def __init__(self, max_workers=None, *args, **kwargs):
+    def __init__(self, max_workers=None, provider_max_workers=None, speculative_downloads=None, *args, **kwargs):
         super(AsyncProviderPool, self).__init__(*args, **kwargs)
 
         #: Maximum number of threads to use
         self.max_workers = max_workers or len(self.providers)
 
+        #: Maximum number of concurrent calls per provider name
+        self.provider_max_workers = provider_max_workers or {}
+
+        #: Number of the best subtitles of each missing language to download concurrently
+        self.speculative_downloads = speculative_downloads
+
+        #: Executor of the calls to the providers, created when needed
+        self.executor = None
+
+        #: Lock for the initialization of the providers
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self.lock:
+            return super(AsyncProviderPool, self).__getitem__(name)
+
     def list_subtitles_provider(self, provider, video, languages):
         return provider, super(AsyncProviderPool, self).list_subtitles_provider(provider, video, languages)
 
     def list_subtitles(self, video, languages):
-        subtitles = []
+        for _, subtitles in self._list_subtitles_pairs([(video, languages, {})]):
+            return subtitles
 
-        with ThreadPoolExecutor(self.max_workers) as executor:
-            for provider, provider_subtitles in executor.map(self.list_subtitles_provider, self.providers,
-                                                             itertools.repeat(video, len(self.providers)),
-                                                             itertools.repeat(languages, len(self.providers))):
-                # discard provider that failed
-                if provider_subtitles is None:
-                    logger.info('Discarding provider %s', provider)
-                    self.discarded_providers.add(provider)
+    def list_subtitles_videos(self, videos, languages):
+        return self._list_subtitles_pairs(self._iter_batches((video, languages - video.subtitle_languages)
+                                                             for video in videos))
+
+    def _list_subtitles_pairs(self, pairs):
+        """List subtitles for pairs of video and languages, scheduling the calls per provider.
+
+        The `pairs` are consumed as needed, keeping up to :attr:`max_workers` videos being listed.
+
+        :param pairs: videos with the languages to search for and their subtitles already listed by name of provider,
+            see :meth:`~ProviderPool._iter_batches`.
+        :type pairs: iterable of tuple(:class:`~subliminal.video.Video`, set of :class:`~babelfish.language.Language`,
+            dict)
+        :return: the videos with their found subtitles, as soon as all the providers answered.
+        :rtype: generator of tuple(:class:`~subliminal.video.Video`, list of :class:`~subliminal.subtitle.Subtitle`)
+
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.max_workers)
+
+        pairs = iter(pairs)
+        completed = queue.Queue()
+        names = self._get_providers()
+
+        # videos being listed, by key, with their languages, their subtitles by provider, their languages matched by
+        # hash and their calls by provider
+        listing = {}
+
+        # keys of the videos waiting for each provider, and number of running calls per provider
+        waiting = {name: [] for name in names}
+        running = Counter()
+
+        def feed():
+            """Take the next pairs until :attr:`max_workers` videos are being listed."""
+            while len(listing) < self.max_workers:
+                try:
+                    video, languages, listed = next(pairs)
+                except StopIteration:
+                    return
+                key = object()
+                listing[key] = (video, languages, {}, set(), {})
+                for name in names:
+                    if name in listed:
+                        add(key, name, listed[name])
+                for name in names:
+                    if name not in listing[key][2]:
+                        waiting[name].append(key)
+
+        def schedule(name):
+            """Submit the calls to a provider, up to its maximum number of concurrent calls."""
+            # skip the discarded provider
+            if name in self.discarded_providers:
+                for key in waiting[name]:
+                    logger.debug('Skipping discarded provider %r', name)
+                    listing[key][2][name] = []
+                del waiting[name][:]
+
+            while waiting[name] and running[name] < self.provider_max_workers.get(name, 1):
+                key = waiting[name].pop(0)
+                video, languages, _, _, futures = listing[key]
+                running[name] += 1
+                futures[name] = self.executor.submit(self.list_subtitles_provider, name, video, languages)
+                futures[name].add_done_callback(lambda f, key=key, name=name: completed.put((key, name, f)))
+
+        def add(key, name, provider_subtitles):
+            """Add the subtitles of a provider for a video."""
+            video, languages, _, hash_languages, _ = listing[key]
+            listing[key][2][name] = provider_subtitles
+
+            # stop on hash matches
+            if self.stop_on_hash_match and provider_manager[name].plugin.hash_match:
+                hash_languages |= self._get_hash_matched_languages(provider_subtitles, video)
+                if languages <= hash_languages:
+                    stop(key)
+
+        def stop(key):
+            """Cancel the calls of a video matched by hash in all its languages, pending or running."""
+            logger.info('Matched by hash in all languages, cancelling the remaining providers')
+            _, _, provider_subtitles, _, futures = listing[key]
+            for name in names:
+                if name in provider_subtitles:
                     continue
+                if key in waiting[name]:
+                    waiting[name].remove(key)
+                if name in futures:
+                    futures[name].cancel()
+                provider_subtitles[name] = []
+
+        def pop_listed():
+            """Remove and return the videos answered by all the providers, in order."""
+            listed = []
+            for key in list(listing):
+                video, _, provider_subtitles, _, _ = listing[key]
+                if len(provider_subtitles) == len(names):
+                    del listing[key]
+                    listed.append((video, [s for name in names for s in provider_subtitles[name]]))
+            return listed
+
+        feed()
+        while listing:
+            # submit the calls
+            for name in names:
+                schedule(name)
+
+            # yield the videos answered by all the providers and take the next ones
+            listed = pop_listed()
+            if listed:
+                for video, subtitles in listed:
+                    yield video, subtitles
+                feed()
+                continue
 
-                # add subtitles
-                subtitles.extend(provider_subtitles)
+            # wait for a call to complete
+            key, name, future = completed.get()
+            running[name] -= 1
+            if future.cancelled():
+                continue
+            _, provider_subtitles = future.result()
 
-        return subtitles
+            # discard provider that failed
+            if provider_subtitles is None:
+                logger.info('Discarding provider %s', name)
+                self.discarded_providers.add(name)
+                provider_subtitles = []
+
+            # skip the calls no longer needed
+            if key not in listing or name in listing[key][2]:
+                continue
+
+            add(key, name, provider_subtitles)
+
+    def download_best_subtitles(self, subtitles, video, languages, min_score=0, hearing_impaired=False, only_one=False,
+                                compute_score=None):
+        """Download the best matching subtitles.
+
+        With :attr:`speculative_downloads`, the best subtitles of each missing language are downloaded concurrently,
+        each provider with at most its :attr:`provider_max_workers` concurrent calls. The results are then taken in
+        the order of the scores, as the serial algorithm would, so that the same subtitles are downloaded and the same
+        providers discarded. The downloads no longer needed once a language is downloaded are cancelled.
+
+        See :meth:`ProviderPool.download_best_subtitles` for the parameters.
+
+        """
+        if not self.speculative_downloads:
+            return super(AsyncProviderPool, self).download_best_subtitles(
+                subtitles, video, languages, min_score=min_score, hearing_impaired=hearing_impaired,
+                only_one=only_one, compute_score=compute_score)
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.max_workers)
+
+        # sort subtitles by score, keeping the ones above min_score
+        scored_subtitles = self._sort_subtitles(subtitles, video, hearing_impaired, compute_score)
+        candidates = []
+        for subtitle, score in scored_subtitles:
+            if score < min_score:
+                logger.info('Score %d is below min_score (%d)', score, min_score)
+                break
+            candidates.append(subtitle)
+
+        # only the best subtitle is tried if only one subtitle is requested
+        if only_one:
+            candidates = candidates[:1]
+
+        # downloads by index of the candidate
+        futures = {}
+
+        def schedule(start, downloaded_languages):
+            """Submit the downloads of the best remaining candidates of each missing language."""
+            active = Counter()
+            running = Counter(candidates[i].provider_name for i, f in futures.items() if not f.done())
+            for i in range(start, len(candidates)):
+                subtitle = candidates[i]
+                if subtitle.language in downloaded_languages or subtitle.provider_name in self.discarded_providers:
+                    continue
+
+                # count the downloads that can still win the language
+                if i in futures:
+                    if not futures[i].done() or futures[i].result():
+                        active[subtitle.language] += 1
+                    continue
+
+                # submit the download within the limits
+                if (active[subtitle.language] < self.speculative_downloads and
+                        running[subtitle.provider_name] < self.provider_max_workers.get(subtitle.provider_name, 1)):
+                    futures[i] = self.executor.submit(self._download_subtitle, subtitle)
+                    active[subtitle.language] += 1
+                    running[subtitle.provider_name] += 1
+
+        def cancel(language=None):
+            """Cancel the downloads of a `language`, or all of them."""
+            for i, future in futures.items():
+                if language is None or candidates[i].language == language:
+                    if future.cancel():
+                        logger.debug('Cancelled download of subtitle %r', candidates[i])
+
+        # take the results in order, falling back on the next on error
+        downloaded_subtitles = []
+        try:
+            for i, subtitle in enumerate(candidates):
+                downloaded_languages = set(s.language for s in downloaded_subtitles)
+
+                # check downloaded languages
+                if subtitle.language in downloaded_languages:
+                    logger.debug('Skipping subtitle: %r already downloaded', subtitle.language)
+                    continue
+
+                # check discarded providers
+                if subtitle.provider_name in self.discarded_providers:
+                    logger.warning('Provider %r is discarded', subtitle.provider_name)
+                    continue
+
+                # wait for the download, submitting the next ones as the others complete
+                schedule(i, downloaded_languages)
+                while i not in futures or not futures[i].done():
+                    wait([f for f in futures.values() if not f.done()], return_when=FIRST_COMPLETED)
+                    schedule(i, downloaded_languages)
+                downloaded = futures[i].result()
+
+                # discard provider that failed
+                if downloaded is None:
+                    logger.info('Discarding provider %s', subtitle.provider_name)
+                    self.discarded_providers.add(subtitle.provider_name)
+                elif downloaded:
+                    downloaded_subtitles.append(subtitle)
+                    cancel(subtitle.language)
+
+                # stop when all languages are downloaded
+                if set(s.language for s in downloaded_subtitles) == languages:
+                    logger.debug('All languages downloaded')
+                    break
+        finally:
+            cancel()
+
+        return downloaded_subtitles
+
+    def terminate(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        super(AsyncProviderPool, self).terminate()
 
 
 def check_video(video, languages=None, age=None, undefined=False):
@@ -318,13 +867,17 @@ def check_video(video, languages=None, age=None, undefined=False):
     return True
 
 
-def search_external_subtitles(path, directory=None):
+def search_external_subtitles(path, directory=None, index=None):
     """Search for external subtitles from a video `path` and their associated language.
 
     Unless `directory` is provided, search will be made in the same directory as the video file.
 
+    When searching for many videos, an `index` avoids listing the same directory for each of them.
+
     :param str path: path to the video.
     :param str directory: directory to search for subtitles.
+    :param index: index of the directories to use.
+    :type index: :class:`~subliminal.index.DirectoryIndex`
     :return: found subtitles with their languages.
     :rtype: dict
 
@@ -334,9 +887,15 @@ def search_external_subtitles(path, directory=None):
     dirpath = dirpath or '.'
     fileroot, fileext = os.path.splitext(filename)
 
+    # list the candidate filenames
+    if index is not None:
+        filenames = index.get(directory or dirpath, fileroot)
+    else:
+        filenames = os.listdir(directory or dirpath)
+
     # search for subtitles
     subtitles = {}
-    for p in os.listdir(directory or dirpath):
+    for p in filenames:
         # keep only valid subtitle filenames
         if not p.startswith(fileroot) or not p.endswith(SUBTITLE_EXTENSIONS):
             continue
@@ -357,17 +916,47 @@ def search_external_subtitles(path, directory=None):
     return subtitles
 
 
-def scan_video(path):
+def get_video_hashes(providers=None):
+    """Get the name of the :data:`~subliminal.utils.video_hashes` used by the `providers`.
+
+    Without `providers`, all the video hashes are used, including the ones of the providers that can be used without
+    being registered in the :data:`~subliminal.extensions.provider_manager`, like
+    :class:`~subliminal.providers.napiprojekt.NapiProjektProvider`.
+
+    :param list providers: name of the providers, if not all.
+    :return: the name of the video hashes.
+    :rtype: set
+
+    """
+    if providers is None:
+        return set(video_hashes)
+
+    names = set()
+    for provider in providers:
+        plugin = provider_manager[provider].plugin
+        names |= {plugin.video_hash, plugin.required_hash}
+
+    return names & set(video_hashes)
+
+
+def scan_video(path, providers=None, stat=None):
     """Scan a video from a `path`.
 
+    Only the hashes used by the `providers` are computed, see :func:`get_video_hashes`.
+
     :param str path: existing path to the video.
+    :param list providers: name of the providers to compute the hashes for, if not all the hashes.
+    :param stat: result of :func:`os.stat` on `path`, if already known.
     :return: the scanned video.
     :rtype: :class:`~subliminal.video.Video`
 
     """
     # check for non-existing path
-    if not os.path.exists(path):
-        raise ValueError('Path does not exist')
+    if stat is None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise ValueError('Path does not exist')
 
     # check video extension
     if not path.endswith(VIDEO_EXTENSIONS):
@@ -379,14 +968,12 @@ def scan_video(path):
     # guess
     video = Video.fromguess(path, guessit(path))
 
-    # size and hashes
-    video.size = os.path.getsize(path)
+    # size, modification time and hashes
+    video.size = stat.st_size
+    video.mtime = stat.st_mtime
     if video.size > 10485760:
         logger.debug('Size is %d', video.size)
-        video.hashes['opensubtitles'] = hash_opensubtitles(path)
-        video.hashes['shooter'] = hash_shooter(path)
-        video.hashes['thesubdb'] = hash_thesubdb(path)
-        video.hashes['napiprojekt'] = hash_napiprojekt(path)
+        video.hashes.update(hash_video(path, get_video_hashes(providers), filesize=video.size))
         logger.debug('Computed hashes %r', video.hashes)
     else:
         logger.warning('Size is lower than 10MB: hashes not computed')
@@ -394,17 +981,21 @@ def scan_video(path):
     return video
 
 
-def scan_archive(path):
+def scan_archive(path, stat=None):
     """Scan an archive from a `path`.
 
     :param str path: existing path to the archive.
+    :param stat: result of :func:`os.stat` on `path`, if already known.
     :return: the scanned video.
     :rtype: :class:`~subliminal.video.Video`
 
     """
     # check for non-existing path
-    if not os.path.exists(path):
-        raise ValueError('Path does not exist')
+    if stat is None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise ValueError('Path does not exist')
 
     # check video extension
     if not path.endswith(ARCHIVE_EXTENSIONS):
@@ -433,24 +1024,93 @@ def scan_archive(path):
         rar_filepath = os.path.join(dirpath, rar_filename)
         video = Video.fromguess(rar_filepath, guessit(rar_filepath))
 
-        # size
+        # size and modification time
         video.size = rar.getinfo(rar_filename).file_size
+        video.mtime = stat.st_mtime
     else:
         raise ValueError('Unsupported extension %r' % os.path.splitext(path)[1])
 
     return video
 
 
-def scan_videos(path, age=None, archives=True):
-    """Scan `path` for videos and their subtitles.
+def _walk_videos(path, age=None, archives=True, stats=None, directory_index=None):
+    """Walk `path` for the files to scan.
 
-    See :func:`refine` to find additional information for the video.
+    The directories are listed with :func:`os.scandir` so that each file is stat only once, the stat result being
+    yielded along with its path.
 
-    :param str path: existing directory path to scan.
+    :param str path: existing directory path to walk.
     :param datetime.timedelta age: maximum age of the video or archive.
-    :param bool archives: scan videos in archives.
-    :return: the scanned videos.
-    :rtype: list of :class:`~subliminal.video.Video`
+    :param bool archives: include archives.
+    :param stats: counter of the `stat` calls to update.
+    :type stats: :class:`collections.Counter`
+    :param directory_index: index to add the listed directories to.
+    :type directory_index: :class:`~subliminal.index.DirectoryIndex`
+    :return: the paths of the videos and archives with their stat result.
+    :rtype: generator of tuple(str, :class:`os.stat_result`)
+
+    """
+    logger.debug('Walking directory %r', path)
+    try:
+        entries = list(scandir(path))
+    except OSError:
+        logger.exception('Error listing directory %r', path)
+        return
+
+    # index the listing
+    if directory_index is not None:
+        directory_index.add(path, [entry.name for entry in entries])
+
+    # scan for videos
+    dirpaths = []
+    for entry in entries:
+        # skip hidden dirnames and files
+        if entry.name.startswith('.'):
+            if entry.is_dir():
+                logger.debug('Skipping hidden dirname %r in %r', entry.name, path)
+            elif entry.name.endswith(VIDEO_EXTENSIONS) or archives and entry.name.endswith(ARCHIVE_EXTENSIONS):
+                logger.debug('Skipping hidden filename %r in %r', entry.name, path)
+            continue
+
+        # walk directories after the files, not following links
+        if entry.is_dir():
+            if not entry.is_symlink():
+                dirpaths.append(os.path.join(path, entry.name))
+            continue
+
+        # filter on videos and archives
+        if not (entry.name.endswith(VIDEO_EXTENSIONS) or archives and entry.name.endswith(ARCHIVE_EXTENSIONS)):
+            continue
+
+        # skip links
+        if entry.is_symlink():
+            logger.debug('Skipping link %r in %r', entry.name, path)
+            continue
+
+        # stat the file once
+        if stats is not None:
+            stats['stat'] += 1
+        stat = entry.stat()
+
+        # skip old files
+        if age and datetime.utcnow() - datetime.utcfromtimestamp(stat.st_mtime) > age:
+            logger.debug('Skipping old file %r in %r', entry.name, path)
+            continue
+
+        yield os.path.join(path, entry.name), stat
+
+    # walk the directories
+    for dirpath in dirpaths:
+        for filepath, stat in _walk_videos(dirpath, age=age, archives=archives, stats=stats,
+                                           directory_index=directory_index):
+            yield filepath, stat
+
+
+def _check_directory(path):
+    """Check that `path` is an existing directory to scan.
+
+    :param str path: the path to check.
+    :raise: ValueError if `path` does not exist or is not a directory.
 
     """
     # check for non-existing path
@@ -461,60 +1121,244 @@ def scan_videos(path, age=None, archives=True):
     if not os.path.isdir(path):
         raise ValueError('Path is not a directory')
 
+
+def iter_videos(path, age=None, archives=True, providers=None, index=None, stats=None, directory_index=None):
+    """Scan `path` for videos and their subtitles, yielding the videos as they are scanned.
+
+    See :func:`refine` to find additional information for the video.
+
+    When an `index` is given, unchanged videos are taken from it instead of being scanned again and newly scanned
+    videos are added to it.
+
+    :param str path: existing directory path to scan.
+    :param datetime.timedelta age: maximum age of the video or archive.
+    :param bool archives: scan videos in archives.
+    :param list providers: name of the providers to compute the hashes for, if not all.
+    :param index: index of the scanned videos to use.
+    :type index: :class:`~subliminal.index.ScanIndex`
+    :param stats: counter of the `stat` calls to update, under the ``'stat'`` key.
+    :type stats: :class:`collections.Counter`
+    :param directory_index: index to add the listed directories to, to be shared with
+        :func:`search_external_subtitles`.
+    :type directory_index: :class:`~subliminal.index.DirectoryIndex`
+    :return: the scanned videos.
+    :rtype: generator of :class:`~subliminal.video.Video`
+
+    """
+    _check_directory(path)
+    if stats is None:
+        stats = Counter()
+
     # walk the path
-    videos = []
-    for dirpath, dirnames, filenames in os.walk(path):
-        logger.debug('Walking directory %r', dirpath)
-
-        # remove badly encoded and hidden dirnames
-        for dirname in list(dirnames):
-            if dirname.startswith('.'):
-                logger.debug('Skipping hidden dirname %r in %r', dirname, dirpath)
-                dirnames.remove(dirname)
-
-        # scan for videos
-        for filename in filenames:
-            # filter on videos and archives
-            if not (filename.endswith(VIDEO_EXTENSIONS) or archives and filename.endswith(ARCHIVE_EXTENSIONS)):
+    for filepath, stat in _walk_videos(path, age=age, archives=archives, stats=stats,
+                                       directory_index=directory_index):
+        dirpath, filename = os.path.split(filepath)
+
+        # get the video from the index
+        if index is not None:
+            video = index.get(filepath, stat=stat)
+            if video is not None:
+                logger.debug('Found indexed video for %r in %r', filename, dirpath)
+
+                # compute the hashes missing from the indexed video
+                hash_names = get_video_hashes(providers) - set(video.hashes)
+                if hash_names and filename.endswith(VIDEO_EXTENSIONS) and video.size > 10485760:
+                    logger.debug('Computing missing hashes %r', hash_names)
+                    video.hashes.update(hash_video(filepath, hash_names, filesize=video.size))
+                    index.set(filepath, video, stat=stat)
+
+                yield video
                 continue
 
-            # skip hidden files
-            if filename.startswith('.'):
-                logger.debug('Skipping hidden filename %r in %r', filename, dirpath)
+        # scan
+        if filename.endswith(VIDEO_EXTENSIONS):  # video
+            try:
+                video = scan_video(filepath, providers=providers, stat=stat)
+            except ValueError:  # pragma: no cover
+                logger.exception('Error scanning video')
+                continue
+        elif archives and filename.endswith(ARCHIVE_EXTENSIONS):  # archive
+            try:
+                video = scan_archive(filepath, stat=stat)
+            except (NotRarFile, RarCannotExec, ValueError):  # pragma: no cover
+                logger.exception('Error scanning archive')
                 continue
+        else:  # pragma: no cover
+            raise ValueError('Unsupported file %r' % filename)
 
-            # reconstruct the file path
-            filepath = os.path.join(dirpath, filename)
+        # index the video
+        if index is not None:
+            index.set(filepath, video, stat=stat)
 
-            # skip links
-            if os.path.islink(filepath):
-                logger.debug('Skipping link %r in %r', filename, dirpath)
-                continue
+        yield video
 
-            # skip old files
-            if age and datetime.utcnow() - datetime.utcfromtimestamp(os.path.getmtime(filepath)) > age:
-                logger.debug('Skipping old file %r in %r', filename, dirpath)
-                continue
+    logger.debug('Scanned %r with %d stat call(s)', path, stats['stat'])
 
-            # scan
-            if filename.endswith(VIDEO_EXTENSIONS):  # video
-                try:
-                    video = scan_video(filepath)
-                except ValueError:  # pragma: no cover
-                    logger.exception('Error scanning video')
+
+def scan_videos(path, age=None, archives=True, providers=None, index=None, stats=None, directory_index=None):
+    """Scan `path` for videos and their subtitles.
+
+    See :func:`iter_videos` for the parameters.
+
+    :return: the scanned videos.
+    :rtype: list of :class:`~subliminal.video.Video`
+
+    """
+    return list(iter_videos(path, age=age, archives=archives, providers=providers, index=index, stats=stats,
+                            directory_index=directory_index))
+
+
+def _guess_video(path):
+    """Guess from a video `path`, in a worker process.
+
+    :param str path: path to the video.
+    :return: the guess, as a plain dict so it can be sent back to the main process.
+    :rtype: dict
+
+    """
+    return dict(guessit(path))
+
+
+def scan_videos_parallel(path, age=None, archives=True, providers=None, index=None, stats=None, directory_index=None,
+                         max_workers=None, max_processes=None):
+    """Scan `path` for videos and their subtitles in parallel.
+
+    This scans the same videos as :func:`scan_videos` but yields them as soon as they are scanned. The file names are
+    guessed in a pool of processes as guessing is CPU-bound while the hashes are computed, and archives read, in a
+    pool of threads as it is I/O-bound. The files are submitted to the pools while the `path` is walked.
+
+    :param str path: existing directory path to scan.
+    :param datetime.timedelta age: maximum age of the video or archive.
+    :param bool archives: scan videos in archives.
+    :param list providers: name of the providers to compute the hashes for, if not all.
+    :param index: index of the scanned videos to use.
+    :type index: :class:`~subliminal.index.ScanIndex`
+    :param stats: counter of the `stat` calls to update, under the ``'stat'`` key.
+    :type stats: :class:`collections.Counter`
+    :param directory_index: index to add the listed directories to, to be shared with
+        :func:`search_external_subtitles`.
+    :type directory_index: :class:`~subliminal.index.DirectoryIndex`
+    :param int max_workers: maximum number of threads to use, defaults to 5 times the number of CPUs.
+    :param int max_processes: maximum number of processes to use, defaults to the number of CPUs.
+    :return: the scanned videos, in completion order.
+    :rtype: generator of :class:`~subliminal.video.Video`
+
+    """
+    _check_directory(path)
+
+    hash_names = get_video_hashes(providers)
+    thread_executor = ThreadPoolExecutor(max_workers or cpu_count() * 5)
+    process_executor = ProcessPoolExecutor(max_processes)
+
+    # completed futures along with their task and path
+    completed = queue.Queue()
+
+    # stat and results of the tasks of each path being scanned
+    pending = {}
+
+    # futures not yet completed
+    futures = set()
+
+    def submit(executor, task, filepath, fn, *args):
+        future = executor.submit(fn, *args)
+        futures.add(future)
+        future.add_done_callback(lambda f: completed.put((task, filepath, f)))
+
+    def complete(task, filepath, future):
+        """Store the result of a task and return the video of `filepath` once all its tasks are done."""
+        futures.discard(future)
+        stat, results = pending[filepath]
+        if task == 'archive':
+            try:
+                results[task] = future.result()
+            except (NotRarFile, RarCannotExec, ValueError):  # pragma: no cover
+                logger.exception('Error scanning archive')
+                del pending[filepath]
+                return None
+        else:
+            results[task] = future.result()
+
+        if task == 'missing':  # indexed video with missing hashes
+            video = results['video']
+            video.hashes.update(results['missing'])
+        elif task == 'archive':  # archive
+            video = results['archive']
+        elif 'guess' not in results or stat.st_size > 10485760 and 'hashes' not in results:  # incomplete video
+            return None
+        else:  # video
+            try:
+                video = Video.fromguess(filepath, results['guess'])
+            except ValueError:  # pragma: no cover
+                logger.exception('Error scanning video')
+                del pending[filepath]
+                return None
+            video.size = stat.st_size
+            video.mtime = stat.st_mtime
+            video.hashes.update(results.get('hashes', {}))
+        del pending[filepath]
+
+        # index the video
+        if index is not None:
+            index.set(filepath, video, stat=stat)
+
+        return video
+
+    try:
+        # walk the path and submit the tasks
+        for filepath, stat in _walk_videos(path, age=age, archives=archives, stats=stats,
+                                           directory_index=directory_index):
+            dirpath, filename = os.path.split(filepath)
+
+            # get the video from the index
+            if index is not None:
+                video = index.get(filepath, stat=stat)
+                if video is not None:
+                    logger.debug('Found indexed video for %r in %r', filename, dirpath)
+
+                    # compute the hashes missing from the indexed video
+                    missing_hash_names = hash_names - set(video.hashes)
+                    if missing_hash_names and filename.endswith(VIDEO_EXTENSIONS) and video.size > 10485760:
+                        logger.debug('Computing missing hashes %r', missing_hash_names)
+                        pending[filepath] = (stat, {'video': video})
+                        submit(thread_executor, 'missing', filepath, hash_video, filepath, missing_hash_names,
+                               video.size)
+                        continue
+
+                    yield video
                     continue
+
+            # submit the tasks
+            if filename.endswith(VIDEO_EXTENSIONS):  # video
+                logger.info('Scanning video %r in %r', filename, dirpath)
+                pending[filepath] = (stat, {})
+                submit(process_executor, 'guess', filepath, _guess_video, filepath)
+                if stat.st_size > 10485760:
+                    submit(thread_executor, 'hashes', filepath, hash_video, filepath, hash_names, stat.st_size)
+                else:
+                    logger.warning('Size of %r is lower than 10MB: hashes not computed', filepath)
             elif archives and filename.endswith(ARCHIVE_EXTENSIONS):  # archive
-                try:
-                    video = scan_archive(filepath)
-                except (NotRarFile, RarCannotExec, ValueError):  # pragma: no cover
-                    logger.exception('Error scanning archive')
-                    continue
+                pending[filepath] = (stat, {})
+                submit(thread_executor, 'archive', filepath, scan_archive, filepath, stat)
             else:  # pragma: no cover
                 raise ValueError('Unsupported file %r' % filename)
 
-            videos.append(video)
-
-    return videos
+            # yield the videos scanned in the meantime
+            while not completed.empty():
+                video = complete(*completed.get())
+                if video is not None:
+                    yield video
+
+        # yield the remaining videos
+        while pending:
+            video = complete(*completed.get())
+            if video is not None:
+                yield video
+    finally:
+        # cancel the remaining tasks, e.g. when the generator is closed early
+        for future in list(futures):
+            future.cancel()
+        thread_executor.shutdown()
+        process_executor.shutdown()
 
 
 def refine(video, episode_refiners=None, movie_refiners=None, **kwargs):
@@ -576,11 +1420,10 @@ def list_subtitles(videos, languages, pool_class=ProviderPool, **kwargs):
 
     # list subtitles
     with pool_class(**kwargs) as pool:
-        for video in checked_videos:
-            logger.info('Listing subtitles for %r', video)
-            subtitles = pool.list_subtitles(video, languages - video.subtitle_languages)
+        logger.info('Listing subtitles for %d video(s)', len(checked_videos))
+        for video, subtitles in pool.list_subtitles_videos(checked_videos, languages):
             listed_subtitles[video].extend(subtitles)
-            logger.info('Found %d subtitle(s)', len(subtitles))
+            logger.info('Found %d subtitle(s) for %r', len(subtitles), video)
 
     return listed_subtitles
 
@@ -593,31 +1436,38 @@ def download_subtitles(subtitles, pool_class=ProviderPool, **kwargs):
     :param pool_class: class to use as provider pool.
     :type pool_class: :class:`ProviderPool`, :class:`AsyncProviderPool` or similar
     :param \*\*kwargs: additional parameters for the provided `pool_class` constructor.
+    :return: the subtitles successfully downloaded.
+    :rtype: list of :class:`~subliminal.subtitle.Subtitle`
 
     """
     with pool_class(**kwargs) as pool:
-        for subtitle in subtitles:
-            logger.info('Downloading subtitle %r', subtitle)
-            pool.download_subtitle(subtitle)
+        logger.info('Downloading %d subtitle(s)', len(subtitles))
+        return pool.download_subtitles(subtitles)
 
 
 def download_best_subtitles(videos, languages, min_score=0, hearing_impaired=False, only_one=False, compute_score=None,
-                            pool_class=ProviderPool, **kwargs):
+                            pool_class=ProviderPool, buffer_size=None, **kwargs):
     """List and download the best matching subtitles.
 
     The `videos` must pass the `languages` and `undefined` (`only_one`) checks of :func:`check_video`.
 
+    The `videos` can be a generator, e.g. :func:`iter_videos`. With a `buffer_size`, it is consumed in a background
+    thread so that the subtitles are downloaded while the videos are still being scanned.
+
     :param videos: videos to download subtitles for.
-    :type videos: set of :class:`~subliminal.video.Video`
+    :type videos: iterable of :class:`~subliminal.video.Video`
     :param languages: languages to download.
     :type languages: set of :class:`~babelfish.language.Language`
     :param int min_score: minimum score for a subtitle to be downloaded.
     :param bool hearing_impaired: hearing impaired preference.
     :param bool only_one: download only one subtitle, not one per language.
     :param compute_score: function that takes `subtitle` and `video` as positional arguments,
-        `hearing_impaired` as keyword argument and returns the score.
+        `hearing_impaired` as keyword argument and returns the score. If `None`, the scores are computed with
+        :func:`~subliminal.score.score_subtitles`.
     :param pool_class: class to use as provider pool.
     :type pool_class: :class:`ProviderPool`, :class:`AsyncProviderPool` or similar
+    :param int buffer_size: maximum number of videos waiting for their subtitles, see
+        :func:`~subliminal.utils.iter_buffered`.
     :param \*\*kwargs: additional parameters for the provided `pool_class` constructor.
     :return: downloaded subtitles per video.
     :rtype: dict of :class:`~subliminal.video.Video` to list of :class:`~subliminal.subtitle.Subtitle`
@@ -625,24 +1475,23 @@ def download_best_subtitles(videos, languages, min_score=0, hearing_impaired=Fal
     """
     downloaded_subtitles = defaultdict(list)
 
-    # check videos
-    checked_videos = []
-    for video in videos:
-        if not check_video(video, languages=languages, undefined=only_one):
-            logger.info('Skipping video %r', video)
-            continue
-        checked_videos.append(video)
+    # consume the videos in the background
+    if buffer_size:
+        videos = iter_buffered(videos, maxsize=buffer_size)
 
-    # return immediately if no video passed the checks
-    if not checked_videos:
-        return downloaded_subtitles
+    # check videos
+    def check_videos():
+        for video in videos:
+            if not check_video(video, languages=languages, undefined=only_one):
+                logger.info('Skipping video %r', video)
+                continue
+            yield video
 
     # download best subtitles
     with pool_class(**kwargs) as pool:
-        for video in checked_videos:
+        for video, subtitles in pool.list_subtitles_videos(check_videos(), languages):
             logger.info('Downloading best subtitles for %r', video)
-            subtitles = pool.download_best_subtitles(pool.list_subtitles(video, languages - video.subtitle_languages),
-                                                     video, languages, min_score=min_score,
+            subtitles = pool.download_best_subtitles(subtitles, video, languages, min_score=min_score,
                                                      hearing_impaired=hearing_impaired, only_one=only_one,
                                                      compute_score=compute_score)
             logger.info('Downloaded %d subtitle(s)', len(subtitles))
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import bisect
+import logging
+import os
+import sqlite3
+import threading
+
+from six.moves import cPickle as pickle
+
+from .subtitle import SUBTITLE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+
+class ScanIndex(object):
+    """On-disk index of scanned videos, stored in a SQLite database.
+
+    Each entry stores the :class:`~subliminal.video.Video` scanned from a path, including its hashes, along with the
+    size, modification time and inode of the file at the time of the scan. An entry is only returned as long as those
+    are unchanged, so that unchanged files do not need to be guessed and hashed again.
+
+    It supports the `with` statement to :meth:`close` the index on exit.
+
+    :param str filename: path to the database file.
+
+    """
+    def __init__(self, filename):
+        #: Path to the database file
+        self.filename = filename
+
+        #: Connection to the database
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS videos (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, '
+                                'inode INTEGER, name TEXT, video BLOB)')
+        self.connection.commit()
+
+        #: Lock for the connection
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM videos').fetchone()[0]
+
+    def get(self, path, stat=None):
+        """Get the indexed video of `path`.
+
+        :param str path: path of the video or archive.
+        :param stat: result of :func:`os.stat` on `path`, if already known.
+        :return: the indexed video, if any and unchanged.
+        :rtype: :class:`~subliminal.video.Video`
+
+        """
+        stat = stat or os.stat(path)
+        with self.lock:
+            row = self.connection.execute('SELECT size, mtime, inode, name, video FROM videos WHERE path = ?',
+                                          (os.path.abspath(path),)).fetchone()
+        if row is None:
+            logger.debug('Path %r is not indexed', path)
+            return None
+
+        # check for changes
+        if tuple(row[:3]) != (stat.st_size, stat.st_mtime, stat.st_ino):
+            logger.debug('Path %r changed since it was indexed', path)
+            return None
+
+        # load the video
+        try:
+            video = pickle.loads(bytes(row[4]))
+        except Exception:
+            logger.exception('Failed to load indexed video of path %r', path)
+            return None
+
+        # restore the name relative to the path used
+        video.name = os.path.join(os.path.dirname(path), row[3])
+
+        return video
+
+    def set(self, path, video, stat=None):
+        """Index the `video` of `path`.
+
+        :param str path: path of the video or archive.
+        :param video: the video scanned from `path`.
+        :type video: :class:`~subliminal.video.Video`
+        :param stat: result of :func:`os.stat` on `path` before `video` was scanned, if already known.
+
+        """
+        stat = stat or os.stat(path)
+        name = os.path.relpath(video.name, os.path.dirname(path) or os.curdir)
+        data = sqlite3.Binary(pickle.dumps(video, protocol=2))
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?)',
+                                    (os.path.abspath(path), stat.st_size, stat.st_mtime, stat.st_ino, name, data))
+            self.connection.commit()
+
+    def prune(self):
+        """Remove the entries of paths that no longer exist or changed since they were indexed.
+
+        :return: the number of removed entries.
+        :rtype: int
+
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT path, size, mtime, inode FROM videos').fetchall()
+
+        # find the paths to remove
+        paths = []
+        for path, size, mtime, inode in rows:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                logger.debug('Pruning missing path %r', path)
+                paths.append((path,))
+                continue
+
+            if (size, mtime, inode) != (stat.st_size, stat.st_mtime, stat.st_ino):
+                logger.debug('Pruning changed path %r', path)
+                paths.append((path,))
+
+        # remove them
+        with self.lock:
+            self.connection.executemany('DELETE FROM videos WHERE path = ?', paths)
+            self.connection.commit()
+
+        return len(paths)
+
+    def clear(self):
+        """Remove all the entries."""
+        with self.lock:
+            self.connection.execute('DELETE FROM videos')
+            self.connection.commit()
+
+    def close(self):
+        """Close the connection to the database."""
+        self.connection.close()
+
+
+class DirectoryIndex(object):
+    """In-memory index of the subtitle files of directories, for :func:`~subliminal.core.search_external_subtitles`.
+
+    Each directory is listed at most once, either when its listing is given by the walk of a scan with :meth:`add` or
+    on the first lookup. The subtitle filenames are kept sorted so that the ones starting with the root of a video
+    filename are found by bisection instead of testing every file of the directory.
+
+    """
+    def __init__(self):
+        #: Sorted subtitle filenames by directory
+        self.directories = {}
+
+    def add(self, dirpath, filenames):
+        """Index the listing of a directory.
+
+        :param str dirpath: path to the directory.
+        :param list filenames: names of all the files in the directory.
+
+        """
+        self.directories[os.path.normpath(dirpath)] = sorted(f for f in filenames if f.endswith(SUBTITLE_EXTENSIONS))
+
+    def get(self, dirpath, prefix=''):
+        """Get the subtitle filenames of a directory, listing it if not indexed yet.
+
+        :param str dirpath: path to the directory.
+        :param str prefix: prefix of the filenames to get.
+        :return: the subtitle filenames starting with `prefix`, sorted.
+        :rtype: list of str
+
+        """
+        key = os.path.normpath(dirpath)
+        if key not in self.directories:
+            logger.debug('Listing directory %r', dirpath)
+            self.add(dirpath, os.listdir(dirpath))
+        filenames = self.directories[key]
+
+        # find the filenames starting with the prefix
+        start = end = bisect.bisect_left(filenames, prefix)
+        while end < len(filenames) and filenames[end].startswith(prefix):
+            end += 1
+
+        return filenames[start:end]
+
+    def clear(self):
+        """Remove all the directories."""
+        self.directories.clear()
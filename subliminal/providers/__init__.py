@@ -56,6 +56,9 @@ class Provider(object):
 
     If any configuration is possible for the provider, like credentials, it must take place during instantiation.
 
+    Providers can also implement the optional coroutine interface of :class:`~subliminal.aio.AsyncProvider`, used by
+    the :class:`~subliminal.aio.AsyncioProviderPool` on Python 3.5+.
+
     :raise: :class:`~subliminal.exceptions.ConfigurationError` if there is a configuration error
 
     """
@@ -68,6 +71,20 @@ class Provider(object):
     #: Required hash, if any
     required_hash = None
 
+    #: Name of the :data:`~subliminal.utils.video_hashes` used by the provider, if any
+    video_hash = None
+
+    #: Whether the provider can return subtitles matched by hash
+    hash_match = False
+
+    #: Relative cost of listing subtitles with the provider, the cheapest being queried first by the
+    #: :class:`~subliminal.core.ProviderPool` when stopping on hash matches
+    cost = 1
+
+    #: Whether the provider lists subtitles for many videos at once with :meth:`list_subtitles_batch`, used by the
+    #: :class:`~subliminal.core.ProviderPool` with a `batch_size`
+    batch_listing = False
+
     def __enter__(self):
         self.initialize()
         return self
@@ -147,6 +164,40 @@ class Provider(object):
         """
         raise NotImplementedError
 
+    def iter_subtitles(self, video, languages):
+        """Iterate over the subtitles for the `video` with the given `languages`.
+
+        This is the lazy equivalent of :meth:`list_subtitles`: providers that query paginated results override it to
+        yield the subtitles page by page, so that the caller can stop early by closing the generator, sparing the
+        requests of the remaining pages. By default, it yields the subtitles of :meth:`list_subtitles`.
+
+        :param video: video to list subtitles for.
+        :type video: :class:`~subliminal.video.Video`
+        :param languages: languages to search for.
+        :type languages: set of :class:`~babelfish.language.Language`
+        :return: found subtitles, as soon as they are found.
+        :rtype: generator of :class:`~subliminal.subtitle.Subtitle`
+        :raise: :class:`~subliminal.exceptions.ProviderError`
+
+        """
+        for subtitle in self.list_subtitles(video, languages):
+            yield subtitle
+
+    def list_subtitles_batch(self, pairs):
+        """List subtitles for many videos, each with its languages.
+
+        Providers whose API can search for many videos at once override it and set :attr:`batch_listing`. By default,
+        it calls :meth:`list_subtitles` for each video.
+
+        :param pairs: videos with the languages to search for.
+        :type pairs: list of tuple(:class:`~subliminal.video.Video`, set of :class:`~babelfish.language.Language`)
+        :return: found subtitles, for each video in order.
+        :rtype: list of list of :class:`~subliminal.subtitle.Subtitle`
+        :raise: :class:`~subliminal.exceptions.ProviderError`
+
+        """
+        return [self.list_subtitles(video, languages) for video, languages in pairs]
+
     def download_subtitle(self, subtitle):
         """Download `subtitle`'s :attr:`~subliminal.subtitle.Subtitle.content`.
 
@@ -157,5 +208,19 @@ class Provider(object):
         """
         raise NotImplementedError
 
+    def download_subtitles(self, subtitles):
+        """Download the :attr:`~subliminal.subtitle.Subtitle.content` of many `subtitles` of the provider.
+
+        Providers whose API can download many subtitles at once override it. By default, it calls
+        :meth:`download_subtitle` for each subtitle.
+
+        :param subtitles: subtitles to download.
+        :type subtitles: list of :class:`~subliminal.subtitle.Subtitle`
+        :raise: :class:`~subliminal.exceptions.ProviderError`
+
+        """
+        for subtitle in subtitles:
+            self.download_subtitle(subtitle)
+
     def __repr__(self):
         return '<%s [%r]>' % (self.__class__.__name__, self.video_types)
@@ -4,15 +4,15 @@ import re
 
 from babelfish import Language, language_converters
 from guessit import guessit
-from requests import Session
 
 from . import ParserBeautifulSoup, Provider
 from .. import __short_version__
-from ..cache import SHOW_EXPIRATION_TIME, region
+from ..cache import SHOW_EXPIRATION_TIME, cache_on_arguments
 from ..exceptions import AuthenticationError, ConfigurationError, DownloadLimitExceeded, TooManyRequests
 from ..score import get_equivalent_release_groups
 from ..subtitle import Subtitle, fix_line_ending, guess_matches
-from ..utils import sanitize, sanitize_release_group
+from ..transport import session_factory
+from ..utils import intern_string, sanitize, sanitize_release_group
 from ..video import Episode
 
 logger = logging.getLogger(__name__)
@@ -27,15 +27,19 @@ class Addic7edSubtitle(Subtitle):
     """Addic7ed Subtitle."""
     provider_name = 'addic7ed'
 
+    __slots__ = ('series', 'season', 'episode', 'title', 'year', 'version', 'download_link')
+
+    interned_attributes = Subtitle.interned_attributes + ('series', 'version')
+
     def __init__(self, language, hearing_impaired, page_link, series, season, episode, title, year, version,
                  download_link):
         super(Addic7edSubtitle, self).__init__(language, hearing_impaired, page_link)
-        self.series = series
+        self.series = intern_string(series)
         self.season = season
         self.episode = episode
         self.title = title
         self.year = year
-        self.version = version
+        self.version = intern_string(version)
         self.download_link = download_link
 
     @property
@@ -86,6 +90,7 @@ class Addic7edProvider(Provider):
     ]}
     video_types = (Episode,)
     server_url = 'http://www.addic7ed.com/'
+    cost = 3
 
     def __init__(self, username=None, password=None):
         if username is not None and password is None or username is None and password is not None:
@@ -96,7 +101,7 @@ class Addic7edProvider(Provider):
         self.logged_in = False
 
     def initialize(self):
-        self.session = Session()
+        self.session = session_factory()
         self.session.headers['User-Agent'] = 'Subliminal/%s' % __short_version__
 
         # login
@@ -122,7 +127,7 @@ class Addic7edProvider(Provider):
 
         self.session.close()
 
-    @region.cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
+    @cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
     def _get_show_ids(self):
         """Get the ``dict`` of show ids per series by querying the `shows.php` page.
 
@@ -144,7 +149,7 @@ class Addic7edProvider(Provider):
 
         return show_ids
 
-    @region.cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
+    @cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
     def _search_show_id(self, series, year=None):
         """Search the show id from the `series` and `year`.
 
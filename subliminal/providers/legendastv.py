@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from collections import deque
 import io
 import json
 import logging
@@ -6,20 +7,22 @@ import os
 import re
 
 from babelfish import Language, language_converters
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dogpile.cache.api import NO_VALUE
 from guessit import guessit
 import pytz
 import rarfile
 from rarfile import RarFile, is_rarfile
-from requests import Session
 from zipfile import ZipFile, is_zipfile
 
 from . import ParserBeautifulSoup, Provider
 from .. import __short_version__
-from ..cache import SHOW_EXPIRATION_TIME, region
+from ..cache import SHOW_EXPIRATION_TIME, cache_on_arguments, file_store, region
 from ..exceptions import AuthenticationError, ConfigurationError, ProviderError
 from ..subtitle import SUBTITLE_EXTENSIONS, Subtitle, fix_line_ending, guess_matches, sanitize
+from ..transport import session_factory
+from ..utils import intern_string
 from ..video import Episode, Movie
 
 logger = logging.getLogger(__name__)
@@ -47,6 +50,9 @@ timestamp_re = re.compile(r'(?P<day>\d+)/(?P<month>\d+)/(?P<year>\d+) - (?P<hour
 #: Cache key for releases
 releases_key = __name__ + ':releases|{archive_id}'
 
+#: Key of the archives in the :data:`~subliminal.cache.file_store`
+archive_key = __name__ + ':archive|{archive_id}'
+
 
 class LegendasTVArchive(object):
     """LegendasTV Archive.
@@ -98,10 +104,14 @@ class LegendasTVSubtitle(Subtitle):
     """LegendasTV Subtitle."""
     provider_name = 'legendastv'
 
+    __slots__ = ('type', 'title', 'year', 'imdb_id', 'season', 'archive', 'name')
+
+    interned_attributes = Subtitle.interned_attributes + ('type', 'title')
+
     def __init__(self, language, type, title, year, imdb_id, season, archive, name):
         super(LegendasTVSubtitle, self).__init__(language, archive.link)
-        self.type = type
-        self.title = title
+        self.type = intern_string(type)
+        self.title = intern_string(title)
         self.year = year
         self.imdb_id = imdb_id
         self.season = season
@@ -155,14 +165,18 @@ class LegendasTVSubtitle(Subtitle):
 class LegendasTVProvider(Provider):
     """LegendasTV Provider.
 
+    The archives of a query are downloaded concurrently, to list their releases, by up to `max_workers` threads.
+
     :param str username: username.
     :param str password: password.
+    :param int max_workers: maximum number of archives downloaded concurrently.
 
     """
     languages = {Language.fromlegendastv(l) for l in language_converters['legendastv'].codes}
     server_url = 'http://legendas.tv/'
+    cost = 5
 
-    def __init__(self, username=None, password=None):
+    def __init__(self, username=None, password=None, max_workers=4):
         if username and not password or not username and password:
             raise ConfigurationError('Username and password must be specified')
 
@@ -170,8 +184,19 @@ class LegendasTVProvider(Provider):
         self.password = password
         self.logged_in = False
 
+        #: Maximum number of archives downloaded concurrently
+        self.max_workers = max_workers
+
+        #: Executor of the downloads of the archives, created on initialization
+        self.executor = None
+
+        #: Archives opened with their file, closed on termination
+        self.archive_files = []
+
     def initialize(self):
-        self.session = Session()
+        self.session = session_factory()
+        if self.max_workers > 1:
+            self.executor = ThreadPoolExecutor(self.max_workers)
         self.session.headers['User-Agent'] = 'Subliminal/%s' % __short_version__
 
         # login
@@ -197,9 +222,20 @@ class LegendasTVProvider(Provider):
             logger.debug('Logged out')
             self.logged_in = False
 
+        # wait for the downloads of the archives still running
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+        # close the archive files, the archives being downloaded again if needed
+        for archive, archive_file in self.archive_files:
+            archive.content = None
+            archive_file.close()
+        del self.archive_files[:]
+
         self.session.close()
 
-    @region.cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
+    @cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
     def search_titles(self, title):
         """Search for titles matching the `title`.
 
@@ -254,7 +290,6 @@ class LegendasTVProvider(Provider):
 
         return titles
 
-    @region.cache_on_arguments(expiration_time=timedelta(minutes=15).total_seconds())
     def get_archives(self, title_id, language_code):
         """Get the archive list from a given `title_id` and `language_code`.
 
@@ -264,87 +299,154 @@ class LegendasTVProvider(Provider):
         :rtype: list of :class:`LegendasTVArchive`
 
         """
-        logger.info('Getting archives for title %d and language %d', title_id, language_code)
-        archives = []
-        page = 1
-        while True:
-            # get the archive page
-            url = self.server_url + 'util/carrega_legendas_busca_filme/{title}/{language}/-/{page}'.format(
-                title=title_id, language=language_code, page=page)
-            r = self.session.get(url)
-            r.raise_for_status()
-
-            # parse the results
-            soup = ParserBeautifulSoup(r.content, ['lxml', 'html.parser'])
-            for archive_soup in soup.select('div.list_element > article > div'):
-                # create archive
-                archive = LegendasTVArchive(archive_soup.a['href'].split('/')[2], archive_soup.a.text,
-                                            'pack' in archive_soup['class'], 'destaque' in archive_soup['class'],
-                                            self.server_url + archive_soup.a['href'][1:])
+        archives = list(self.iter_archives(title_id, language_code))
+        logger.debug('Found %d archives', len(archives))
 
-                # extract text containing downloads, rating and timestamp
-                data_text = archive_soup.find('p', class_='data').text
+        return archives
 
-                # match downloads
-                archive.downloads = int(downloads_re.search(data_text).group('downloads'))
+    def iter_archives(self, title_id, language_code):
+        """Iterate over the archives from a given `title_id` and `language_code`, see :meth:`get_archives`.
 
-                # match rating
-                match = rating_re.search(data_text)
-                if match:
-                    archive.rating = int(match.group('rating'))
+        The pages of archives are got one at a time with :meth:`get_archives_page`, only when the archives of the
+        previous one are consumed.
 
-                # match timestamp and validate it
-                time_data = {k: int(v) for k, v in timestamp_re.search(data_text).groupdict().items()}
-                archive.timestamp = pytz.timezone('America/Sao_Paulo').localize(datetime(**time_data))
-                if archive.timestamp > datetime.utcnow().replace(tzinfo=pytz.utc):
-                    raise ProviderError('Archive timestamp is in the future')
+        :param int title_id: title id.
+        :param int language_code: language code.
+        :return: the archives, page by page.
+        :rtype: generator of :class:`LegendasTVArchive`
 
-                # add archive
-                archives.append(archive)
+        """
+        logger.info('Getting archives for title %d and language %d', title_id, language_code)
+        page = 1
+        while True:
+            archives, more = self.get_archives_page(title_id, language_code, page)
+            for archive in archives:
+                yield archive
 
             # stop on last page
-            if soup.find('a', attrs={'class': 'load_more'}, string='carregar mais') is None:
+            if not more:
                 break
 
             # increment page count
             page += 1
 
-        logger.debug('Found %d archives', len(archives))
+    @cache_on_arguments(expiration_time=timedelta(minutes=15).total_seconds(),
+                        miss_expiration_time=timedelta(minutes=15).total_seconds(), is_miss=lambda page: not page[0])
+    def get_archives_page(self, title_id, language_code, page):
+        """Get a page of the archive list from a given `title_id` and `language_code`.
 
-        return archives
+        :param int title_id: title id.
+        :param int language_code: language code.
+        :param int page: page number, starting at 1.
+        :return: the archives of the page and whether there are more pages.
+        :rtype: tuple(list of :class:`LegendasTVArchive`, bool)
+
+        """
+        # get the archive page
+        logger.info('Getting page %d of archives', page)
+        url = self.server_url + 'util/carrega_legendas_busca_filme/{title}/{language}/-/{page}'.format(
+            title=title_id, language=language_code, page=page)
+        r = self.session.get(url)
+        r.raise_for_status()
+
+        # parse the results
+        soup = ParserBeautifulSoup(r.content, ['lxml', 'html.parser'])
+        archives = []
+        for archive_soup in soup.select('div.list_element > article > div'):
+            # create archive
+            archive = LegendasTVArchive(archive_soup.a['href'].split('/')[2], archive_soup.a.text,
+                                        'pack' in archive_soup['class'], 'destaque' in archive_soup['class'],
+                                        self.server_url + archive_soup.a['href'][1:])
+
+            # extract text containing downloads, rating and timestamp
+            data_text = archive_soup.find('p', class_='data').text
+
+            # match downloads
+            archive.downloads = int(downloads_re.search(data_text).group('downloads'))
+
+            # match rating
+            match = rating_re.search(data_text)
+            if match:
+                archive.rating = int(match.group('rating'))
+
+            # match timestamp and validate it
+            time_data = {k: int(v) for k, v in timestamp_re.search(data_text).groupdict().items()}
+            archive.timestamp = pytz.timezone('America/Sao_Paulo').localize(datetime(**time_data))
+            if archive.timestamp > datetime.utcnow().replace(tzinfo=pytz.utc):
+                raise ProviderError('Archive timestamp is in the future')
+
+            archives.append(archive)
+
+        # check for a next page
+        more = soup.find('a', attrs={'class': 'load_more'}, string='carregar mais') is not None
+
+        return archives, more
 
     def download_archive(self, archive):
         """Download an archive's :attr:`~LegendasTVArchive.content`.
 
+        The archive is kept in the :data:`~subliminal.cache.file_store`, if configured, and read from there by the next
+        downloads, sparing the requests of the archives downloaded again for another of their subtitles. The stored
+        archive is held open, so that its subtitles are extracted from the file even if evicted meanwhile, until
+        :meth:`terminate`.
+
         :param archive: the archive to download :attr:`~LegendasTVArchive.content` of.
         :type archive: :class:`LegendasTVArchive`
 
         """
-        logger.info('Downloading archive %s', archive.id)
-        r = self.session.get(self.server_url + 'downloadarquivo/{}'.format(archive.id))
-        r.raise_for_status()
+        # attempt to open the archive from the file store
+        key = archive_key.format(archive_id=archive.id)
+        archive_file = file_store.open(key)
+
+        # the archive is not in the file store, download and store it
+        if archive_file is None:
+            logger.info('Downloading archive %s', archive.id)
+            r = self.session.get(self.server_url + 'downloadarquivo/{}'.format(archive.id))
+            r.raise_for_status()
+            file_store.set(key, r.content)
+
+            # open the stored archive, or the downloaded one if the file store is disabled or evicted it already
+            archive_file = file_store.open(key) or io.BytesIO(r.content)
+        else:
+            logger.info('Found archive %s in the file store', archive.id)
 
         # open the archive
-        archive_stream = io.BytesIO(r.content)
-        if is_rarfile(archive_stream):
+        if is_rarfile(archive_file):
             logger.debug('Identified rar archive')
-            archive.content = RarFile(archive_stream)
-        elif is_zipfile(archive_stream):
+            archive.content = RarFile(archive_file)
+        elif is_zipfile(archive_file):
             logger.debug('Identified zip archive')
-            archive.content = ZipFile(archive_stream)
+            archive.content = ZipFile(archive_file)
         else:
+            archive_file.close()
+            file_store.delete(key)
             raise ValueError('Not a valid archive')
 
+        # keep the archive file to close it on termination
+        self.archive_files.append((archive, archive_file))
+
     def query(self, language, title, season=None, episode=None, year=None):
+        return list(self.iter_query(language, title, season=season, episode=episode, year=year))
+
+    def iter_query(self, language, title, season=None, episode=None, year=None):
+        """Iterate over the subtitles of a search, see :meth:`query`.
+
+        The archives are requested page by page with :meth:`iter_archives` and their releases are got with
+        :meth:`iter_releases`, up to :attr:`max_workers` archives ahead of the subtitles consumed. The subtitles are
+        in the order of the archives, whatever the order their downloads complete in.
+
+        :return: found subtitles.
+        :rtype: generator of :class:`LegendasTVSubtitle`
+
+        """
         # search for titles
-        titles = self.search_titles(sanitize(title))
+        titles = dict(self.search_titles(sanitize(title)))
 
         # search for titles with the quote or dot character
         ignore_characters = {'\'', '.'}
         if any(c in title for c in ignore_characters):
             titles.update(self.search_titles(sanitize(title, ignore_characters=ignore_characters)))
 
-        subtitles = []
         # iterate over titles
         for title_id, t in titles.items():
             # discard mismatches on title
@@ -370,65 +472,126 @@ class LegendasTVProvider(Provider):
                 if year is not None and 'year' in t and t['year'] != year:
                     continue
 
-            # iterate over title's archives
-            for a in self.get_archives(title_id, language.legendastv):
-                # clean name of path separators and pack flags
-                clean_name = a.name.replace('/', '-')
-                if a.pack and clean_name.startswith('(p)'):
-                    clean_name = clean_name[3:]
+            # iterate over the releases of title's archives, up to max_workers archives ahead of the ones consumed
+            archives = self.filter_archives(self.iter_archives(title_id, language.legendastv), t['type'],
+                                            season=season, episode=episode)
+            for a, releases in self.iter_releases(archives):
+                for r in releases:
+                    subtitle = LegendasTVSubtitle(language, t['type'], t['title'], t.get('year'), t.get('imdb_id'),
+                                                  t.get('season'), a, r)
+                    logger.debug('Found subtitle %r', subtitle)
+                    yield subtitle
 
-                # guess from name
-                guess = guessit(clean_name, {'type': t['type']})
+    @staticmethod
+    def filter_archives(archives, type, season=None, episode=None):
+        """Filter out the `archives` not matching the `episode`, guessed from their name.
 
-                # episode
-                if season and episode:
-                    # discard mismatches on episode in non-pack archives
-                    if not a.pack and 'episode' in guess and guess['episode'] != episode:
-                        continue
+        :param archives: the archives.
+        :type archives: iterable of :class:`LegendasTVArchive`
+        :param str type: type of the title of the archives.
+        :param int season: season of the episode.
+        :param int episode: episode number.
+        :return: the matching archives.
+        :rtype: generator of :class:`LegendasTVArchive`
 
-                # compute an expiration time based on the archive timestamp
-                expiration_time = (datetime.utcnow().replace(tzinfo=pytz.utc) - a.timestamp).total_seconds()
+        """
+        for a in archives:
+            # clean name of path separators and pack flags
+            clean_name = a.name.replace('/', '-')
+            if a.pack and clean_name.startswith('(p)'):
+                clean_name = clean_name[3:]
 
-                # attempt to get the releases from the cache
-                releases = region.get(releases_key.format(archive_id=a.id), expiration_time=expiration_time)
+            # guess from name
+            guess = guessit(clean_name, {'type': type})
 
-                # the releases are not in cache or cache is expired
-                if releases == NO_VALUE:
-                    logger.info('Releases not found in cache')
+            # episode
+            if season and episode:
+                # discard mismatches on episode in non-pack archives
+                if not a.pack and 'episode' in guess and guess['episode'] != episode:
+                    continue
 
-                    # download archive
-                    self.download_archive(a)
+            yield a
 
-                    # extract the releases
-                    releases = []
-                    for name in a.content.namelist():
-                        # discard the legendastv file
-                        if name.startswith('Legendas.tv'):
-                            continue
+    def get_releases(self, archive):
+        """Get the releases of an `archive`, downloading it if they are not in cache.
 
-                        # discard hidden files
-                        if os.path.split(name)[-1].startswith('.'):
-                            continue
+        :param archive: the archive.
+        :type archive: :class:`LegendasTVArchive`
+        :return: the names of the subtitle files of the archive.
+        :rtype: list of str
 
-                        # discard non-subtitle files
-                        if not name.lower().endswith(SUBTITLE_EXTENSIONS):
-                            continue
+        """
+        # compute an expiration time based on the archive timestamp
+        expiration_time = (datetime.utcnow().replace(tzinfo=pytz.utc) - archive.timestamp).total_seconds()
 
-                        releases.append(name)
+        # attempt to get the releases from the cache
+        releases = region.get(releases_key.format(archive_id=archive.id), expiration_time=expiration_time)
 
-                    # cache the releases
-                    region.set(releases_key.format(archive_id=a.id), releases)
+        # the releases are not in cache or cache is expired
+        if releases == NO_VALUE:
+            logger.info('Releases not found in cache')
 
-                # iterate over releases
-                for r in releases:
-                    subtitle = LegendasTVSubtitle(language, t['type'], t['title'], t.get('year'), t.get('imdb_id'),
-                                                  t.get('season'), a, r)
-                    logger.debug('Found subtitle %r', subtitle)
-                    subtitles.append(subtitle)
+            # download archive
+            self.download_archive(archive)
 
-        return subtitles
+            # extract the releases
+            releases = []
+            for name in archive.content.namelist():
+                # discard the legendastv file
+                if name.startswith('Legendas.tv'):
+                    continue
+
+                # discard hidden files
+                if os.path.split(name)[-1].startswith('.'):
+                    continue
+
+                # discard non-subtitle files
+                if not name.lower().endswith(SUBTITLE_EXTENSIONS):
+                    continue
+
+                releases.append(name)
+
+            # cache the releases
+            region.set(releases_key.format(archive_id=archive.id), releases)
+
+        return releases
+
+    def iter_releases(self, archives):
+        """Iterate over the releases of the `archives`, see :meth:`get_releases`.
+
+        With an :attr:`executor`, the releases of up to :attr:`max_workers` archives are got concurrently, ahead of the
+        ones consumed, and the archives are still iterated over in order. Closing the generator cancels the ones not
+        started yet.
+
+        :param archives: the archives.
+        :type archives: iterable of :class:`LegendasTVArchive`
+        :return: the archives with their releases, in order.
+        :rtype: generator of tuple(:class:`LegendasTVArchive`, list of str)
+
+        """
+        if self.executor is None:
+            for a in archives:
+                yield a, self.get_releases(a)
+            return
+
+        futures = deque()
+        try:
+            for a in archives:
+                futures.append((a, self.executor.submit(self.get_releases, a)))
+                if len(futures) >= self.max_workers:
+                    a, future = futures.popleft()
+                    yield a, future.result()
+            while futures:
+                a, future = futures.popleft()
+                yield a, future.result()
+        finally:
+            for _, future in futures:
+                future.cancel()
 
     def list_subtitles(self, video, languages):
+        return list(self.iter_subtitles(video, languages))
+
+    def iter_subtitles(self, video, languages):
         season = episode = None
         if isinstance(video, Episode):
             title = video.series
@@ -437,7 +600,9 @@ class LegendasTVProvider(Provider):
         else:
             title = video.title
 
-        return [s for l in languages for s in self.query(l, title, season=season, episode=episode, year=video.year)]
+        for l in languages:
+            for subtitle in self.iter_query(l, title, season=season, episode=episode, year=video.year):
+                yield subtitle
 
     def download_subtitle(self, subtitle):
         # download archive in case we previously hit the releases cache and didn't download it
@@ -2,11 +2,11 @@
 import logging
 
 from babelfish import Language
-from requests import Session
 
 from . import Provider
 from .. import __short_version__
 from ..subtitle import Subtitle
+from ..transport import session_factory
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +39,8 @@ class NapiProjektSubtitle(Subtitle):
     """NapiProjekt Subtitle."""
     provider_name = 'napiprojekt'
 
+    __slots__ = ('hash',)
+
     def __init__(self, language, hash):
         super(NapiProjektSubtitle, self).__init__(language)
         self.hash = hash
@@ -61,17 +63,21 @@ class NapiProjektProvider(Provider):
     """NapiProjekt Provider."""
     languages = {Language.fromalpha2(l) for l in ['pl']}
     required_hash = 'napiprojekt'
+    video_hash = 'napiprojekt'
     server_url = 'http://napiprojekt.pl/unit_napisy/dl.php'
+    hash_match = True
 
     def initialize(self):
-        self.session = Session()
+        self.session = session_factory()
         self.session.headers['User-Agent'] = 'Subliminal/%s' % __short_version__
 
     def terminate(self):
         self.session.close()
 
-    def query(self, language, hash):
-        params = {
+    @staticmethod
+    def get_query_params(language, hash):
+        """Get the parameters of a search, see :meth:`query`."""
+        return {
             'v': 'dreambox',
             'kolejka': 'false',
             'nick': '',
@@ -80,17 +86,25 @@ class NapiProjektProvider(Provider):
             'l': language.alpha2.upper(),
             'f': hash,
             't': get_subhash(hash)}
+
+    def query(self, language, hash):
+        params = self.get_query_params(language, hash)
         logger.info('Searching subtitle %r', params)
         response = self.session.get(self.server_url, params=params, timeout=10)
         response.raise_for_status()
 
+        return self.parse_subtitle(response.content, language, hash)
+
+    @staticmethod
+    def parse_subtitle(content, language, hash):
+        """Parse the subtitle from the content of a search, see :meth:`query`."""
         # handle subtitles not found and errors
-        if response.content[:4] == b'NPc0':
+        if content[:4] == b'NPc0':
             logger.debug('No subtitles found')
             return None
 
         subtitle = NapiProjektSubtitle(language, hash)
-        subtitle.content = response.content
+        subtitle.content = content
         logger.debug('Found subtitle %r', subtitle)
 
         return subtitle
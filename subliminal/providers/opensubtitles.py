@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import base64
+from datetime import timedelta
 import logging
 import os
 import re
@@ -9,29 +10,39 @@ from babelfish import Language, language_converters
 from guessit import guessit
 from six.moves.xmlrpc_client import ServerProxy
 
-from . import Provider, TimeoutSafeTransport
+from . import Provider
 from .. import __short_version__
+from ..cache import region
 from ..exceptions import AuthenticationError, ConfigurationError, DownloadLimitExceeded, ProviderError
 from ..subtitle import Subtitle, fix_line_ending, guess_matches
-from ..utils import sanitize
+from ..transport import XMLRPCTransport
+from ..utils import intern_string, sanitize
 from ..video import Episode, Movie
 
 logger = logging.getLogger(__name__)
 
+#: Key of the cached login token, by username
+token_key = __name__ + ':token|{username}'
+
 
 class OpenSubtitlesSubtitle(Subtitle):
     """OpenSubtitles Subtitle."""
     provider_name = 'opensubtitles'
     series_re = re.compile(r'^"(?P<series_name>.*)" (?P<series_title>.*)$')
 
+    __slots__ = ('subtitle_id', 'matched_by', 'movie_kind', 'hash', 'movie_name', 'movie_release_name', 'movie_year',
+                 'movie_imdb_id', 'series_season', 'series_episode', 'filename')
+
+    interned_attributes = Subtitle.interned_attributes + ('matched_by', 'movie_kind', 'movie_name')
+
     def __init__(self, language, hearing_impaired, page_link, subtitle_id, matched_by, movie_kind, hash, movie_name,
                  movie_release_name, movie_year, movie_imdb_id, series_season, series_episode, filename, encoding):
         super(OpenSubtitlesSubtitle, self).__init__(language, hearing_impaired, page_link, encoding)
         self.subtitle_id = subtitle_id
-        self.matched_by = matched_by
-        self.movie_kind = movie_kind
+        self.matched_by = intern_string(matched_by)
+        self.movie_kind = intern_string(movie_kind)
         self.hash = hash
-        self.movie_name = movie_name
+        self.movie_name = intern_string(movie_name)
         self.movie_release_name = movie_release_name
         self.movie_year = movie_year
         self.movie_imdb_id = movie_imdb_id
@@ -122,9 +133,25 @@ class OpenSubtitlesProvider(Provider):
 
     """
     languages = {Language.fromopensubtitles(l) for l in language_converters['opensubtitles'].codes}
+    video_hash = 'opensubtitles'
+    hash_match = True
+    cost = 2
+    batch_listing = True
+
+    #: Maximum number of criteria of a call to SearchSubtitles
+    search_max_criteria = 20
+
+    #: Maximum number of subtitle items returned by a call to SearchSubtitles
+    search_max_results = 500
+
+    #: Maximum number of subtitles of a call to DownloadSubtitles
+    download_max_subtitles = 20
+
+    #: Expiration time of the cached token, the sessions expiring after 15 minutes without calls
+    token_expiration_time = timedelta(minutes=15).total_seconds()
 
     def __init__(self, username=None, password=None):
-        self.server = ServerProxy('https://api.opensubtitles.org/xml-rpc', TimeoutSafeTransport(10))
+        self.server = ServerProxy('https://api.opensubtitles.org/xml-rpc', XMLRPCTransport(10))
         if username and not password or not username and password:
             raise ConfigurationError('Username and password must be specified')
         # None values not allowed for logging in, so replace it by ''
@@ -133,24 +160,75 @@ class OpenSubtitlesProvider(Provider):
         self.token = None
 
     def initialize(self):
+        # reuse the token of the previous session, if still alive and the cache is configured
+        token = None
+        if region.is_configured:
+            token = region.get(token_key.format(username=self.username), expiration_time=self.token_expiration_time)
+        if token:
+            logger.debug('Reusing cached token')
+            self.token = token
+            self.no_operation()
+        else:
+            self.login()
+
+    def terminate(self):
+        # keep the session for the next run, see :meth:`initialize`, or end it without a cache to keep it in
+        if self.token and region.is_configured:
+            logger.debug('Caching token')
+            region.set(token_key.format(username=self.username), self.token)
+        elif self.token:
+            self.logout()
+        self.server.close()
+        self.token = None
+
+    def login(self):
+        """Log in, caching the token for the next sessions if the :data:`~subliminal.cache.region` is configured."""
         logger.info('Logging in')
         response = checked(self.server.LogIn(self.username, self.password, 'eng',
                                              'subliminal v%s' % __short_version__))
         self.token = response['token']
+        if region.is_configured:
+            region.set(token_key.format(username=self.username), self.token)
         logger.debug('Logged in with token %r', self.token)
 
-    def terminate(self):
+    def logout(self):
+        """Log out, ending the session of the token."""
         logger.info('Logging out')
         checked(self.server.LogOut(self.token))
-        self.server.close()
+        if region.is_configured:
+            region.delete(token_key.format(username=self.username))
         self.token = None
         logger.debug('Logged out')
 
+    def call(self, method, *args):
+        """Call a `method` of the server with the token, logging in again if the session has expired.
+
+        :param str method: name of the method.
+        :param args: arguments of the method after the token.
+        :return: the response.
+        :raise: :class:`OpenSubtitlesError`
+
+        """
+        try:
+            return checked(getattr(self.server, method)(self.token, *args))
+        except NoSession:
+            logger.info('Session expired, logging in again')
+            self.login()
+
+        return checked(getattr(self.server, method)(self.token, *args))
+
     def no_operation(self):
         logger.debug('No operation')
-        checked(self.server.NoOperation(self.token))
+        self.call('NoOperation')
 
-    def query(self, languages, hash=None, size=None, imdb_id=None, query=None, season=None, episode=None, tag=None):
+    @staticmethod
+    def get_criteria(languages, hash=None, size=None, imdb_id=None, query=None, season=None, episode=None, tag=None):
+        """Get the search criteria of :meth:`query`.
+
+        :return: the search criteria.
+        :rtype: list of dict
+
+        """
         # fill the search criteria
         criteria = []
         if hash and size:
@@ -170,44 +248,11 @@ class OpenSubtitlesProvider(Provider):
         for criterion in criteria:
             criterion['sublanguageid'] = ','.join(sorted(l.opensubtitles for l in languages))
 
-        # query the server
-        logger.info('Searching subtitles %r', criteria)
-        response = checked(self.server.SearchSubtitles(self.token, criteria))
-        subtitles = []
-
-        # exit if no data
-        if not response['data']:
-            logger.debug('No subtitles found')
-            return subtitles
-
-        # loop over subtitle items
-        for subtitle_item in response['data']:
-            # read the item
-            language = Language.fromopensubtitles(subtitle_item['SubLanguageID'])
-            hearing_impaired = bool(int(subtitle_item['SubHearingImpaired']))
-            page_link = subtitle_item['SubtitlesLink']
-            subtitle_id = int(subtitle_item['IDSubtitleFile'])
-            matched_by = subtitle_item['MatchedBy']
-            movie_kind = subtitle_item['MovieKind']
-            hash = subtitle_item['MovieHash']
-            movie_name = subtitle_item['MovieName']
-            movie_release_name = subtitle_item['MovieReleaseName']
-            movie_year = int(subtitle_item['MovieYear']) if subtitle_item['MovieYear'] else None
-            movie_imdb_id = 'tt' + subtitle_item['IDMovieImdb']
-            series_season = int(subtitle_item['SeriesSeason']) if subtitle_item['SeriesSeason'] else None
-            series_episode = int(subtitle_item['SeriesEpisode']) if subtitle_item['SeriesEpisode'] else None
-            filename = subtitle_item['SubFileName']
-            encoding = subtitle_item.get('SubEncoding') or None
-
-            subtitle = OpenSubtitlesSubtitle(language, hearing_impaired, page_link, subtitle_id, matched_by, movie_kind,
-                                             hash, movie_name, movie_release_name, movie_year, movie_imdb_id,
-                                             series_season, series_episode, filename, encoding)
-            logger.debug('Found subtitle %r by %s', subtitle, matched_by)
-            subtitles.append(subtitle)
-
-        return subtitles
+        return criteria
 
-    def list_subtitles(self, video, languages):
+    @staticmethod
+    def get_query_params(video):
+        """Get the parameters of :meth:`query` for a `video`."""
         season = episode = None
         if isinstance(video, Episode):
             query = video.series
@@ -216,13 +261,126 @@ class OpenSubtitlesProvider(Provider):
         else:
             query = video.title
 
-        return self.query(languages, hash=video.hashes.get('opensubtitles'), size=video.size, imdb_id=video.imdb_id,
-                          query=query, season=season, episode=episode, tag=os.path.basename(video.name))
+        return dict(hash=video.hashes.get('opensubtitles'), size=video.size, imdb_id=video.imdb_id, query=query,
+                    season=season, episode=episode, tag=os.path.basename(video.name))
+
+    def search(self, criteria):
+        """Search subtitles with `criteria`, in a single call to the server.
+
+        :param list criteria: the search criteria.
+        :return: the subtitle items found.
+        :rtype: list of dict
+
+        """
+        logger.info('Searching subtitles %r', criteria)
+        response = self.call('SearchSubtitles', criteria)
+
+        return response['data'] or []
+
+    def query(self, languages, hash=None, size=None, imdb_id=None, query=None, season=None, episode=None, tag=None):
+        criteria = self.get_criteria(languages, hash=hash, size=size, imdb_id=imdb_id, query=query, season=season,
+                                     episode=episode, tag=tag)
+
+        # query the server
+        subtitle_items = self.search(criteria)
+
+        # exit if no data
+        if not subtitle_items:
+            logger.debug('No subtitles found')
+            return []
+
+        return [self.parse_subtitle(subtitle_item) for subtitle_item in subtitle_items]
+
+    @staticmethod
+    def parse_subtitle(subtitle_item):
+        """Parse a subtitle item of the search results.
+
+        :param dict subtitle_item: the subtitle item.
+        :return: the subtitle.
+        :rtype: :class:`OpenSubtitlesSubtitle`
+
+        """
+        # read the item
+        language = Language.fromopensubtitles(subtitle_item['SubLanguageID'])
+        hearing_impaired = bool(int(subtitle_item['SubHearingImpaired']))
+        page_link = subtitle_item['SubtitlesLink']
+        subtitle_id = int(subtitle_item['IDSubtitleFile'])
+        matched_by = subtitle_item['MatchedBy']
+        movie_kind = subtitle_item['MovieKind']
+        hash = subtitle_item['MovieHash']
+        movie_name = subtitle_item['MovieName']
+        movie_release_name = subtitle_item['MovieReleaseName']
+        movie_year = int(subtitle_item['MovieYear']) if subtitle_item['MovieYear'] else None
+        movie_imdb_id = 'tt' + subtitle_item['IDMovieImdb']
+        series_season = int(subtitle_item['SeriesSeason']) if subtitle_item['SeriesSeason'] else None
+        series_episode = int(subtitle_item['SeriesEpisode']) if subtitle_item['SeriesEpisode'] else None
+        filename = subtitle_item['SubFileName']
+        encoding = subtitle_item.get('SubEncoding') or None
+
+        subtitle = OpenSubtitlesSubtitle(language, hearing_impaired, page_link, subtitle_id, matched_by, movie_kind,
+                                         hash, movie_name, movie_release_name, movie_year, movie_imdb_id,
+                                         series_season, series_episode, filename, encoding)
+        logger.debug('Found subtitle %r by %s', subtitle, matched_by)
+
+        return subtitle
+
+    def list_subtitles(self, video, languages):
+        return self.query(languages, **self.get_query_params(video))
+
+    def list_subtitles_batch(self, pairs):
+        """List subtitles for many videos with as few calls as possible.
+
+        The criteria of the videos are packed in calls of up to :attr:`search_max_criteria` criteria, and the subtitle
+        items found are given back to the videos of their criteria. The videos of a call reaching
+        :attr:`search_max_results` are searched again one by one, as some of their subtitles may be missing.
+
+        """
+        subtitles = [[] for _ in pairs]
+
+        # pack the criteria of the videos in calls
+        calls = [[]]
+        for i, (video, languages) in enumerate(pairs):
+            video_criteria = [(i, c) for c in self.get_criteria(languages, **self.get_query_params(video))]
+            if calls[-1] and len(calls[-1]) + len(video_criteria) > self.search_max_criteria:
+                calls.append([])
+            calls[-1].extend(video_criteria)
+
+        for call in calls:
+            # query the server
+            subtitle_items = self.search([c for _, c in call])
+            indexes = sorted({i for i, _ in call})
+            if len(subtitle_items) >= self.search_max_results and len(indexes) > 1:
+                logger.info('Too many results for %d videos, searching them one by one', len(indexes))
+                for i in indexes:
+                    subtitles[i] = self.list_subtitles(*pairs[i])
+                continue
+            logger.debug('Found %d subtitle(s) for %d video(s)', len(subtitle_items), len(indexes))
+
+            # give the subtitles back to their videos
+            for subtitle_item in subtitle_items:
+                for i in get_criteria_indexes(subtitle_item, call):
+                    subtitles[i].append(self.parse_subtitle(subtitle_item))
+
+        return subtitles
 
     def download_subtitle(self, subtitle):
-        logger.info('Downloading subtitle %r', subtitle)
-        response = checked(self.server.DownloadSubtitles(self.token, [str(subtitle.subtitle_id)]))
-        subtitle.content = fix_line_ending(zlib.decompress(base64.b64decode(response['data'][0]['data']), 47))
+        self.download_subtitles([subtitle])
+
+    def download_subtitles(self, subtitles):
+        """Download many subtitles with as few calls as possible, of up to :attr:`download_max_subtitles` each."""
+        subtitles = list(subtitles)
+        for start in range(0, len(subtitles), self.download_max_subtitles):
+            call_subtitles = subtitles[start:start + self.download_max_subtitles]
+            logger.info('Downloading subtitles %r', call_subtitles)
+            response = self.call('DownloadSubtitles', [s.id for s in call_subtitles])
+
+            # give the content back to its subtitles
+            contents = {i['idsubtitlefile']: i['data'] for i in response['data'] or []}
+            for subtitle in call_subtitles:
+                if subtitle.id not in contents:
+                    logger.error('Subtitle %r not downloaded', subtitle)
+                    continue
+                subtitle.content = fix_line_ending(zlib.decompress(base64.b64decode(contents[subtitle.id]), 47))
 
 
 class OpenSubtitlesError(ProviderError):
@@ -292,3 +450,35 @@ def checked(response):
         raise OpenSubtitlesError(response['status'])
 
     return response
+
+
+def get_criteria_indexes(subtitle_item, criteria):
+    """Get the indexes of the videos of the criteria that found a subtitle item.
+
+    The criterion is given by the `QueryNumber` of the item or, if missing, by matching its hash, its IMDb id or its
+    `QueryParameters` against the criteria, depending on what it was matched by.
+
+    :param dict subtitle_item: the subtitle item.
+    :param criteria: the criteria of the search, with the index of their video.
+    :type criteria: list of tuple(int, dict)
+    :return: the indexes of the videos.
+    :rtype: set of int
+
+    """
+    if subtitle_item.get('QueryNumber') is not None:
+        return {criteria[int(subtitle_item['QueryNumber'])][0]}
+
+    matched_by = subtitle_item['MatchedBy']
+    query_parameters = subtitle_item.get('QueryParameters') or {}
+    indexes = set()
+    for i, criterion in criteria:
+        if matched_by == 'moviehash':
+            matched = criterion.get('moviehash') == subtitle_item['MovieHash']
+        elif matched_by == 'imdbid':
+            matched = 'imdbid' in criterion and int(criterion['imdbid']) == int(subtitle_item['IDMovieImdb'])
+        else:
+            matched = all(str(v).lower() == str(query_parameters.get(k, '')).lower() for k, v in criterion.items())
+        if matched:
+            indexes.add(i)
+
+    return indexes
@@ -12,14 +12,14 @@ except ImportError:
         import xml.etree.cElementTree as etree
     except ImportError:
         import xml.etree.ElementTree as etree
-from requests import Session
 from zipfile import ZipFile
 
 from . import Provider
 from .. import __short_version__
 from ..exceptions import ProviderError
 from ..subtitle import Subtitle, fix_line_ending, guess_matches
-from ..utils import sanitize
+from ..transport import session_factory
+from ..utils import intern_string, sanitize
 from ..video import Episode, Movie
 
 logger = logging.getLogger(__name__)
@@ -29,12 +29,16 @@ class PodnapisiSubtitle(Subtitle):
     """Podnapisi Subtitle."""
     provider_name = 'podnapisi'
 
+    __slots__ = ('pid', 'releases', 'title', 'season', 'episode', 'year')
+
+    interned_attributes = Subtitle.interned_attributes + ('title',)
+
     def __init__(self, language, hearing_impaired, page_link, pid, releases, title, season=None, episode=None,
                  year=None):
         super(PodnapisiSubtitle, self).__init__(language, hearing_impaired, page_link)
         self.pid = pid
         self.releases = releases
-        self.title = title
+        self.title = intern_string(title)
         self.season = season
         self.episode = episode
         self.year = year
@@ -83,15 +87,23 @@ class PodnapisiProvider(Provider):
     languages = ({Language('por', 'BR'), Language('srp', script='Latn')} |
                  {Language.fromalpha2(l) for l in language_converters['alpha2'].codes})
     server_url = 'http://podnapisi.net/subtitles/'
+    cost = 3
 
     def initialize(self):
-        self.session = Session()
+        self.session = session_factory()
         self.session.headers['User-Agent'] = 'Subliminal/%s' % __short_version__
 
     def terminate(self):
         self.session.close()
 
-    def query(self, language, keyword, season=None, episode=None, year=None):
+    @staticmethod
+    def get_search_params(language, keyword, season=None, episode=None, year=None):
+        """Get the parameters of a search, see :meth:`query`.
+
+        :return: the parameters and whether the search is for an episode.
+        :rtype: tuple(dict, bool)
+
+        """
         # set parameters, see http://www.podnapisi.net/forum/viewtopic.php?f=62&t=26164#p212652
         params = {'sXML': 1, 'sL': str(language), 'sK': keyword}
         is_episode = False
@@ -102,68 +114,112 @@ class PodnapisiProvider(Provider):
         if year:
             params['sY'] = year
 
+        return params, is_episode
+
+    def query(self, language, keyword, season=None, episode=None, year=None):
+        return list(self.iter_query(language, keyword, season=season, episode=episode, year=year))
+
+    def iter_query(self, language, keyword, season=None, episode=None, year=None):
+        """Iterate over the subtitles of a search, see :meth:`query`.
+
+        The pages of results are requested one at a time, only when the subtitles of the previous one are consumed.
+
+        :return: found subtitles, page by page.
+        :rtype: generator of :class:`PodnapisiSubtitle`
+
+        """
+        params, is_episode = self.get_search_params(language, keyword, season=season, episode=episode, year=year)
+
         # loop over paginated results
         logger.info('Searching subtitles %r', params)
-        subtitles = []
         pids = set()
         while True:
             # query the server
-            xml = etree.fromstring(self.session.get(self.server_url + 'search/old', params=params, timeout=10).content)
-
-            # exit if no results
-            if not int(xml.find('pagination/results').text):
-                logger.debug('No subtitles found')
-                break
-
-            # loop over subtitles
-            for subtitle_xml in xml.findall('subtitle'):
-                # read xml elements
-                language = Language.fromietf(subtitle_xml.find('language').text)
-                hearing_impaired = 'n' in (subtitle_xml.find('flags').text or '')
-                page_link = subtitle_xml.find('url').text
-                pid = subtitle_xml.find('pid').text
-                releases = []
-                if subtitle_xml.find('release').text:
-                    for release in subtitle_xml.find('release').text.split():
-                        release = re.sub(r'\.+$', '', release)  # remove trailing dots
-                        release = ''.join(filter(lambda x: ord(x) < 128, release))  # remove non-ascii characters
-                        releases.append(release)
-                title = subtitle_xml.find('title').text
-                season = int(subtitle_xml.find('tvSeason').text)
-                episode = int(subtitle_xml.find('tvEpisode').text)
-                year = int(subtitle_xml.find('year').text)
-
-                if is_episode:
-                    subtitle = PodnapisiSubtitle(language, hearing_impaired, page_link, pid, releases, title,
-                                                 season=season, episode=episode, year=year)
-                else:
-                    subtitle = PodnapisiSubtitle(language, hearing_impaired, page_link, pid, releases, title,
-                                                 year=year)
-
-                # ignore duplicates, see http://www.podnapisi.net/forum/viewtopic.php?f=62&t=26164&start=10#p213321
-                if pid in pids:
-                    continue
-
-                logger.debug('Found subtitle %r', subtitle)
-                subtitles.append(subtitle)
-                pids.add(pid)
+            content = self.session.get(self.server_url + 'search/old', params=params, timeout=10).content
+            page_subtitles, page = self.parse_search_page(content, is_episode, pids)
+            for subtitle in page_subtitles:
+                yield subtitle
 
             # stop on last page
-            if int(xml.find('pagination/current').text) >= int(xml.find('pagination/count').text):
+            if page is None:
                 break
 
             # increment current page
-            params['page'] = int(xml.find('pagination/current').text) + 1
+            params['page'] = page
             logger.debug('Getting page %d', params['page'])
 
-        return subtitles
+    def parse_search_page(self, content, is_episode, pids):
+        """Parse a page of search results.
+
+        :param bytes content: content of the page.
+        :param bool is_episode: whether the search is for an episode.
+        :param set pids: ids of the subtitles already found, updated with the ones of the page.
+        :return: the subtitles of the page and the number of the next page, if any.
+        :rtype: tuple(list of :class:`PodnapisiSubtitle`, int)
+
+        """
+        xml = etree.fromstring(content)
+
+        # exit if no results
+        if not int(xml.find('pagination/results').text):
+            logger.debug('No subtitles found')
+            return [], None
+
+        # loop over subtitles
+        subtitles = []
+        for subtitle_xml in xml.findall('subtitle'):
+            # read xml elements
+            language = Language.fromietf(subtitle_xml.find('language').text)
+            hearing_impaired = 'n' in (subtitle_xml.find('flags').text or '')
+            page_link = subtitle_xml.find('url').text
+            pid = subtitle_xml.find('pid').text
+            releases = []
+            if subtitle_xml.find('release').text:
+                for release in subtitle_xml.find('release').text.split():
+                    release = re.sub(r'\.+$', '', release)  # remove trailing dots
+                    release = ''.join(filter(lambda x: ord(x) < 128, release))  # remove non-ascii characters
+                    releases.append(release)
+            title = subtitle_xml.find('title').text
+            season = int(subtitle_xml.find('tvSeason').text)
+            episode = int(subtitle_xml.find('tvEpisode').text)
+            year = int(subtitle_xml.find('year').text)
+
+            if is_episode:
+                subtitle = PodnapisiSubtitle(language, hearing_impaired, page_link, pid, releases, title,
+                                             season=season, episode=episode, year=year)
+            else:
+                subtitle = PodnapisiSubtitle(language, hearing_impaired, page_link, pid, releases, title,
+                                             year=year)
+
+            # ignore duplicates, see http://www.podnapisi.net/forum/viewtopic.php?f=62&t=26164&start=10#p213321
+            if pid in pids:
+                continue
+
+            logger.debug('Found subtitle %r', subtitle)
+            subtitles.append(subtitle)
+            pids.add(pid)
+
+        # stop on last page
+        if int(xml.find('pagination/current').text) >= int(xml.find('pagination/count').text):
+            return subtitles, None
+
+        return subtitles, int(xml.find('pagination/current').text) + 1
 
     def list_subtitles(self, video, languages):
-        if isinstance(video, Episode):
-            return [s for l in languages for s in self.query(l, video.series, season=video.season,
-                                                             episode=video.episode, year=video.year)]
-        elif isinstance(video, Movie):
-            return [s for l in languages for s in self.query(l, video.title, year=video.year)]
+        return list(self.iter_subtitles(video, languages))
+
+    def iter_subtitles(self, video, languages):
+        for l in languages:
+            if isinstance(video, Episode):
+                subtitles = self.iter_query(l, video.series, season=video.season, episode=video.episode,
+                                            year=video.year)
+            elif isinstance(video, Movie):
+                subtitles = self.iter_query(l, video.title, year=video.year)
+            else:
+                return
+
+            for subtitle in subtitles:
+                yield subtitle
 
     def download_subtitle(self, subtitle):
         # download as a zip
@@ -171,9 +227,19 @@ class PodnapisiProvider(Provider):
         r = self.session.get(self.server_url + subtitle.pid + '/download', params={'container': 'zip'}, timeout=10)
         r.raise_for_status()
 
-        # open the zip
-        with ZipFile(io.BytesIO(r.content)) as zf:
+        subtitle.content = self.extract_content(r.content)
+
+    @staticmethod
+    def extract_content(content):
+        """Extract the content of a subtitle from its downloaded zip.
+
+        :param bytes content: content of the zip.
+        :return: the content of the subtitle.
+        :rtype: bytes
+
+        """
+        with ZipFile(io.BytesIO(content)) as zf:
             if len(zf.namelist()) > 1:
                 raise ProviderError('More than one file to unzip')
 
-            subtitle.content = fix_line_ending(zf.read(zf.namelist()[0]))
+            return fix_line_ending(zf.read(zf.namelist()[0]))
@@ -4,11 +4,11 @@ import logging
 import os
 
 from babelfish import Language, language_converters
-from requests import Session
 
 from . import Provider
 from .. import __short_version__
 from ..subtitle import Subtitle, fix_line_ending
+from ..transport import session_factory
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +19,8 @@ class ShooterSubtitle(Subtitle):
     """Shooter Subtitle."""
     provider_name = 'shooter'
 
+    __slots__ = ('hash', 'download_link')
+
     def __init__(self, language, hash, download_link):
         super(ShooterSubtitle, self).__init__(language)
         self.hash = hash
@@ -41,10 +43,12 @@ class ShooterSubtitle(Subtitle):
 class ShooterProvider(Provider):
     """Shooter Provider."""
     languages = {Language(l) for l in ['eng', 'zho']}
+    video_hash = 'shooter'
     server_url = 'https://www.shooter.cn/api/subapi.php'
+    hash_match = True
 
     def initialize(self):
-        self.session = Session()
+        self.session = session_factory()
         self.session.headers['User-Agent'] = 'Subliminal/%s' % __short_version__
 
     def terminate(self):
@@ -57,13 +61,18 @@ class ShooterProvider(Provider):
         r = self.session.post(self.server_url, params=params, timeout=10)
         r.raise_for_status()
 
+        return self.parse_subtitles(r.content, language, hash)
+
+    @staticmethod
+    def parse_subtitles(content, language, hash=None):
+        """Parse the subtitles from the content of a search, see :meth:`query`."""
         # handle subtitles not found
-        if r.content == b'\xff':
+        if content == b'\xff':
             logger.debug('No subtitles found')
             return []
 
         # parse the subtitles
-        results = json.loads(r.text)
+        results = json.loads(content.decode('utf-8'))
         subtitles = [ShooterSubtitle(language, hash, t['Link']) for s in results for t in s['Files']]
 
         return subtitles
@@ -8,14 +8,14 @@ import zipfile
 
 from babelfish import Language
 from guessit import guessit
-from requests import Session
 
 from . import ParserBeautifulSoup, Provider
 from .. import __short_version__
-from ..cache import SHOW_EXPIRATION_TIME, region
+from ..cache import SHOW_EXPIRATION_TIME, cache_on_arguments
 from ..exceptions import AuthenticationError, ConfigurationError, ProviderError
 from ..subtitle import Subtitle, fix_line_ending, guess_matches
-from ..utils import sanitize
+from ..transport import session_factory
+from ..utils import intern_string, sanitize
 from ..video import Episode, Movie
 
 logger = logging.getLogger(__name__)
@@ -25,10 +25,14 @@ class SubsCenterSubtitle(Subtitle):
     """SubsCenter Subtitle."""
     provider_name = 'subscenter'
 
+    __slots__ = ('series', 'season', 'episode', 'title', 'subtitle_id', 'subtitle_key', 'downloaded', 'releases')
+
+    interned_attributes = Subtitle.interned_attributes + ('series',)
+
     def __init__(self, language, hearing_impaired, page_link, series, season, episode, title, subtitle_id, subtitle_key,
                  downloaded, releases):
         super(SubsCenterSubtitle, self).__init__(language, hearing_impaired, page_link)
-        self.series = series
+        self.series = intern_string(series)
         self.season = season
         self.episode = episode
         self.title = title
@@ -75,6 +79,7 @@ class SubsCenterProvider(Provider):
     """SubsCenter Provider."""
     languages = {Language.fromalpha2(l) for l in ['he']}
     server_url = 'http://www.subscenter.co/he/'
+    cost = 3
 
     def __init__(self, username=None, password=None):
         if username is not None and password is None or username is None and password is not None:
@@ -86,7 +91,7 @@ class SubsCenterProvider(Provider):
         self.logged_in = False
 
     def initialize(self):
-        self.session = Session()
+        self.session = session_factory()
         self.session.headers['User-Agent'] = 'Subliminal/{}'.format(__short_version__)
 
         # login
@@ -119,7 +124,7 @@ class SubsCenterProvider(Provider):
 
         self.session.close()
 
-    @region.cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
+    @cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
     def _search_url_titles(self, title):
         """Search the URL titles by kind for the given `title`.
 
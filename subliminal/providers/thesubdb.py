@@ -2,11 +2,11 @@
 import logging
 
 from babelfish import Language, language_converters
-from requests import Session
 
 from . import Provider
 from .. import __short_version__
 from ..subtitle import Subtitle, fix_line_ending
+from ..transport import session_factory
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +17,8 @@ class TheSubDBSubtitle(Subtitle):
     """TheSubDB Subtitle."""
     provider_name = 'thesubdb'
 
+    __slots__ = ('hash',)
+
     def __init__(self, language, hash):
         super(TheSubDBSubtitle, self).__init__(language)
         self.hash = hash
@@ -39,10 +41,12 @@ class TheSubDBProvider(Provider):
     """TheSubDB Provider."""
     languages = {Language.fromthesubdb(l) for l in language_converters['thesubdb'].codes}
     required_hash = 'thesubdb'
+    video_hash = 'thesubdb'
     server_url = 'http://api.thesubdb.com/'
+    hash_match = True
 
     def initialize(self):
-        self.session = Session()
+        self.session = session_factory()
         self.session.headers['User-Agent'] = ('SubDB/1.0 (subliminal/%s; https://github.com/Diaoul/subliminal)' %
                                               __short_version__)
 
@@ -61,9 +65,14 @@ class TheSubDBProvider(Provider):
             return []
         r.raise_for_status()
 
+        return self.parse_subtitles(r.text, hash)
+
+    @staticmethod
+    def parse_subtitles(text, hash):
+        """Parse the subtitles from the language codes of a search, see :meth:`query`."""
         # loop over languages
         subtitles = []
-        for language_code in r.text.split(','):
+        for language_code in text.split(','):
             language = Language.fromthesubdb(language_code)
 
             subtitle = TheSubDBSubtitle(language, hash)
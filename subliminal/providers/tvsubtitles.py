@@ -6,15 +6,15 @@ from zipfile import ZipFile
 
 from babelfish import Language, language_converters
 from guessit import guessit
-from requests import Session
 
 from . import ParserBeautifulSoup, Provider
 from .. import __short_version__
-from ..cache import EPISODE_EXPIRATION_TIME, SHOW_EXPIRATION_TIME, region
+from ..cache import EPISODE_EXPIRATION_TIME, SHOW_EXPIRATION_TIME, cache_on_arguments
 from ..exceptions import ProviderError
 from ..score import get_equivalent_release_groups
 from ..subtitle import Subtitle, fix_line_ending, guess_matches
-from ..utils import sanitize, sanitize_release_group
+from ..transport import session_factory
+from ..utils import intern_string, sanitize, sanitize_release_group
 from ..video import Episode
 
 logger = logging.getLogger(__name__)
@@ -29,15 +29,19 @@ class TVsubtitlesSubtitle(Subtitle):
     """TVsubtitles Subtitle."""
     provider_name = 'tvsubtitles'
 
+    __slots__ = ('subtitle_id', 'series', 'season', 'episode', 'year', 'rip', 'release')
+
+    interned_attributes = Subtitle.interned_attributes + ('series', 'rip', 'release')
+
     def __init__(self, language, page_link, subtitle_id, series, season, episode, year, rip, release):
         super(TVsubtitlesSubtitle, self).__init__(language, page_link=page_link)
         self.subtitle_id = subtitle_id
-        self.series = series
+        self.series = intern_string(series)
         self.season = season
         self.episode = episode
         self.year = year
-        self.rip = rip
-        self.release = release
+        self.rip = intern_string(rip)
+        self.release = intern_string(release)
 
     @property
     def id(self):
@@ -80,15 +84,16 @@ class TVsubtitlesProvider(Provider):
     ]}
     video_types = (Episode,)
     server_url = 'http://www.tvsubtitles.net/'
+    cost = 3
 
     def initialize(self):
-        self.session = Session()
+        self.session = session_factory()
         self.session.headers['User-Agent'] = 'Subliminal/%s' % __short_version__
 
     def terminate(self):
         self.session.close()
 
-    @region.cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
+    @cache_on_arguments(expiration_time=SHOW_EXPIRATION_TIME)
     def search_show_id(self, series, year=None):
         """Search the show id from the `series` and `year`.
 
@@ -104,8 +109,13 @@ class TVsubtitlesProvider(Provider):
         r = self.session.post(self.server_url + 'search.php', data={'q': series}, timeout=10)
         r.raise_for_status()
 
+        return self.parse_show_id(r.content, series, year)
+
+    @staticmethod
+    def parse_show_id(content, series, year=None):
+        """Parse the show id from the content of the search page, see :meth:`search_show_id`."""
         # get the series out of the suggestions
-        soup = ParserBeautifulSoup(r.content, ['lxml', 'html.parser'])
+        soup = ParserBeautifulSoup(content, ['lxml', 'html.parser'])
         show_id = None
         for suggestion in soup.select('div.left li div a[href^="/tvshow-"]'):
             match = link_re.match(suggestion.text)
@@ -123,7 +133,7 @@ class TVsubtitlesProvider(Provider):
 
         return show_id
 
-    @region.cache_on_arguments(expiration_time=EPISODE_EXPIRATION_TIME)
+    @cache_on_arguments(expiration_time=EPISODE_EXPIRATION_TIME)
     def get_episode_ids(self, show_id, season):
         """Get episode ids from the show id and the season.
 
@@ -136,7 +146,13 @@ class TVsubtitlesProvider(Provider):
         # get the page of the season of the show
         logger.info('Getting the page of show id %d, season %d', show_id, season)
         r = self.session.get(self.server_url + 'tvshow-%d-%d.html' % (show_id, season), timeout=10)
-        soup = ParserBeautifulSoup(r.content, ['lxml', 'html.parser'])
+
+        return self.parse_episode_ids(r.content)
+
+    @staticmethod
+    def parse_episode_ids(content):
+        """Parse the episode ids from the content of the page of a season, see :meth:`get_episode_ids`."""
+        soup = ParserBeautifulSoup(content, ['lxml', 'html.parser'])
 
         # loop over episode rows
         episode_ids = {}
@@ -174,7 +190,12 @@ class TVsubtitlesProvider(Provider):
         # get the episode page
         logger.info('Getting the page for episode %d', episode_ids[episode])
         r = self.session.get(self.server_url + 'episode-%d.html' % episode_ids[episode], timeout=10)
-        soup = ParserBeautifulSoup(r.content, ['lxml', 'html.parser'])
+
+        return self.parse_episode(r.content, series, season, episode, year)
+
+    def parse_episode(self, content, series, season, episode, year=None):
+        """Parse the subtitles from the content of the page of an episode, see :meth:`query`."""
+        soup = ParserBeautifulSoup(content, ['lxml', 'html.parser'])
 
         # loop over subtitles rows
         subtitles = []
@@ -202,9 +223,19 @@ class TVsubtitlesProvider(Provider):
         r = self.session.get(self.server_url + 'download-%d.html' % subtitle.subtitle_id, timeout=10)
         r.raise_for_status()
 
-        # open the zip
-        with ZipFile(io.BytesIO(r.content)) as zf:
+        subtitle.content = self.extract_content(r.content)
+
+    @staticmethod
+    def extract_content(content):
+        """Extract the content of a subtitle from its downloaded zip.
+
+        :param bytes content: content of the zip.
+        :return: the content of the subtitle.
+        :rtype: bytes
+
+        """
+        with ZipFile(io.BytesIO(content)) as zf:
             if len(zf.namelist()) > 1:
                 raise ProviderError('More than one file to unzip')
 
-            subtitle.content = fix_line_ending(zf.read(zf.namelist()[0]))
+            return fix_line_ending(zf.read(zf.namelist()[0]))
@@ -2,10 +2,9 @@
 import logging
 import operator
 
-import requests
-
 from .. import __short_version__
-from ..cache import REFINER_EXPIRATION_TIME, region
+from ..cache import REFINER_EXPIRATION_TIME, cache_on_arguments
+from ..transport import session_factory
 from ..video import Episode, Movie
 from ..utils import sanitize
 
@@ -17,7 +16,7 @@ class OMDBClient(object):
 
     def __init__(self, version=1, session=None, headers=None, timeout=10):
         #: Session for the requests
-        self.session = session or requests.Session()
+        self.session = session or session_factory()
         self.session.timeout = timeout
         self.session.headers.update(headers or {})
         self.session.params['r'] = 'json'
@@ -71,7 +70,7 @@ class OMDBClient(object):
 omdb_client = OMDBClient(headers={'User-Agent': 'Subliminal/%s' % __short_version__})
 
 
-@region.cache_on_arguments(expiration_time=REFINER_EXPIRATION_TIME)
+@cache_on_arguments(expiration_time=REFINER_EXPIRATION_TIME)
 def search(title, type, year):
     results = omdb_client.search(title, type, year)
     if not results:
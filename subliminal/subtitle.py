@@ -8,7 +8,7 @@ import pysrt
 
 from .score import get_equivalent_release_groups
 from .video import Episode, Movie
-from .utils import sanitize, sanitize_release_group
+from .utils import Slotted, intern_string, sanitize, sanitize_release_group
 
 
 logger = logging.getLogger(__name__)
@@ -17,9 +17,12 @@ logger = logging.getLogger(__name__)
 SUBTITLE_EXTENSIONS = ('.srt', '.sub', '.smi', '.txt', '.ssa', '.ass', '.mpl')
 
 
-class Subtitle(object):
+class Subtitle(Slotted):
     """Base class for subtitle.
 
+    The attributes are slotted, so subclasses should declare theirs in ``__slots__`` too, and the strings of repeated
+    values are interned.
+
     :param language: language of the subtitle.
     :type language: :class:`~babelfish.language.Language`
     :param bool hearing_impaired: whether or not the subtitle is hearing impaired.
@@ -32,6 +35,10 @@ class Subtitle(object):
     #: Name of the provider that returns that class of subtitle
     provider_name = ''
 
+    __slots__ = ('language', 'hearing_impaired', 'page_link', 'content', 'encoding')
+
+    interned_attributes = ('encoding',)
+
     def __init__(self, language, hearing_impaired=False, page_link=None, encoding=None):
         #: Language of the subtitle
         self.language = language
@@ -51,7 +58,7 @@ class Subtitle(object):
         # validate the encoding
         if encoding:
             try:
-                self.encoding = codecs.lookup(encoding).name
+                self.encoding = intern_string(codecs.lookup(encoding).name)
             except (TypeError, LookupError):
                 logger.debug('Unsupported encoding %s', encoding)
 
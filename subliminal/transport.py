@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides the HTTP transport shared by the providers and the refiners.
+
+The sessions created by the :data:`session_factory` share the pools of keep-alive connections of a single
+:class:`PooledHTTPAdapter`, so that the connections to a host are reused across the requests, the sessions and their
+providers. The XML-RPC calls go through the keep-alive connection of a :class:`XMLRPCTransport`. The connections
+opened and reused are counted in :data:`connection_stats`.
+
+"""
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from six.moves import xmlrpc_client
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats(object):
+    """Thread-safe counters of the connections opened and reused."""
+    def __init__(self):
+        #: Number of connections opened
+        self.opened = 0
+
+        #: Number of connections reused
+        self.reused = 0
+
+        #: Lock for the counters
+        self.lock = threading.Lock()
+
+    def add(self, reused):
+        """Count a connection.
+
+        :param bool reused: whether the connection is already open.
+
+        """
+        with self.lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.opened += 1
+
+    def reset(self):
+        """Reset the counters."""
+        with self.lock:
+            self.opened = self.reused = 0
+
+    def __repr__(self):
+        return '<%s [opened=%d, reused=%d]>' % (self.__class__.__name__, self.opened, self.reused)
+
+
+#: Connections opened and reused by the :class:`PooledHTTPAdapter` and the :class:`XMLRPCTransport`
+connection_stats = ConnectionStats()
+
+
+class CountingConnectionPoolMixin(object):
+    """Mixin for the connection pools of urllib3, counting their connections in :data:`connection_stats`."""
+    def _get_conn(self, timeout=None):
+        conn = super(CountingConnectionPoolMixin, self)._get_conn(timeout)
+
+        # the connections dropped by the server are closed by the pool, and opened again on the next request
+        connection_stats.add(getattr(conn, 'sock', None) is not None)
+
+        return conn
+
+
+class CountingHTTPConnectionPool(CountingConnectionPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class CountingHTTPSConnectionPool(CountingConnectionPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """A ``requests.adapters.HTTPAdapter`` to share between sessions.
+
+    Its pools count their connections in :data:`connection_stats`, and closing a session keeps them open for the other
+    sessions: they are closed with :meth:`clear`.
+
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super(PooledHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': CountingHTTPConnectionPool,
+                                                   'https': CountingHTTPSConnectionPool}
+
+    def close(self):
+        """Keep the connections open for the other sessions, see :meth:`clear`."""
+
+    def clear(self):
+        """Close the connections of the pools."""
+        super(PooledHTTPAdapter, self).close()
+
+
+class PooledSession(requests.Session):
+    """A ``requests.Session`` sending its HTTP requests through the current adapter of its :class:`SessionFactory`.
+
+    The adapter is looked up on each request, so that the sessions created before a :meth:`SessionFactory.configure`,
+    like the ones of the module-level clients of the refiners, use the configured pools too.
+
+    :param factory: the factory of the session.
+    :type factory: :class:`SessionFactory`
+
+    """
+    def __init__(self, factory):
+        super(PooledSession, self).__init__()
+
+        #: Factory of the session
+        self.factory = factory
+
+    def get_adapter(self, url):
+        if url.lower().startswith(('http://', 'https://')):
+            return self.factory.get_adapter()
+
+        return super(PooledSession, self).get_adapter(url)
+
+
+class SessionFactory(object):
+    """Factory of :class:`PooledSession` sharing the connections of a :class:`PooledHTTPAdapter`.
+
+    :param int pool_connections: number of hosts to keep a pool of connections for.
+    :param int pool_maxsize: maximum number of connections to keep open per host.
+    :param int max_retries: maximum number of retries of the failed connections.
+
+    """
+    def __init__(self, pool_connections=20, pool_maxsize=10, max_retries=0):
+        #: Number of hosts to keep a pool of connections for
+        self.pool_connections = pool_connections
+
+        #: Maximum number of connections to keep open per host
+        self.pool_maxsize = pool_maxsize
+
+        #: Maximum number of retries of the failed connections
+        self.max_retries = max_retries
+
+        #: Adapter shared by the sessions, created when needed
+        self.adapter = None
+
+        #: Lock for the creation of the :attr:`adapter`
+        self.lock = threading.Lock()
+
+    def __call__(self, headers=None):
+        """Create a session.
+
+        :param dict headers: headers of the session.
+        :return: the session.
+        :rtype: :class:`PooledSession`
+
+        """
+        session = PooledSession(self)
+        session.headers.update(headers or {})
+
+        return session
+
+    def configure(self, pool_connections=None, pool_maxsize=None, max_retries=None):
+        """Configure the pools of the sessions, closing the connections of the previous ones.
+
+        The parameters are the same as the ones of the constructor, `None` keeping the current value.
+
+        """
+        with self.lock:
+            if pool_connections is not None:
+                self.pool_connections = pool_connections
+            if pool_maxsize is not None:
+                self.pool_maxsize = pool_maxsize
+            if max_retries is not None:
+                self.max_retries = max_retries
+            adapter, self.adapter = self.adapter, None
+
+        if adapter is not None:
+            adapter.clear()
+
+    def get_adapter(self):
+        """Get the :attr:`adapter`, creating it if needed.
+
+        :return: the adapter.
+        :rtype: :class:`PooledHTTPAdapter`
+
+        """
+        with self.lock:
+            if self.adapter is None:
+                logger.debug('Creating adapter with %d pools of %d connections', self.pool_connections,
+                             self.pool_maxsize)
+                self.adapter = PooledHTTPAdapter(pool_connections=self.pool_connections,
+                                                 pool_maxsize=self.pool_maxsize, max_retries=self.max_retries)
+
+            return self.adapter
+
+    def close(self):
+        """Close the connections of the :attr:`adapter`."""
+        with self.lock:
+            if self.adapter is not None:
+                self.adapter.clear()
+
+
+#: Factory of the sessions of the providers and the refiners
+session_factory = SessionFactory()
+
+
+class XMLRPCTransport(xmlrpc_client.SafeTransport):
+    """Keep-alive transport with timeout support for ``xmlrpc.client.ServerProxy`` over HTTPS.
+
+    The connection to the server is kept alive between the calls, opened again when dropped, and counted in
+    :data:`connection_stats`.
+
+    :param int timeout: timeout of the calls, in seconds.
+
+    """
+    def __init__(self, timeout=None, *args, **kwargs):
+        xmlrpc_client.SafeTransport.__init__(self, *args, **kwargs)
+
+        #: Timeout of the calls
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        # the connection of the previous call is reused if still open
+        reused = self._connection[0] == host and getattr(self._connection[1], 'sock', None) is not None
+        c = xmlrpc_client.SafeTransport.make_connection(self, host)
+        c.timeout = self.timeout
+        connection_stats.add(reused)
+
+        return c
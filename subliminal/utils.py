@@ -1,9 +1,181 @@
 # -*- coding: utf-8 -*-
+import bisect
+from collections import OrderedDict
 from datetime import datetime
 import hashlib
 import os
 import re
 import struct
+import sys
+import threading
+import time
+
+import six
+from six.moves import intern, queue
+
+
+class VideoHash(object):
+    """Base class for the video hash algorithms of :func:`hash_video`.
+
+    A video hash declares the byte ranges of the file it needs with :meth:`get_ranges` and computes the hash from the
+    content of those ranges with :meth:`compute`, so that several algorithms can share the same reads.
+
+    """
+    def get_ranges(self, filesize):
+        """Get the byte ranges of the file required to compute the hash.
+
+        :param int filesize: size of the video file in bytes.
+        :return: the ranges as `(offset, length)` tuples or `None` if the hash cannot be computed.
+        :rtype: list of tuple
+
+        """
+        raise NotImplementedError
+
+    def compute(self, filesize, chunks):
+        """Compute the hash from the content of the ranges.
+
+        :param int filesize: size of the video file in bytes.
+        :param list chunks: content of the ranges returned by :meth:`get_ranges`, in the same order.
+        :return: the hash.
+        :rtype: str
+
+        """
+        raise NotImplementedError
+
+
+class OpenSubtitlesHash(VideoHash):
+    """OpenSubtitles' hash algorithm."""
+    def get_ranges(self, filesize):
+        if filesize < 65536 * 2:
+            return None
+
+        return [(0, 65536), (max(0, filesize - 65536), 65536)]
+
+    def compute(self, filesize, chunks):
+        filehash = filesize
+        for chunk in chunks:
+            # sum the whole chunk as little-endian 64bit numbers with a single unpack
+            filehash += sum(struct.unpack_from('<%dQ' % (len(chunk) // 8), chunk))
+
+        return '%016x' % (filehash & 0xFFFFFFFFFFFFFFFF)  # to remain as 64bit number
+
+
+class TheSubDBHash(VideoHash):
+    """TheSubDB's hash algorithm."""
+    readsize = 64 * 1024
+
+    def get_ranges(self, filesize):
+        if filesize < self.readsize:
+            return None
+
+        return [(0, self.readsize), (filesize - self.readsize, self.readsize)]
+
+    def compute(self, filesize, chunks):
+        return hashlib.md5(b''.join(chunks)).hexdigest()
+
+
+class NapiProjektHash(VideoHash):
+    """NapiProjekt's hash algorithm."""
+    readsize = 1024 * 1024 * 10
+
+    def get_ranges(self, filesize):
+        return [(0, min(filesize, self.readsize))]
+
+    def compute(self, filesize, chunks):
+        return hashlib.md5(chunks[0]).hexdigest()
+
+
+class ShooterHash(VideoHash):
+    """Shooter's hash algorithm."""
+    readsize = 4096
+
+    def get_ranges(self, filesize):
+        if filesize < self.readsize * 2:
+            return None
+
+        offsets = (self.readsize, filesize // 3 * 2, filesize // 3, filesize - self.readsize * 2)
+
+        return [(offset, self.readsize) for offset in offsets]
+
+    def compute(self, filesize, chunks):
+        return ';'.join(hashlib.md5(chunk).hexdigest() for chunk in chunks)
+
+
+#: Available video hashes by name
+video_hashes = {
+    'napiprojekt': NapiProjektHash(),
+    'opensubtitles': OpenSubtitlesHash(),
+    'shooter': ShooterHash(),
+    'thesubdb': TheSubDBHash()
+}
+
+
+def merge_ranges(ranges):
+    """Merge overlapping and contiguous byte ranges.
+
+    :param ranges: the ranges as `(offset, length)` tuples.
+    :type ranges: iterable of tuple
+    :return: the merged ranges, sorted by offset.
+    :rtype: list of tuple
+
+    """
+    merged_ranges = []
+    for offset, length in sorted(ranges):
+        if merged_ranges and offset <= merged_ranges[-1][0] + merged_ranges[-1][1]:
+            merged_offset, merged_length = merged_ranges[-1]
+            merged_ranges[-1] = (merged_offset, max(merged_length, offset + length - merged_offset))
+        else:
+            merged_ranges.append((offset, length))
+
+    return merged_ranges
+
+
+def hash_video(video_path, names=None, filesize=None):
+    """Compute several hashes of a video with a single pass over the file.
+
+    The byte ranges required by each of the :data:`video_hashes` are merged with :func:`merge_ranges` so that every
+    byte is read at most once and shared by all the algorithms.
+
+    :param str video_path: path of the video.
+    :param names: name of the hashes to compute, if not all.
+    :type names: iterable of str
+    :param int filesize: size of the video file in bytes, if already known.
+    :return: the hashes by name, `None` for hashes that cannot be computed.
+    :rtype: dict
+
+    """
+    if names is None:
+        names = video_hashes.keys()
+    if filesize is None:
+        filesize = os.path.getsize(video_path)
+
+    # plan the ranges of each hash
+    hash_ranges = {name: video_hashes[name].get_ranges(filesize) for name in names}
+
+    # read the merged ranges
+    blocks = []
+    merged_ranges = merge_ranges(r for ranges in hash_ranges.values() if ranges is not None for r in ranges)
+    if merged_ranges:
+        with open(video_path, 'rb') as f:
+            for offset, length in merged_ranges:
+                f.seek(offset)
+                blocks.append((offset, f.read(length)))
+    block_offsets = [offset for offset, _ in blocks]
+
+    # compute the hashes from the shared blocks
+    hashes = {}
+    for name, ranges in hash_ranges.items():
+        if ranges is None:
+            hashes[name] = None
+            continue
+
+        chunks = []
+        for offset, length in ranges:
+            block_offset, block = blocks[bisect.bisect_right(block_offsets, offset) - 1]
+            chunks.append(block[offset - block_offset:offset - block_offset + length])
+        hashes[name] = video_hashes[name].compute(filesize, chunks)
+
+    return hashes
 
 
 def hash_opensubtitles(video_path):
@@ -14,26 +186,7 @@ def hash_opensubtitles(video_path):
     :rtype: str
 
     """
-    bytesize = struct.calcsize(b'<q')
-    with open(video_path, 'rb') as f:
-        filesize = os.path.getsize(video_path)
-        filehash = filesize
-        if filesize < 65536 * 2:
-            return
-        for _ in range(65536 // bytesize):
-            filebuffer = f.read(bytesize)
-            (l_value,) = struct.unpack(b'<q', filebuffer)
-            filehash += l_value
-            filehash &= 0xFFFFFFFFFFFFFFFF  # to remain as 64bit number
-        f.seek(max(0, filesize - 65536), 0)
-        for _ in range(65536 // bytesize):
-            filebuffer = f.read(bytesize)
-            (l_value,) = struct.unpack(b'<q', filebuffer)
-            filehash += l_value
-            filehash &= 0xFFFFFFFFFFFFFFFF
-    returnedhash = '%016x' % filehash
-
-    return returnedhash
+    return hash_video(video_path, ['opensubtitles'])['opensubtitles']
 
 
 def hash_thesubdb(video_path):
@@ -44,15 +197,7 @@ def hash_thesubdb(video_path):
     :rtype: str
 
     """
-    readsize = 64 * 1024
-    if os.path.getsize(video_path) < readsize:
-        return
-    with open(video_path, 'rb') as f:
-        data = f.read(readsize)
-        f.seek(-readsize, os.SEEK_END)
-        data += f.read(readsize)
-
-    return hashlib.md5(data).hexdigest()
+    return hash_video(video_path, ['thesubdb'])['thesubdb']
 
 
 def hash_napiprojekt(video_path):
@@ -63,10 +208,7 @@ def hash_napiprojekt(video_path):
     :rtype: str
 
     """
-    readsize = 1024 * 1024 * 10
-    with open(video_path, 'rb') as f:
-        data = f.read(readsize)
-    return hashlib.md5(data).hexdigest()
+    return hash_video(video_path, ['napiprojekt'])['napiprojekt']
 
 
 def hash_shooter(video_path):
@@ -77,22 +219,135 @@ def hash_shooter(video_path):
     :rtype: string
 
     """
-    filesize = os.path.getsize(video_path)
-    readsize = 4096
-    if os.path.getsize(video_path) < readsize * 2:
-        return None
-    offsets = (readsize, filesize // 3 * 2, filesize // 3, filesize - readsize * 2)
-    filehash = []
-    with open(video_path, 'rb') as f:
-        for offset in offsets:
-            f.seek(offset)
-            filehash.append(hashlib.md5(f.read(readsize)).hexdigest())
-    return ';'.join(filehash)
+    return hash_video(video_path, ['shooter'])['shooter']
+
+
+class LRUCache(object):
+    """Bounded in-memory cache, evicting the least recently used values first.
+
+    It is thread-safe and counts its :attr:`hits` and :attr:`misses`.
+
+    :param int maxsize: maximum number of values.
+    :param int ttl: time to live of the values, in seconds. If `None`, the values do not expire.
+
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        #: Maximum number of values
+        self.maxsize = maxsize
+
+        #: Time to live of the values
+        self.ttl = ttl
+
+        #: Values with their expiration time by key, from the least to the most recently used
+        self.values = OrderedDict()
+
+        #: Number of values found in the cache
+        self.hits = 0
+
+        #: Number of values not found in the cache
+        self.misses = 0
+
+        #: Lock for the values
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, key, creator, should_cache_fn=None):
+        """Get the value of `key`, creating it with `creator` if not in the cache.
+
+        :param key: key of the value.
+        :param creator: function without arguments returning the value.
+        :param should_cache_fn: function that takes the created value and returns whether to cache it, if not all.
+        :return: the value.
+
+        """
+        with self.lock:
+            if key in self.values:
+                value, expiration = self.values.pop(key)
+                if expiration is None or expiration > time.time():
+                    self.hits += 1
+                    self.values[key] = (value, expiration)
+                    return value
+            self.misses += 1
+
+        value = creator()
+        if should_cache_fn is None or should_cache_fn(value):
+            self.set(key, value)
+
+        return value
+
+    def set(self, key, value):
+        """Set the value of `key`.
+
+        :param key: key of the value.
+        :param value: the value.
+
+        """
+        with self.lock:
+            self.values.pop(key, None)
+            self.values[key] = (value, time.time() + self.ttl if self.ttl is not None else None)
+            while len(self.values) > self.maxsize:
+                self.values.popitem(last=False)
+
+    def delete(self, key):
+        """Remove the value of `key`, if any.
+
+        :param key: key of the value.
+
+        """
+        with self.lock:
+            self.values.pop(key, None)
+
+    def clear(self):
+        """Remove all the values and reset the counters."""
+        with self.lock:
+            self.values.clear()
+            self.hits = self.misses = 0
+
+
+#: Memoized results of :func:`sanitize`
+sanitize_cache = LRUCache(maxsize=4096)
+
+#: Memoized results of :func:`sanitize_release_group`
+sanitize_release_group_cache = LRUCache(maxsize=1024)
+
+#: Precompiled patterns and translate tables of :func:`sanitize`, by ignored characters
+_sanitize_rules = {}
+
+#: Pattern of the spaces to replace with one space in :func:`sanitize`
+_spaces_re = re.compile(r'\s+')
+
+#: Pattern of the content in square brackets to remove in :func:`sanitize_release_group`
+_square_brackets_re = re.compile(r'\[\w+\]')
+
+
+def _get_sanitize_rules(ignore_characters):
+    """Get the rules of :func:`sanitize` for `ignore_characters`.
+
+    :param frozenset ignore_characters: characters to ignore.
+    :return: the translate table for text strings, and the patterns of the characters to replace with one space and
+        of the characters to remove for byte strings.
+    :rtype: tuple
+
+    """
+    if ignore_characters not in _sanitize_rules:
+        replaced_characters = ''.join(sorted({'-', ':', '(', ')', '.'} - ignore_characters))
+        removed_characters = ''.join(sorted({'\''} - ignore_characters))
+        table = dict((ord(c), u' ') for c in replaced_characters)
+        table.update((ord(c), None) for c in removed_characters)
+        replaced_re = re.compile(r'[%s]' % re.escape(replaced_characters)) if replaced_characters else None
+        removed_re = re.compile(r'[%s]' % re.escape(removed_characters)) if removed_characters else None
+        _sanitize_rules[ignore_characters] = (table, replaced_re, removed_re)
+
+    return _sanitize_rules[ignore_characters]
 
 
 def sanitize(string, ignore_characters=None):
     """Sanitize a string to strip special characters.
 
+    The results are memoized in :data:`sanitize_cache`.
+
     :param str string: the string to sanitize.
     :param set ignore_characters: characters to ignore.
     :return: the sanitized string.
@@ -103,20 +358,25 @@ def sanitize(string, ignore_characters=None):
     if string is None:
         return
 
-    ignore_characters = ignore_characters or set()
+    ignore_characters = frozenset(ignore_characters or ())
+
+    return sanitize_cache.get((string, ignore_characters), lambda: _sanitize(string, ignore_characters))
 
-    # replace some characters with one space
-    characters = {'-', ':', '(', ')', '.'} - ignore_characters
-    if characters:
-        string = re.sub(r'[%s]' % re.escape(''.join(characters)), ' ', string)
 
-    # remove some characters
-    characters = {'\''} - ignore_characters
-    if characters:
-        string = re.sub(r'[%s]' % re.escape(''.join(characters)), '', string)
+def _sanitize(string, ignore_characters):
+    table, replaced_re, removed_re = _get_sanitize_rules(ignore_characters)
+
+    # replace some characters with one space and remove some others
+    if isinstance(string, six.text_type):
+        string = string.translate(table)
+    else:
+        if replaced_re is not None:
+            string = replaced_re.sub(' ', string)
+        if removed_re is not None:
+            string = removed_re.sub('', string)
 
     # replace multiple spaces with one
-    string = re.sub(r'\s+', ' ', string)
+    string = _spaces_re.sub(' ', string)
 
     # strip and lower case
     return string.strip().lower()
@@ -125,6 +385,8 @@ def sanitize(string, ignore_characters=None):
 def sanitize_release_group(string):
     """Sanitize a `release_group` string to remove content in square brackets.
 
+    The results are memoized in :data:`sanitize_release_group_cache`.
+
     :param str string: the release group to sanitize.
     :return: the sanitized release group.
     :rtype: str
@@ -134,11 +396,55 @@ def sanitize_release_group(string):
     if string is None:
         return
 
-    # remove content in square brackets
-    string = re.sub(r'\[\w+\]', '', string)
+    return sanitize_release_group_cache.get(string, lambda: _square_brackets_re.sub('', string).strip().upper())
+
+
+def intern_string(string):
+    """Intern `string` if it is a native string, so that the equal values share the same object.
+
+    :param str string: the string to intern.
+    :return: the interned string, or `string` unchanged if it cannot be interned.
+    :rtype: str
+
+    """
+    if type(string) is str:
+        return intern(string)
 
-    # strip and upper case
-    return string.strip().upper()
+    return string
+
+
+class Slotted(object):
+    """Base class for the objects declaring their attributes in ``__slots__``, without a per-instance ``__dict__``.
+
+    The pickled state is a dict of the attributes so that the objects can be pickled with any protocol and that the
+    pickles of the objects created before their attributes were slotted can still be loaded. When loading, the
+    attributes missing from the state are set to `None` and the strings of the :attr:`interned_attributes` are
+    interned with :func:`intern_string`.
+
+    """
+    __slots__ = ()
+
+    #: Attributes with strings to intern
+    interned_attributes = ()
+
+    def __getstate__(self):
+        state = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        state.update(getattr(self, '__dict__', {}))
+
+        return state
+
+    def __setstate__(self, state):
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                setattr(self, name, None)
+        for name, value in state.items():
+            if name in self.interned_attributes:
+                value = intern_string(value)
+            setattr(self, name, value)
 
 
 def timestamp(date):
@@ -150,3 +456,60 @@ def timestamp(date):
 
     """
     return (date - datetime(1970, 1, 1)).total_seconds()
+
+
+def iter_buffered(iterable, maxsize=10):
+    """Iterate over `iterable` in a background thread, buffering up to `maxsize` items.
+
+    This allows to pipeline two stages, e.g. scanning videos and downloading their subtitles: the `iterable` keeps
+    producing items while they are consumed, and blocks when `maxsize` items are waiting. Exceptions raised by the
+    `iterable` are raised again when reaching them. Closing the returned generator stops the background thread.
+
+    :param iterable: the items to iterate over.
+    :param int maxsize: maximum number of buffered items.
+    :return: the items of `iterable`.
+    :rtype: generator
+
+    """
+    buffer = queue.Queue(maxsize)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    break
+            else:
+                put((end, None))
+        except Exception:
+            put((end, sys.exc_info()))
+        finally:
+            if stop.is_set() and hasattr(iterator, 'close'):
+                iterator.close()
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            item, exc_info = buffer.get()
+            if item is end:
+                if exc_info is not None:
+                    six.reraise(*exc_info)
+                break
+            yield item
+    finally:
+        stop.set()
+        thread.join()
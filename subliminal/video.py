@@ -6,6 +6,8 @@ import os
 
 from guessit import guessit
 
+from .utils import Slotted, intern_string
+
 logger = logging.getLogger(__name__)
 
 #: Video extensions
@@ -18,10 +20,11 @@ VIDEO_EXTENSIONS = ('.3g2', '.3gp', '.3gp2', '.3gpp', '.60d', '.ajp', '.asf', '.
                     '.vob', '.vro', '.wm', '.wmv', '.wmx', '.wrap', '.wvx', '.wx', '.x264', '.xvid')
 
 
-class Video(object):
+class Video(Slotted):
     """Base class for videos.
 
-    Represent a video, existing or not.
+    Represent a video, existing or not. The attributes are slotted and the strings of repeated values like the format,
+    the codecs or the release group are interned.
 
     :param str name: name or path of the video.
     :param str format: format of the video (HDTV, WEB-DL, BluRay, ...).
@@ -35,25 +38,30 @@ class Video(object):
     :param set subtitle_languages: existing subtitle languages.
 
     """
+    __slots__ = ('name', 'format', 'release_group', 'resolution', 'video_codec', 'audio_codec', 'imdb_id', 'hashes',
+                 'size', 'subtitle_languages', 'mtime')
+
+    interned_attributes = ('format', 'release_group', 'resolution', 'video_codec', 'audio_codec')
+
     def __init__(self, name, format=None, release_group=None, resolution=None, video_codec=None, audio_codec=None,
                  imdb_id=None, hashes=None, size=None, subtitle_languages=None):
         #: Name or path of the video
         self.name = name
 
         #: Format of the video (HDTV, WEB-DL, BluRay, ...)
-        self.format = format
+        self.format = intern_string(format)
 
         #: Release group of the video
-        self.release_group = release_group
+        self.release_group = intern_string(release_group)
 
         #: Resolution of the video stream (480p, 720p, 1080p or 1080i)
-        self.resolution = resolution
+        self.resolution = intern_string(resolution)
 
         #: Codec of the video stream
-        self.video_codec = video_codec
+        self.video_codec = intern_string(video_codec)
 
         #: Codec of the main audio stream
-        self.audio_codec = audio_codec
+        self.audio_codec = intern_string(audio_codec)
 
         #: IMDb id of the video
         self.imdb_id = imdb_id
@@ -67,6 +75,9 @@ class Video(object):
         #: Existing subtitle languages
         self.subtitle_languages = subtitle_languages or set()
 
+        #: Modification time of the video file as a timestamp, when known from the scan
+        self.mtime = None
+
     @property
     def exists(self):
         """Test whether the video exists"""
@@ -74,11 +85,15 @@ class Video(object):
 
     @property
     def age(self):
-        """Age of the video"""
-        if self.exists:
-            return datetime.utcnow() - datetime.utcfromtimestamp(os.path.getmtime(self.name))
+        """Age of the video, based on :attr:`mtime` when known"""
+        mtime = self.mtime
+        if mtime is None:
+            try:
+                mtime = os.path.getmtime(self.name)
+            except OSError:
+                return timedelta()
 
-        return timedelta()
+        return datetime.utcnow() - datetime.utcfromtimestamp(mtime)
 
     @classmethod
     def fromguess(cls, name, guess):
@@ -126,12 +141,17 @@ class Episode(Video):
     :param \*\*kwargs: additional parameters for the :class:`Video` constructor.
 
     """
+    __slots__ = ('series', 'season', 'episode', 'title', 'year', 'original_series', 'tvdb_id', 'series_tvdb_id',
+                 'series_imdb_id')
+
+    interned_attributes = Video.interned_attributes + ('series',)
+
     def __init__(self, name, series, season, episode, title=None, year=None, original_series=True, tvdb_id=None,
                  series_tvdb_id=None, series_imdb_id=None, **kwargs):
         super(Episode, self).__init__(name, **kwargs)
 
         #: Series of the episode
-        self.series = series
+        self.series = intern_string(series)
 
         #: Season number of the episode
         self.season = season
@@ -189,6 +209,8 @@ class Movie(Video):
     :param \*\*kwargs: additional parameters for the :class:`Video` constructor.
 
     """
+    __slots__ = ('title', 'year')
+
     def __init__(self, name, title, year=None, **kwargs):
         super(Movie, self).__init__(name, **kwargs)
 
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from unittest.mock import ANY, Mock
+
+from babelfish import Language
+import pytest
+import requests
+
+from subliminal.aio import (AsyncPodnapisiProvider, AsyncProvider, AsyncTheSubDBProvider, AsyncioProviderPool,
+                            Response, download_best_subtitles)
+from subliminal.extensions import provider_manager
+from subliminal.providers.thesubdb import TheSubDBSubtitle
+from subliminal.video import Video
+
+
+@pytest.fixture
+def mock_providers(monkeypatch):
+    for provider in provider_manager:
+        monkeypatch.setattr(provider.plugin, 'initialize', Mock())
+        monkeypatch.setattr(provider.plugin, 'list_subtitles', Mock(return_value=[provider.name]))
+        monkeypatch.setattr(provider.plugin, 'download_subtitle', Mock())
+        monkeypatch.setattr(provider.plugin, 'terminate', Mock())
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def coroutine_mock(return_value=None, side_effect=None):
+    mock = Mock(return_value=return_value, side_effect=side_effect)
+
+    async def wrapper(*args, **kwargs):
+        return mock(*args, **kwargs)
+    wrapper.mock = mock
+    return wrapper
+
+
+def test_response_raise_for_status():
+    Response('http://example.com', 200, b'').raise_for_status()
+    with pytest.raises(requests.HTTPError):
+        Response('http://example.com', 404, b'').raise_for_status()
+
+
+def test_response_text():
+    assert Response('http://example.com', 200, 'é'.encode('latin-1'), 'latin-1').text == 'é'
+
+
+def test_asyncio_provider_pool_list_subtitles(episodes, mock_providers):
+    async def list_subtitles():
+        async with AsyncioProviderPool() as pool:
+            return await pool.list_subtitles(episodes['bbt_s07e05'], {Language('eng')})
+
+    subtitles = run(list_subtitles())
+    assert subtitles == ['addic7ed', 'legendastv', 'opensubtitles', 'podnapisi', 'shooter', 'thesubdb',
+                         'tvsubtitles']
+    for provider in subtitles:
+        assert provider_manager[provider].plugin.initialize.call_count == 1
+        assert provider_manager[provider].plugin.list_subtitles.called
+        assert provider_manager[provider].plugin.terminate.called
+
+
+def test_asyncio_provider_pool_list_subtitles_videos(episodes, mock_providers):
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10']]
+    videos[1].subtitle_languages = {Language('eng')}
+
+    async def list_subtitles_videos():
+        async with AsyncioProviderPool(providers=['addic7ed', 'tvsubtitles']) as pool:
+            return await pool.list_subtitles_videos(videos, {Language('eng')})
+
+    assert run(list_subtitles_videos()) == [(videos[0], ['addic7ed', 'tvsubtitles']), (videos[1], [])]
+    assert provider_manager['addic7ed'].plugin.initialize.call_count == 1
+    assert provider_manager['addic7ed'].plugin.list_subtitles.call_count == 1
+
+
+def test_asyncio_provider_pool_list_subtitles_discard(episodes, mock_providers, monkeypatch):
+    monkeypatch.setattr(provider_manager['addic7ed'].plugin, 'list_subtitles', Mock(side_effect=Exception))
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10']]
+
+    async def list_subtitles():
+        async with AsyncioProviderPool(providers=['addic7ed', 'tvsubtitles']) as pool:
+            listed = [await pool.list_subtitles(v, {Language('eng')}) for v in videos]
+            return pool, listed
+
+    pool, listed = run(list_subtitles())
+    assert listed == [['tvsubtitles'], ['tvsubtitles']]
+    assert pool.discarded_providers == {'addic7ed'}
+    assert provider_manager['addic7ed'].plugin.list_subtitles.call_count == 1
+
+
+def test_asyncio_provider_pool_list_subtitles_coroutine(episodes, mock_providers, monkeypatch):
+    list_subtitles = coroutine_mock(return_value=['async thesubdb'])
+    monkeypatch.setattr(AsyncTheSubDBProvider, 'async_list_subtitles', list_subtitles)
+    session = Mock()
+
+    async def list_subtitles_videos():
+        async with AsyncioProviderPool(providers=['addic7ed', 'thesubdb'], session=session) as pool:
+            listed = await pool.list_subtitles_videos([episodes['bbt_s07e05']], {Language('eng')})
+            return pool.initialized_providers['thesubdb'], listed
+
+    provider, listed = run(list_subtitles_videos())
+    assert listed == [(episodes['bbt_s07e05'], ['addic7ed', 'async thesubdb'])]
+    assert isinstance(provider, AsyncTheSubDBProvider)
+    assert provider.async_session is session
+    assert not provider_manager['thesubdb'].plugin.list_subtitles.called
+    assert list_subtitles.mock.call_count == 1
+    assert not session.close.called
+
+
+def test_asyncio_provider_pool_list_subtitles_stop_on_hash_match(episodes, mock_providers, monkeypatch):
+    video = episodes['bbt_s07e05']
+    subtitle = TheSubDBSubtitle(Language('eng'), video.hashes['thesubdb'])
+    monkeypatch.setattr(AsyncTheSubDBProvider, 'async_list_subtitles', coroutine_mock(return_value=[subtitle]))
+    monkeypatch.setattr(provider_manager['addic7ed'].plugin, 'list_subtitles',
+                        Mock(side_effect=lambda *args: time.sleep(0.2) or ['addic7ed']))
+
+    async def list_subtitles():
+        async with AsyncioProviderPool(providers=['addic7ed', 'thesubdb'], session=Mock(),
+                                       stop_on_hash_match=True) as pool:
+            return pool, await pool.list_subtitles(video, {Language('eng')})
+
+    pool, subtitles = run(list_subtitles())
+    assert subtitles == [subtitle]
+    assert pool.discarded_providers == set()
+
+
+def test_asyncio_provider_pool_download_best_subtitles(episodes, mock_providers, monkeypatch):
+    monkeypatch.setattr(TheSubDBSubtitle, 'is_valid', Mock(return_value=True))
+    download_subtitle = coroutine_mock()
+    monkeypatch.setattr(AsyncTheSubDBProvider, 'async_download_subtitle', download_subtitle)
+    subtitles = [TheSubDBSubtitle(Language('eng'), 'a'), TheSubDBSubtitle(Language('eng'), 'b')]
+
+    async def download():
+        async with AsyncioProviderPool(providers=['thesubdb'], session=Mock()) as pool:
+            return await pool.download_best_subtitles(subtitles, episodes['bbt_s07e05'], {Language('eng')},
+                                                      compute_score=Mock(side_effect=[1, 2]))
+
+    assert run(download()) == [subtitles[1]]
+    download_subtitle.mock.assert_called_once_with(ANY, subtitles[1])
+
+
+def test_download_best_subtitles(episodes, mock_providers, monkeypatch):
+    video = episodes['bbt_s07e05']
+    subtitle = TheSubDBSubtitle(Language('eng'), 'a')
+    monkeypatch.setattr(provider_manager['thesubdb'].plugin, 'list_subtitles', Mock(return_value=[subtitle]))
+    monkeypatch.setattr(TheSubDBSubtitle, 'is_valid', Mock(return_value=True))
+
+    downloaded = run(download_best_subtitles([video], {Language('eng')}, providers=['thesubdb']))
+    assert downloaded == {video: [subtitle]}
+    assert provider_manager['thesubdb'].plugin.download_subtitle.called
+
+
+def test_async_provider_request(monkeypatch):
+    monkeypatch.setattr('subliminal.aio.aiohttp', Mock())
+
+    class ClientResponse(object):
+        url = 'http://example.com/?hash=a'
+        status = 200
+        charset = None
+
+        async def read(self):
+            return b'en,fr'
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc_value, traceback):
+            pass
+
+    session = Mock()
+    session.request.return_value = ClientResponse()
+    provider = AsyncTheSubDBProvider()
+    provider.session = requests.Session()
+    provider.session.headers['User-Agent'] = 'test'
+    provider.async_initialize(session)
+
+    subtitles = run(provider.async_query('a'))
+    assert [s.language for s in subtitles] == [Language('eng'), Language('fra')]
+    assert all(isinstance(s, TheSubDBSubtitle) and s.hash == 'a' for s in subtitles)
+    assert session.request.call_args[0] == ('GET', AsyncTheSubDBProvider.server_url)
+    assert session.request.call_args[1]['params'] == {'action': 'search', 'hash': 'a'}
+    assert session.request.call_args[1]['headers']['User-Agent'] == 'test'
+
+
+def test_async_provider_not_implemented():
+    with pytest.raises(NotImplementedError):
+        run(AsyncProvider().async_list_subtitles(None, set()))
+
+
+def test_async_podnapisi_provider_list_subtitles_unsupported_video():
+    provider = AsyncPodnapisiProvider()
+    assert run(provider.async_list_subtitles(Video('video.mkv'), {Language('eng')})) == []
+
+
+def test_async_podnapisi_provider_query_error():
+    provider = AsyncPodnapisiProvider()
+    provider.request = coroutine_mock(Response('http://podnapisi.net/subtitles/search/old', 500, b'<html></html>'))
+    with pytest.raises(requests.HTTPError):
+        run(provider.async_query(Language('eng'), 'The Big Bang Theory', season=7, episode=5))
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+import threading
+import time
+
+from dogpile.cache import make_region
+from dogpile.cache.api import NO_VALUE
+import pytest
+
+import subliminal.cache
+
+from subliminal.cache import (FileMutex, FileStore, AsyncCreationRunner, MemoryProxy, Miss, SQLiteBackend,
+                              cache_on_arguments)
+
+
+def make_sqlite_region(filename):
+    return make_region().configure('subliminal.sqlite', arguments={'filename': filename})
+
+
+def create_values(filename, log_filename, keys):
+    """Get or create the values of `keys` in a new region, logging the creations."""
+    region = make_sqlite_region(filename)
+
+    def creator(key):
+        def create():
+            time.sleep(0.05)
+            with open(log_filename, 'a') as f:
+                f.write('%s\n' % key)
+            return key, os.getpid()
+        return create
+
+    return [region.get_or_create(key, creator(key)) for key in keys]
+
+
+def test_sqlite_backend(tmpdir):
+    region = make_sqlite_region(str(tmpdir.join('cache.sqlite')))
+    assert region.get('a') is NO_VALUE
+    region.set('a', {'b': [1, 2]})
+    assert region.get('a') == {'b': [1, 2]}
+    region.set_multi({'c': 3, 'd': 4})
+    assert region.get_multi(['a', 'c', 'd', 'e']) == [{'b': [1, 2]}, 3, 4, NO_VALUE]
+    region.delete_multi(['a', 'c'])
+    assert region.get_multi(['a', 'c', 'd']) == [NO_VALUE, NO_VALUE, 4]
+
+
+def test_sqlite_backend_persistence(tmpdir):
+    filename = str(tmpdir.join('cache.sqlite'))
+    make_sqlite_region(filename).set('a', 1)
+    assert make_sqlite_region(filename).get('a') == 1
+    assert SQLiteBackend({'filename': filename})._get_connection().execute('PRAGMA journal_mode').fetchone()[0] == \
+        'wal'
+
+
+def test_sqlite_backend_mutex(tmpdir):
+    backend = SQLiteBackend({'filename': str(tmpdir.join('cache.sqlite')), 'lock_slots': 8})
+    mutex = backend.get_mutex('a')
+    assert isinstance(mutex, FileMutex)
+    assert mutex.acquire()
+    assert mutex.locked()
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(backend.get_mutex('a').acquire(False)))
+    thread.start()
+    thread.join()
+    assert acquired == [False]
+    mutex.release()
+    assert not mutex.locked()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_sqlite_backend_concurrent_processes(tmpdir):
+    filename = str(tmpdir.join('cache.sqlite'))
+    log_filename = str(tmpdir.join('creations.log'))
+    keys = ['key%d' % i for i in range(20)]
+    pool = multiprocessing.Pool(4)
+    try:
+        results = [pool.apply_async(create_values, (filename, log_filename, keys[i:] + keys[:i]))
+                   for i in range(0, 20, 5)]
+        values = [r.get(timeout=60) for r in results]
+    finally:
+        pool.terminate()
+        pool.join()
+
+    # each value is created once and read by all the processes
+    with open(log_filename) as f:
+        assert sorted(f.read().split()) == sorted(keys)
+    expected = dict(zip(keys, values[0]))
+    for i, process_values in zip(range(0, 20, 5), values):
+        assert dict(zip(keys[i:] + keys[:i], process_values)) == expected
+
+
+@pytest.mark.parametrize('backend', ['subliminal.sqlite', 'dogpile.cache.dbm'])
+def test_memory_proxy(tmpdir, backend):
+    memory_proxy = MemoryProxy(maxsize=2)
+    region = make_region().configure(backend, expiration_time=60, wrap=[memory_proxy],
+                                     arguments={'filename': str(tmpdir.join('cache'))})
+    assert region.get('a') is NO_VALUE
+    region.set('a', 1)
+    assert region.get('a') == 1
+    assert region.get('a') == 1
+    assert (memory_proxy.hits, memory_proxy.misses) == (2, 1)
+
+    # missing values are not kept in memory
+    assert region.get('b') is NO_VALUE
+    assert region.get('b') is NO_VALUE
+    assert memory_proxy.misses == 3
+
+    # the values are evicted or deleted from memory and written to the backend
+    region.set_multi({'b': 2, 'c': 3})
+    assert len(memory_proxy.memory) == 2
+    assert region.get('a') == 1
+    assert memory_proxy.misses == 4
+    region.delete('a')
+    assert region.get('a') is NO_VALUE
+
+
+@pytest.mark.parametrize('backend', ['subliminal.sqlite', 'dogpile.cache.dbm'])
+def test_memory_proxy_copies(tmpdir, backend):
+    memory_proxy = MemoryProxy()
+    region = make_region().configure(backend, expiration_time=60, wrap=[memory_proxy],
+                                     arguments={'filename': str(tmpdir.join('cache'))})
+
+    @region.cache_on_arguments()
+    def search(name):
+        return {1: name}
+
+    # the values changed by a caller are not changed in memory
+    search('a').update({2: 'b'})
+    search('a').update({2: 'b'})
+    assert search('a') == {1: 'a'}
+    assert memory_proxy.hits == 2
+
+
+def test_memory_proxy_expiration(tmpdir):
+    memory_proxy = MemoryProxy()
+    region = make_region().configure('subliminal.sqlite', expiration_time=60, wrap=[memory_proxy],
+                                     arguments={'filename': str(tmpdir.join('cache.sqlite'))})
+    calls = []
+
+    @region.cache_on_arguments(expiration_time=0.1)
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    assert double(1) == 2
+    assert double(1) == 2
+    assert calls == [1]
+    assert memory_proxy.hits == 1
+
+    # the values kept in memory expire with the region
+    time.sleep(0.2)
+    assert double(1) == 2
+    assert calls == [1, 1]
+
+
+def test_file_store(tmpdir):
+    file_store = FileStore(str(tmpdir), max_size=10)
+    assert file_store.get('a') is None
+    path = file_store.set('a', b'aaaa')
+    assert file_store.get('a') == path
+    assert file_store.read('a') == b'aaaa'
+    with file_store.open('a') as f:
+        assert f.read() == b'aaaa'
+
+    # the least recently used files are evicted first
+    file_store.set('b', b'bbbb')
+    os.utime(path, (time.time() + 1, time.time() + 1))
+    file_store.set('c', b'cccc')
+    assert file_store.get('a') == path
+    assert file_store.get('b') is None
+    assert file_store.get('c') is not None
+
+    # a file larger than the store is kept until the next one
+    file_store.set('d', b'd' * 20)
+    assert file_store.get('d') is not None
+    assert file_store.get('a') is None
+    assert file_store.get('c') is None
+
+    file_store.delete('d')
+    assert file_store.get('d') is None
+    assert file_store.read('d') is None
+    assert file_store.open('d') is None
+
+
+def test_file_store_disabled():
+    file_store = FileStore()
+    assert file_store.set('a', b'aaaa') is None
+    assert file_store.get('a') is None
+
+
+def test_cache_on_arguments_miss(tmpdir, monkeypatch):
+    region = make_sqlite_region(str(tmpdir.join('cache.sqlite')))
+    monkeypatch.setattr(subliminal.cache, 'region', region)
+    results = {'a': None, 'b': 2}
+    calls = []
+
+    class Lookup(object):
+        @cache_on_arguments(expiration_time=60, miss_expiration_time=0.1)
+        def search(self, name):
+            calls.append(name)
+            return results[name]
+
+    assert Lookup().search('a') is None
+    assert Lookup().search('b') == 2
+    assert Lookup().search('a') is None
+    assert Lookup().search('b') == 2
+    assert calls == ['a', 'b']
+    assert isinstance(region.get('test_cache:search|a'), Miss)
+    assert region.get('test_cache:search|b') == 2
+
+    # the misses expire first
+    time.sleep(0.2)
+    results['a'] = 1
+    assert Lookup().search('a') == 1
+    assert Lookup().search('b') == 2
+    assert calls == ['a', 'b', 'a']
+    assert region.get('test_cache:search|a') == 1
+
+
+def test_cache_on_arguments_get_set_cached(tmpdir, monkeypatch):
+    region = make_sqlite_region(str(tmpdir.join('cache.sqlite')))
+    monkeypatch.setattr(subliminal.cache, 'region', region)
+    calls = []
+
+    class Lookup(object):
+        @cache_on_arguments(expiration_time=60, miss_expiration_time=0.1)
+        def search(self, name):
+            calls.append(name)
+            return name.upper()
+
+    # the results set from outside are the ones of the lookup
+    assert Lookup.search.get_cached(Lookup(), 'a') is NO_VALUE
+    Lookup.search.set_cached('A', Lookup(), 'a')
+    Lookup.search.set_cached(None, Lookup(), 'b')
+    assert Lookup().search('a') == 'A'
+    assert Lookup().search('b') is None
+    assert calls == []
+
+    # and the other way around, the misses expiring first
+    assert Lookup().search('c') == 'C'
+    assert Lookup.search.get_cached(Lookup(), 'c') == 'C'
+    assert Lookup.search.get_cached(Lookup(), 'b') is None
+    time.sleep(0.2)
+    assert Lookup.search.get_cached(Lookup(), 'b') is NO_VALUE
+
+
+@pytest.mark.parametrize('stale', [False, True])
+def test_cache_on_arguments_refresh(tmpdir, monkeypatch, stale):
+    runner = AsyncCreationRunner()
+    region = make_region(async_creation_runner=runner).configure(
+        'subliminal.sqlite', arguments={'filename': str(tmpdir.join('cache.sqlite'))})
+    monkeypatch.setattr(subliminal.cache, 'region', region)
+    if stale:
+        monkeypatch.setattr(subliminal.cache, 'stale_expiration_times', {0.1})
+    results = {'a': 1}
+
+    @cache_on_arguments(expiration_time=0.1)
+    def search(name):
+        return results[name]
+
+    @region.cache_on_arguments(expiration_time=0.1)
+    def other_search(name):
+        return results[name]
+
+    assert search('a') == 1
+    assert other_search('a') == 1
+    time.sleep(0.2)
+    results['a'] = 2
+
+    # the expired value is returned while refreshed in the background, or refreshed first
+    assert search('a') == (1 if stale else 2)
+    runner.join()
+    assert not runner.threads
+    assert region.get('test_cache:search|a', ignore_expiration=True) == 2
+
+    # the other functions of the region are never served stale
+    assert other_search('a') == 2
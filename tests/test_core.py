@@ -1,21 +1,27 @@
 # -*- coding: utf-8 -*-
+from collections import Counter
 from datetime import datetime, timedelta
 import io
+import logging
 import os
+import random
+import threading
+import time
 
 from babelfish import Language
 import pytest
 
 try:
-    from unittest.mock import Mock
+    from unittest.mock import ANY, MagicMock, Mock
 except ImportError:
-    from mock import Mock
+    from mock import ANY, MagicMock, Mock
 from vcr import VCR
 
 from subliminal.core import (AsyncProviderPool, ProviderPool, check_video, download_best_subtitles, download_subtitles,
-                             list_subtitles, refine, save_subtitles, scan_archive, scan_video, scan_videos,
-                             search_external_subtitles)
+                             get_video_hashes, iter_videos, list_subtitles, refine, save_subtitles, scan_archive,
+                             scan_video, scan_videos, scan_videos_parallel, search_external_subtitles)
 from subliminal.extensions import provider_manager
+from subliminal.index import DirectoryIndex, ScanIndex
 from subliminal.providers.addic7ed import Addic7edSubtitle
 from subliminal.providers.thesubdb import TheSubDBSubtitle
 from subliminal.providers.tvsubtitles import TVsubtitlesSubtitle
@@ -77,6 +83,67 @@ def test_provider_pool_list_subtitles(episodes, mock_providers):
         assert provider_manager[provider].plugin.list_subtitles.called
 
 
+def test_provider_pool_iter_subtitles(episodes, mock_providers):
+    pool = ProviderPool(providers=['addic7ed', 'shooter', 'tvsubtitles'])
+    subtitles = pool.iter_subtitles(episodes['bbt_s07e05'], {Language('eng')})
+    assert next(subtitles) == 'addic7ed'
+    assert next(subtitles) == 'shooter'
+    subtitles.close()
+    assert not provider_manager['tvsubtitles'].plugin.initialize.called
+    assert not provider_manager['tvsubtitles'].plugin.list_subtitles.called
+    assert pool.discarded_providers == set()
+
+
+def test_provider_pool_iter_subtitles_discard(episodes, mock_providers, monkeypatch):
+    def iter_subtitles(self, video, languages):
+        yield 'addic7ed'
+        raise Exception
+
+    monkeypatch.setattr(provider_manager['addic7ed'].plugin, 'iter_subtitles', iter_subtitles)
+    pool = ProviderPool(providers=['addic7ed', 'tvsubtitles'])
+    subtitles = list(pool.iter_subtitles(episodes['bbt_s07e05'], {Language('eng')}))
+    assert subtitles == ['addic7ed', 'tvsubtitles']
+    assert pool.discarded_providers == {'addic7ed'}
+    assert list(pool.iter_subtitles(episodes['bbt_s07e05'], {Language('eng')})) == ['tvsubtitles']
+
+
+def test_provider_pool_list_subtitles_stop_on_hash_match(episodes, mock_providers, monkeypatch):
+    video = episodes['bbt_s07e05']
+    subtitle = TheSubDBSubtitle(Language('eng'), video.hashes['thesubdb'])
+    monkeypatch.setattr(provider_manager['thesubdb'].plugin, 'list_subtitles', Mock(return_value=[subtitle]))
+    pool = ProviderPool(providers=['addic7ed', 'thesubdb', 'tvsubtitles'], stop_on_hash_match=True)
+    assert pool.list_subtitles(video, {Language('eng')}) == [subtitle]
+    assert not provider_manager['addic7ed'].plugin.initialize.called
+    assert not provider_manager['tvsubtitles'].plugin.initialize.called
+
+
+def test_provider_pool_list_subtitles_stop_on_hash_match_missing_language(episodes, mock_providers, monkeypatch):
+    video = episodes['bbt_s07e05']
+    subtitle = TheSubDBSubtitle(Language('eng'), video.hashes['thesubdb'])
+    monkeypatch.setattr(provider_manager['thesubdb'].plugin, 'list_subtitles', Mock(return_value=[subtitle]))
+    pool = ProviderPool(providers=['addic7ed', 'thesubdb', 'tvsubtitles'], stop_on_hash_match=True)
+    subtitles = pool.list_subtitles(video, {Language('eng'), Language('fra')})
+    assert subtitles == [subtitle, 'addic7ed', 'tvsubtitles']
+
+
+def test_provider_pool_get_providers():
+    pool = ProviderPool(providers=['legendastv', 'addic7ed', 'opensubtitles', 'thesubdb'])
+    assert pool._get_providers() == ['legendastv', 'addic7ed', 'opensubtitles', 'thesubdb']
+    pool.stop_on_hash_match = True
+    assert pool._get_providers() == ['thesubdb', 'opensubtitles', 'addic7ed', 'legendastv']
+
+
+def test_async_provider_pool_list_subtitles_stop_on_hash_match(episodes, mock_providers, monkeypatch):
+    video = episodes['bbt_s07e05']
+    subtitle = TheSubDBSubtitle(Language('eng'), video.hashes['thesubdb'])
+    monkeypatch.setattr(provider_manager['thesubdb'].plugin, 'list_subtitles', Mock(return_value=[subtitle]))
+    with AsyncProviderPool(max_workers=1, providers=['addic7ed', 'tvsubtitles', 'thesubdb'],
+                           stop_on_hash_match=True) as pool:
+        listed = list(pool.list_subtitles_videos([video, episodes['got_s03e10']], {Language('eng')}))
+    assert listed == [(video, [subtitle]), (episodes['got_s03e10'], [subtitle, 'addic7ed', 'tvsubtitles'])]
+    assert pool.discarded_providers == set()
+
+
 def test_async_provider_pool_list_subtitles_provider(episodes, mock_providers):
     pool = AsyncProviderPool()
     subtitles = pool.list_subtitles_provider('tvsubtitles', episodes['bbt_s07e05'], {Language('eng')})
@@ -95,6 +162,178 @@ def test_async_provider_pool_list_subtitles(episodes, mock_providers):
         assert provider_manager[provider].plugin.list_subtitles.called
 
 
+def test_provider_pool_list_subtitles_videos(episodes, mock_providers):
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10']]
+    pool = ProviderPool(providers=['addic7ed', 'tvsubtitles'])
+    listed = list(pool.list_subtitles_videos(videos, {Language('eng')}))
+    assert listed == [(videos[0], ['addic7ed', 'tvsubtitles']), (videos[1], ['addic7ed', 'tvsubtitles'])]
+
+
+@pytest.mark.parametrize('pool_class', [ProviderPool, AsyncProviderPool])
+def test_provider_pool_list_subtitles_videos_batch(episodes, mock_providers, monkeypatch, pool_class):
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10'], episodes['dallas_s01e03']]
+    list_subtitles_batch = Mock(side_effect=lambda pairs: [['batch']] * len(pairs))
+    monkeypatch.setattr(provider_manager['opensubtitles'].plugin, 'list_subtitles_batch', list_subtitles_batch)
+    with pool_class(providers=['addic7ed', 'opensubtitles'], batch_size=2) as pool:
+        listed = list(pool.list_subtitles_videos(iter(videos), {Language('eng')}))
+    assert listed == [(v, ['addic7ed', 'batch']) for v in videos]
+    assert [len(c[0][0]) for c in list_subtitles_batch.call_args_list] == [2, 1]
+    assert not provider_manager['opensubtitles'].plugin.list_subtitles.called
+    assert provider_manager['addic7ed'].plugin.list_subtitles.call_count == 3
+
+
+def test_async_provider_pool_list_subtitles_videos(episodes, mock_providers):
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10'], episodes['dallas_s01e03']]
+    languages = {Language('eng')}
+    with AsyncProviderPool(providers=['addic7ed', 'podnapisi', 'tvsubtitles']) as pool:
+        listed = dict(pool.list_subtitles_videos(iter(videos), languages))
+        executor = pool.executor
+        assert pool.list_subtitles(videos[0], languages) == ['addic7ed', 'podnapisi', 'tvsubtitles']
+        assert pool.executor is executor
+    assert pool.executor is None
+    assert listed == {v: ['addic7ed', 'podnapisi', 'tvsubtitles'] for v in videos}
+    assert provider_manager['addic7ed'].plugin.list_subtitles.call_count == 4
+
+
+def test_async_provider_pool_list_subtitles_videos_skip_languages(episodes, mock_providers):
+    video = episodes['bbt_s07e05']
+    video.subtitle_languages = {Language('eng')}
+    with AsyncProviderPool(providers=['addic7ed']) as pool:
+        assert list(pool.list_subtitles_videos([video], {Language('eng')})) == [(video, [])]
+    assert not provider_manager['addic7ed'].plugin.list_subtitles.called
+
+
+def test_async_provider_pool_list_subtitles_videos_provider_max_workers(episodes, mock_providers, monkeypatch):
+    lock = threading.Lock()
+    concurrent_calls = Counter()
+    max_concurrent_calls = Counter()
+
+    def list_subtitles(name):
+        def wrapper(video, languages):
+            with lock:
+                concurrent_calls[name] += 1
+                max_concurrent_calls[name] = max(max_concurrent_calls[name], concurrent_calls[name])
+            time.sleep(0.05)
+            with lock:
+                concurrent_calls[name] -= 1
+            return [name]
+        return Mock(side_effect=wrapper)
+    for name in ('addic7ed', 'tvsubtitles'):
+        monkeypatch.setattr(provider_manager[name].plugin, 'list_subtitles', list_subtitles(name))
+
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10'], episodes['dallas_s01e03'], episodes['csi_s15e18']]
+    with AsyncProviderPool(max_workers=4, providers=['addic7ed', 'tvsubtitles'],
+                           provider_max_workers={'tvsubtitles': 3}) as pool:
+        listed = list(pool.list_subtitles_videos(videos, {Language('eng')}))
+    assert sorted(v.name for v, _ in listed) == sorted(v.name for v in videos)
+    assert max_concurrent_calls == {'addic7ed': 1, 'tvsubtitles': 3}
+
+
+def test_async_provider_pool_list_subtitles_videos_discard(episodes, mock_providers, monkeypatch):
+    monkeypatch.setattr(provider_manager['addic7ed'].plugin, 'list_subtitles', Mock(side_effect=Exception))
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10']]
+    with AsyncProviderPool(max_workers=1, providers=['addic7ed', 'tvsubtitles']) as pool:
+        listed = list(pool.list_subtitles_videos(videos, {Language('eng')}))
+    assert listed == [(videos[0], ['tvsubtitles']), (videos[1], ['tvsubtitles'])]
+    assert pool.discarded_providers == {'addic7ed'}
+    assert provider_manager['addic7ed'].plugin.list_subtitles.call_count == 1
+
+
+def mock_downloads(monkeypatch, outcomes, delay=0):
+    """Make the subtitles download as `valid`, `invalid` or `error`, by subtitle."""
+    def download_subtitle(subtitle):
+        time.sleep(delay)
+        if outcomes[subtitle] == 'error':
+            raise Exception
+        subtitle.content = outcomes[subtitle].encode('ascii')
+    for provider in provider_manager:
+        monkeypatch.setattr(provider.plugin, 'download_subtitle', Mock(side_effect=download_subtitle))
+    monkeypatch.setattr(SpeculativeSubtitle, 'is_valid', lambda self: self.content == b'valid')
+
+
+class SpeculativeSubtitle(Subtitle):
+    def __init__(self, provider_name, language, subtitle_id):
+        super(SpeculativeSubtitle, self).__init__(Language.fromietf(language))
+        self.provider_name = provider_name
+        self.subtitle_id = subtitle_id
+
+    @property
+    def id(self):
+        return str(self.subtitle_id)
+
+
+def make_subtitles(*pairs):
+    return [SpeculativeSubtitle(provider_name, language, i) for i, (provider_name, language) in enumerate(pairs)]
+
+
+def test_async_provider_pool_download_best_subtitles_speculative(episodes, mock_providers, monkeypatch):
+    video = episodes['bbt_s07e05']
+    languages = {Language('eng'), Language('fra'), Language('deu')}
+    names = ['addic7ed', 'podnapisi', 'tvsubtitles']
+    rng = random.Random(42)
+    for _ in range(30):
+        subtitles = make_subtitles(*[(rng.choice(names), rng.choice(['en', 'fr', 'de'])) for _ in range(12)])
+        scores = {s: rng.randint(0, 10) for s in subtitles}
+        outcomes = {s: rng.choice(['valid', 'valid', 'invalid', 'error']) for s in subtitles}
+        mock_downloads(monkeypatch, outcomes)
+        kwargs = dict(min_score=2, only_one=rng.random() < 0.2,
+                      compute_score=lambda s, v, hearing_impaired: scores[s])
+
+        with ProviderPool(providers=names) as pool:
+            expected = pool.download_best_subtitles(subtitles, video, languages, **kwargs)
+            expected_discarded = pool.discarded_providers
+        with AsyncProviderPool(providers=names, speculative_downloads=3) as pool:
+            downloaded = pool.download_best_subtitles(subtitles, video, languages, **kwargs)
+            discarded = pool.discarded_providers
+
+        assert downloaded == expected
+        assert discarded == expected_discarded
+
+
+def test_async_provider_pool_download_best_subtitles_speculative_cancel(episodes, mock_providers, monkeypatch):
+    subtitles = make_subtitles(*[('addic7ed', 'en')] * 4 + [('podnapisi', 'fr')])
+    outcomes = {s: 'valid' for s in subtitles}
+    outcomes[subtitles[0]] = 'invalid'
+    mock_downloads(monkeypatch, outcomes, delay=0.05)
+    scores = {s: 10 - i for i, s in enumerate(subtitles)}
+
+    with AsyncProviderPool(max_workers=1, providers=['addic7ed', 'podnapisi'], provider_max_workers={'addic7ed': 2},
+                           speculative_downloads=2) as pool:
+        downloaded = pool.download_best_subtitles(subtitles, episodes['bbt_s07e05'], {Language('eng'), Language('fra')},
+                                                  compute_score=lambda s, v, **kw: scores[s])
+
+    assert downloaded == [subtitles[1], subtitles[4]]
+    # the download of subtitles[2] was submitted when subtitles[0] was found invalid and cancelled before it started
+    downloads = [c[0][0] for c in provider_manager['addic7ed'].plugin.download_subtitle.call_args_list]
+    assert downloads == subtitles[:2]
+
+
+def test_async_provider_pool_download_best_subtitles_speculative_max_workers(episodes, mock_providers, monkeypatch):
+    lock = threading.Lock()
+    concurrent_calls = Counter()
+    max_concurrent_calls = Counter()
+
+    def download_subtitle(subtitle):
+        with lock:
+            concurrent_calls[subtitle.provider_name] += 1
+            max_concurrent_calls[subtitle.provider_name] = max(max_concurrent_calls[subtitle.provider_name],
+                                                               concurrent_calls[subtitle.provider_name])
+        time.sleep(0.05)
+        with lock:
+            concurrent_calls[subtitle.provider_name] -= 1
+        raise Exception
+    for name in ('addic7ed', 'podnapisi'):
+        monkeypatch.setattr(provider_manager[name].plugin, 'download_subtitle', Mock(side_effect=download_subtitle))
+
+    subtitles = make_subtitles(*[(n, lang) for lang in ('en', 'fr', 'de') for n in ('addic7ed', 'podnapisi')])
+    with AsyncProviderPool(max_workers=10, providers=['addic7ed', 'podnapisi'], provider_max_workers={'podnapisi': 2},
+                           speculative_downloads=2) as pool:
+        assert pool.download_best_subtitles(subtitles, episodes['bbt_s07e05'], {Language('eng')},
+                                            compute_score=lambda s, v, **kw: 0) == []
+    assert max_concurrent_calls == {'addic7ed': 1, 'podnapisi': 2}
+    assert pool.discarded_providers == {'addic7ed', 'podnapisi'}
+
+
 def test_check_video_languages(movies):
     video = movies['man_of_steel']
     languages = {Language('fra'), Language('eng')}
@@ -140,6 +379,22 @@ def test_search_external_subtitles(episodes, tmpdir):
     assert subtitles == expected_subtitles
 
 
+def test_search_external_subtitles_index(episodes, tmpdir):
+    video_name = os.path.split(episodes['bbt_s07e05'].name)[1]
+    video_root = os.path.splitext(video_name)[0]
+    video_path = str(tmpdir.ensure(video_name))
+    other_video_name = os.path.split(episodes['got_s03e10'].name)[1]
+    other_video_path = str(tmpdir.ensure(other_video_name))
+    for path in (video_name + '.srt', video_root + '.en.srt', video_name + '.sr_cyrl.sub', other_video_name + '.srt',
+                 video_root + '.nfo'):
+        tmpdir.ensure(path)
+
+    index = DirectoryIndex()
+    for path in (video_path, other_video_path):
+        assert search_external_subtitles(path, index=index) == search_external_subtitles(path)
+    assert len(index.directories) == 1
+
+
 def test_search_external_subtitles_archive(movies, tmpdir):
     video_name = os.path.split(movies['interstellar'].name)[1]
     video_root = os.path.splitext(video_name)[0]
@@ -233,6 +488,29 @@ def test_scan_video_episode(episodes, tmpdir, monkeypatch):
     assert scanned_video.tvdb_id is None
 
 
+def test_get_video_hashes():
+    assert get_video_hashes() == {'napiprojekt', 'opensubtitles', 'shooter', 'thesubdb'}
+    assert get_video_hashes(['addic7ed', 'podnapisi', 'thesubdb']) == {'thesubdb'}
+
+
+def test_scan_video_providers(movies, tmpdir, monkeypatch):
+    video = movies['man_of_steel']
+    monkeypatch.chdir(str(tmpdir))
+    tmpdir.ensure(video.name).write_binary(b'\0' * 10485761)
+    scanned_video = scan_video(video.name, providers=['opensubtitles', 'podnapisi'])
+    assert scanned_video.size == 10485761
+    assert scanned_video.hashes == {'opensubtitles': '0000000000a00001'}
+
+
+def test_scan_video_all_hashes(movies, tmpdir, monkeypatch):
+    video = movies['man_of_steel']
+    monkeypatch.chdir(str(tmpdir))
+    tmpdir.ensure(video.name).write_binary(b'\0' * 10485761)
+    scanned_video = scan_video(video.name)
+    assert set(scanned_video.hashes) == {'napiprojekt', 'opensubtitles', 'shooter', 'thesubdb'}
+    assert scanned_video.hashes['napiprojekt'] == 'f1c9645dbc14efddc7d8a322685f26eb'
+
+
 def test_refine_video_metadata(mkv):
     scanned_video = scan_video(mkv['test5'])
     refine(scanned_video, episode_refiners=('metadata',), movie_refiners=('metadata',))
@@ -366,13 +644,13 @@ def test_scan_videos(movies, tmpdir, monkeypatch):
     assert mock_scan_archive.call_count == 1
 
     # scan_video calls
-    kwargs = dict()
+    kwargs = dict(providers=None, stat=ANY)
     scan_video_calls = [((os.path.join('movies', movies['man_of_steel'].name),), kwargs),
                         ((os.path.join('movies', movies['enders_game'].name),), kwargs)]
     mock_scan_video.assert_has_calls(scan_video_calls, any_order=True)
 
     # scan_archive calls
-    kwargs = dict()
+    kwargs = dict(stat=ANY)
     scan_archive_calls = [((os.path.join('movies', movies['interstellar'].name),), kwargs)]
     mock_scan_archive.assert_has_calls(scan_archive_calls, any_order=True)
 
@@ -396,11 +674,156 @@ def test_scan_videos_age(movies, tmpdir, monkeypatch):
     assert mock_scan_archive.call_count == 0
 
     # scan_video calls
-    kwargs = dict()
+    kwargs = dict(providers=None, stat=ANY)
     scan_video_calls = [((os.path.join('movies', movies['man_of_steel'].name),), kwargs)]
     mock_scan_video.assert_has_calls(scan_video_calls, any_order=True)
 
 
+def test_scan_videos_stats(movies, tmpdir, monkeypatch):
+    tmpdir.ensure('movies', movies['man_of_steel'].name).write_binary(b'\0' * 10485761)
+    tmpdir.ensure('movies', movies['enders_game'].name)
+    tmpdir.ensure('movies', os.path.splitext(movies['enders_game'].name)[0] + '.nfo')
+    monkeypatch.chdir(str(tmpdir))
+
+    # record the stat calls, the videos are only stat by the walk
+    stat_paths = []
+
+    def record(f):
+        def wrapper(path, *args, **kwargs):
+            stat_paths.append(path)
+            return f(path, *args, **kwargs)
+        return wrapper
+
+    stats = Counter()
+    with monkeypatch.context() as m:
+        for name in ('os.stat', 'os.path.exists', 'os.path.isdir', 'os.path.getsize', 'os.path.getmtime'):
+            m.setattr(name, record(getattr(os.path, name[8:]) if name.startswith('os.path.') else os.stat))
+        videos = scan_videos('movies', age=timedelta(days=7), stats=stats)
+        assert all(check_video(v, age=timedelta(days=7)) for v in videos)
+    assert len(videos) == 2
+    assert stats['stat'] == 2
+    assert {p for p in stat_paths if str(p).startswith('movies')} == {'movies'}
+
+
+def test_scan_videos_directory_index(movies, tmpdir, monkeypatch):
+    tmpdir.ensure('movies', movies['man_of_steel'].name)
+    tmpdir.ensure('movies', os.path.splitext(movies['man_of_steel'].name)[0] + '.en.srt')
+    tmpdir.ensure('movies', movies['enders_game'].name)
+    tmpdir.ensure('movies', os.path.splitext(movies['enders_game'].name)[0] + '.fr.srt')
+    monkeypatch.chdir(str(tmpdir))
+
+    # the subtitles are searched in the listings of the scan
+    index = DirectoryIndex()
+    videos = scan_videos('movies', directory_index=index)
+    monkeypatch.setattr('subliminal.index.os.listdir', None)
+    languages = {os.path.split(v.name)[1]: set(search_external_subtitles(v.name, index=index).values())
+                 for v in videos}
+    assert languages == {os.path.split(movies['man_of_steel'].name)[1]: {Language('eng')},
+                         movies['enders_game'].name: {Language('fra')}}
+
+
+def test_scan_videos_index(movies, tmpdir, monkeypatch):
+    tmpdir.ensure('movies', movies['man_of_steel'].name)
+    tmpdir.ensure('movies', movies['enders_game'].name)
+    index = ScanIndex(str(tmpdir.join('index.db')))
+
+    # mock scan_video with a picklable video
+    movies['enders_game'].size = 0
+    mock_scan_video = Mock(return_value=movies['enders_game'])
+    monkeypatch.setattr('subliminal.core.scan_video', mock_scan_video)
+    monkeypatch.chdir(str(tmpdir))
+
+    # first scan fills the index
+    assert len(scan_videos('movies', index=index)) == 2
+    assert mock_scan_video.call_count == 2
+    assert len(index) == 2
+
+    # second scan uses the index
+    videos = scan_videos('movies', index=index)
+    assert len(videos) == 2
+    assert mock_scan_video.call_count == 2
+    assert all(v.title == movies['enders_game'].title for v in videos)
+
+    # modified videos are scanned again
+    tmpdir.join('movies', movies['enders_game'].name).write_binary(b'modified')
+    assert len(scan_videos('movies', index=index)) == 2
+    assert mock_scan_video.call_count == 3
+
+
+def test_scan_videos_index_missing_hashes(movies, tmpdir, monkeypatch):
+    video = movies['enders_game']
+    video.size = 10485761
+    video.hashes = {'thesubdb': '2c6c0d8d1b2a8e7e5c0f4f3b2b6b4e4b'}
+    tmpdir.ensure('movies', video.name).write_binary(b'\0' * video.size)
+    monkeypatch.chdir(str(tmpdir))
+    index = ScanIndex(str(tmpdir.join('index.db')))
+    index.set(os.path.join('movies', video.name), video)
+
+    videos = scan_videos('movies', providers=['opensubtitles', 'thesubdb'], index=index)
+    assert len(videos) == 1
+    assert videos[0].hashes == {'opensubtitles': '0000000000a00001', 'thesubdb': '2c6c0d8d1b2a8e7e5c0f4f3b2b6b4e4b'}
+    assert index.get(os.path.join('movies', video.name)).hashes == videos[0].hashes
+
+
+def test_iter_videos(movies, tmpdir, monkeypatch):
+    tmpdir.ensure('movies', movies['man_of_steel'].name)
+    tmpdir.ensure('movies', movies['enders_game'].name)
+
+    # mock scan_video with the correct types
+    mock_video = Mock(subtitle_languages=set())
+    mock_scan_video = Mock(return_value=mock_video)
+    monkeypatch.setattr('subliminal.core.scan_video', mock_scan_video)
+    monkeypatch.chdir(str(tmpdir))
+
+    # videos are scanned as they are consumed
+    videos = iter_videos('movies')
+    assert mock_scan_video.call_count == 0
+    assert next(videos) is mock_video
+    assert mock_scan_video.call_count == 1
+    assert list(videos) == [mock_video]
+    assert mock_scan_video.call_count == 2
+
+
+def test_scan_videos_parallel_path_does_not_exist(movies):
+    with pytest.raises(ValueError) as excinfo:
+        next(scan_videos_parallel(movies['man_of_steel'].name))
+    assert str(excinfo.value) == 'Path does not exist'
+
+
+def test_scan_videos_parallel(movies, episodes, tmpdir, monkeypatch):
+    tmpdir.ensure('videos', movies['man_of_steel'].name).write_binary(b'\0' * 10485761)
+    tmpdir.ensure('videos', movies['enders_game'].name)
+    tmpdir.ensure('videos', '.hidden_video.mkv')
+    tmpdir.ensure('videos', episodes['bbt_s07e05'].name)
+    tmpdir.ensure('videos', 'watched', dir=True)
+    tmpdir.join('videos', 'watched', os.path.split(episodes['bbt_s07e05'].name)[1]).mksymlinkto(
+        tmpdir.join('videos', episodes['bbt_s07e05'].name))
+    monkeypatch.chdir(str(tmpdir))
+
+    def attrs(videos):
+        return sorted((v.name, repr(v), v.size, sorted(v.hashes.items())) for v in videos)
+
+    videos = list(scan_videos_parallel('videos', max_workers=2, max_processes=2))
+    assert len(videos) == 3
+    assert attrs(videos) == attrs(scan_videos('videos'))
+
+
+def test_scan_videos_parallel_index(movies, tmpdir, monkeypatch):
+    tmpdir.ensure('movies', movies['man_of_steel'].name)
+    tmpdir.ensure('movies', movies['enders_game'].name)
+    monkeypatch.chdir(str(tmpdir))
+    index = ScanIndex(str(tmpdir.join('index.db')))
+
+    videos = list(scan_videos_parallel('movies', index=index, max_workers=2, max_processes=1))
+    assert len(videos) == 2
+    assert len(index) == 2
+
+    # second scan does not submit any task
+    monkeypatch.setattr('subliminal.core._guess_video', None)
+    monkeypatch.setattr('subliminal.core.hash_video', None)
+    assert sorted(v.name for v in scan_videos_parallel('movies', index=index)) == sorted(v.name for v in videos)
+
+
 def test_list_subtitles_movie(movies, mock_providers):
     video = movies['man_of_steel']
     languages = {Language('eng')}
@@ -524,6 +947,33 @@ def test_download_subtitles(mock_providers):
     assert not provider_manager['subscenter'].plugin.download_subtitle.called
 
 
+def test_provider_pool_download_subtitles(mock_providers, monkeypatch, caplog):
+    def download_subtitle(subtitle):
+        subtitle.content = b'1\n00:00:01,000 --> 00:00:02,000\nHello\n\n'
+    monkeypatch.setattr(provider_manager['addic7ed'].plugin, 'download_subtitle', Mock(side_effect=download_subtitle))
+    monkeypatch.setattr(provider_manager['tvsubtitles'].plugin, 'download_subtitles', Mock(side_effect=ValueError))
+    caplog.set_level(logging.INFO, logger='subliminal.core')
+    subtitles = [
+        Addic7edSubtitle(Language('eng'), True, None, 'The Big Bang Theory', 7, 5, 'The Workplace Proximity', 2007,
+                         'DIMENSION', None),
+        TVsubtitlesSubtitle(Language('por'), None, 261077, 'Game of Thrones', 3, 10, None, '1080p.BluRay', 'DEMAND'),
+        Addic7edSubtitle(Language('fra'), True, None, 'The Big Bang Theory', 7, 5, 'The Workplace Proximity', 2007,
+                         'DIMENSION', None),
+        TVsubtitlesSubtitle(Language('eng'), None, 261078, 'Game of Thrones', 3, 10, None, '1080p.BluRay', 'DEMAND')
+    ]
+
+    with ProviderPool() as pool:
+        downloaded_subtitles = pool.download_subtitles(subtitles)
+        assert pool.discarded_providers == {'tvsubtitles'}
+    assert downloaded_subtitles == [subtitles[0], subtitles[2]]
+    assert provider_manager['addic7ed'].plugin.download_subtitle.call_count == 2
+    provider_manager['tvsubtitles'].plugin.download_subtitles.assert_called_once_with([subtitles[1], subtitles[3]])
+
+    # the subtitles of the failed provider are not downloaded rather than invalid
+    assert 'Invalid subtitle' not in caplog.text
+    assert caplog.text.count('not downloaded') == 2
+
+
 @pytest.mark.integration
 @vcr.use_cassette
 def test_download_best_subtitles(episodes):
@@ -575,6 +1025,20 @@ def test_download_best_subtitles_undefined(episodes):
     assert len(subtitles) == 0
 
 
+def test_download_best_subtitles_buffer_size(episodes):
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10']]
+    languages = {Language('fra')}
+    pool = MagicMock()
+    pool.__enter__.return_value = pool
+    pool.list_subtitles_videos.side_effect = lambda videos, languages: ((v, []) for v in videos)
+    pool.download_best_subtitles.return_value = []
+
+    subtitles = download_best_subtitles(iter(videos), languages, pool_class=Mock(return_value=pool), buffer_size=1)
+
+    assert set(subtitles) == set(videos)
+    assert pool.download_best_subtitles.call_count == 2
+
+
 @pytest.mark.integration
 @vcr.use_cassette('test_download_best_subtitles')
 def test_download_best_subtitles_only_one(episodes):
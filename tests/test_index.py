@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import os
+
+from subliminal.index import DirectoryIndex, ScanIndex
+
+
+def test_scan_index_get_not_indexed(movies, tmpdir):
+    path = str(tmpdir.ensure(movies['man_of_steel'].name))
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        assert index.get(path) is None
+
+
+def test_scan_index_set_get(movies, tmpdir):
+    video = movies['man_of_steel']
+    video.name = str(tmpdir.ensure(video.name))
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        index.set(video.name, video)
+        indexed_video = index.get(video.name)
+    assert indexed_video is not video
+    assert indexed_video.name == video.name
+    assert indexed_video.title == video.title
+    assert indexed_video.hashes == video.hashes
+    assert indexed_video.size == video.size
+
+
+def test_scan_index_persistence(movies, tmpdir):
+    video = movies['man_of_steel']
+    video.name = str(tmpdir.ensure(video.name))
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        index.set(video.name, video)
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        assert len(index) == 1
+        assert index.get(video.name).hashes == video.hashes
+
+
+def test_scan_index_relative_path(movies, tmpdir, monkeypatch):
+    video = movies['man_of_steel']
+    name = video.name
+    tmpdir.ensure('movies', name)
+    monkeypatch.chdir(str(tmpdir))
+    video.name = os.path.join('movies', name)
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        index.set(video.name, video)
+        monkeypatch.chdir(str(tmpdir.join('movies')))
+        assert index.get(name).name == name
+
+
+def test_scan_index_archive_name(movies, tmpdir):
+    video = movies['interstellar']
+    path = str(tmpdir.ensure('Interstellar.2014.2014.1080p.BluRay.x264.YIFY.rar'))
+    video.name = str(tmpdir.join('Interstellar.2014.2014.1080p.BluRay.x264.YIFY', 'interstellar.mkv'))
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        index.set(path, video)
+        assert index.get(path).name == video.name
+
+
+def test_scan_index_changed(movies, tmpdir):
+    video = movies['man_of_steel']
+    path = tmpdir.ensure(video.name)
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        index.set(str(path), video)
+        path.write_binary(b'changed')
+        assert index.get(str(path)) is None
+
+
+def test_scan_index_prune(movies, tmpdir):
+    deleted_path = tmpdir.ensure(movies['man_of_steel'].name)
+    changed_path = tmpdir.ensure(movies['enders_game'].name)
+    unchanged_path = tmpdir.ensure(movies['interstellar'].name)
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        index.set(str(deleted_path), movies['man_of_steel'])
+        index.set(str(changed_path), movies['enders_game'])
+        index.set(str(unchanged_path), movies['interstellar'])
+        deleted_path.remove()
+        changed_path.setmtime(changed_path.mtime() - 3600)
+        assert index.prune() == 2
+        assert len(index) == 1
+        assert index.get(str(unchanged_path)) is not None
+
+
+def test_scan_index_clear(movies, tmpdir):
+    path = str(tmpdir.ensure(movies['man_of_steel'].name))
+    with ScanIndex(str(tmpdir.join('index.db'))) as index:
+        index.set(path, movies['man_of_steel'])
+        index.clear()
+        assert len(index) == 0
+        assert index.get(path) is None
+
+
+def test_directory_index_get():
+    index = DirectoryIndex()
+    index.add('videos', ['a.mkv', 'a.en.srt', 'ab.srt', 'a.fr.sub', 'b.srt', '.hidden.srt', 'a.nfo'])
+    assert index.get('videos') == ['.hidden.srt', 'a.en.srt', 'a.fr.sub', 'ab.srt', 'b.srt']
+    assert index.get('videos', 'a') == ['a.en.srt', 'a.fr.sub', 'ab.srt']
+    assert index.get(os.path.join('videos', ''), 'a.') == ['a.en.srt', 'a.fr.sub']
+    assert index.get('videos', 'c') == []
+
+
+def test_directory_index_list_once(tmpdir, monkeypatch):
+    tmpdir.ensure('a.mkv')
+    tmpdir.ensure('a.en.srt')
+    listdir_calls = []
+    os_listdir = os.listdir
+
+    def listdir(path):
+        listdir_calls.append(path)
+        return os_listdir(path)
+    monkeypatch.setattr('subliminal.index.os.listdir', listdir)
+
+    index = DirectoryIndex()
+    assert index.get(str(tmpdir), 'a') == ['a.en.srt']
+    assert index.get(str(tmpdir), 'b') == []
+    assert listdir_calls == [str(tmpdir)]
+
+    index.clear()
+    assert index.get(str(tmpdir), 'a') == ['a.en.srt']
+    assert len(listdir_calls) == 2
@@ -1,10 +1,23 @@
 # -*- coding: utf-8 -*-
+import io
 import os
+import threading
+import time
+from zipfile import ZipFile
 
 from babelfish import Language, language_converters
+from datetime import datetime
+from dogpile.cache.backends.memory import MemoryBackend
 import pytest
+import pytz
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
 from vcr import VCR
+from subliminal.cache import FileStore, region
 from subliminal.exceptions import ConfigurationError, AuthenticationError
+import subliminal.providers.legendastv
 from subliminal.providers.legendastv import LegendasTVSubtitle, LegendasTVProvider, LegendasTVArchive
 
 USERNAME = 'python-subliminal'
@@ -190,6 +203,122 @@ def test_download_archive():
     assert archive.content is not None
 
 
+def test_download_archive_file_store(tmpdir, monkeypatch):
+    monkeypatch.setattr(subliminal.providers.legendastv, 'file_store', FileStore(str(tmpdir)))
+    content = io.BytesIO()
+    with ZipFile(content, 'w') as f:
+        f.writestr('Legendas.tv.url', b'')
+        f.writestr('The.Big.Bang.Theory.S07E05.HDTV.x264-LOL.srt', b'1\n00:00:01,000 --> 00:00:02,000\nHello\n')
+    provider = LegendasTVProvider()
+    provider.session = Mock()
+    provider.session.get.return_value.content = content.getvalue()
+
+    # the archive is downloaded once, then read from the file store
+    for _ in range(2):
+        archive = LegendasTVArchive('5261e6de6a5e5', 'The.Big.Bang.Theory.S07E05.HDTV.x264-LOL', False, False,
+                                    'http://legendas.tv/download/5261e6de6a5e5')
+        provider.download_archive(archive)
+        assert archive.content.read('The.Big.Bang.Theory.S07E05.HDTV.x264-LOL.srt').endswith(b'Hello\n')
+    assert provider.session.get.call_count == 1
+    provider.terminate()
+
+
+def test_download_archive_file_store_evicted(tmpdir, monkeypatch):
+    monkeypatch.setattr(subliminal.providers.legendastv, 'file_store', FileStore(str(tmpdir), max_size=10))
+    contents = {}
+    for i in range(2):
+        content = io.BytesIO()
+        with ZipFile(content, 'w') as f:
+            f.writestr('subtitle%d.srt' % i, b'1\n00:00:01,000 --> 00:00:02,000\nHello\n')
+        contents['http://legendas.tv/downloadarquivo/%d' % i] = content.getvalue()
+    provider = LegendasTVProvider()
+    provider.session = Mock()
+    provider.session.get.side_effect = lambda url: Mock(content=contents[url])
+
+    # the archives are read from their stored file, the second one evicting the first one, still readable
+    archives = [LegendasTVArchive(str(i), 'Archive %d' % i, False, False, 'http://legendas.tv/download/%d' % i)
+                for i in range(2)]
+    for archive in archives:
+        provider.download_archive(archive)
+    assert len(tmpdir.listdir()) == 1
+    archive_files = [f for _, f in provider.archive_files]
+    assert [os.path.dirname(f.name) for f in archive_files] == [str(tmpdir)] * 2
+    for i, archive in enumerate(archives):
+        assert archive.content.read('subtitle%d.srt' % i).endswith(b'Hello\n')
+
+    # the archive files are closed on termination
+    provider.terminate()
+    assert all(f.closed for f in archive_files)
+    assert [a.content for a in archives] == [None, None]
+
+    # the evicted archive is downloaded again
+    archive = LegendasTVArchive('0', 'Archive 0', False, False, 'http://legendas.tv/download/0')
+    provider.download_archive(archive)
+    assert archive.content.read('subtitle0.srt').endswith(b'Hello\n')
+    assert provider.session.get.call_count == 3
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_query_concurrent_archives(max_workers):
+    archives = [LegendasTVArchive(str(i), 'Man.Of.Steel.2013.720p.BluRay.x264-Group%d' % i, False, False,
+                                  'http://legendas.tv/download/%d' % i, timestamp=datetime(2016, 1, 1, tzinfo=pytz.utc))
+                for i in range(6)]
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def download_archive(archive):
+        with lock:
+            running.append(archive)
+            max_running.append(len(running))
+
+        # the first archives take the longest to download
+        time.sleep(0.01 * (6 - int(archive.id)))
+        content = io.BytesIO()
+        with ZipFile(content, 'w') as f:
+            f.writestr('Legendas.tv.url', b'')
+            f.writestr(archive.name + '.srt', b'')
+        archive.content = ZipFile(content)
+
+        with lock:
+            running.remove(archive)
+
+    with LegendasTVProvider(max_workers=max_workers) as provider:
+        provider.search_titles = Mock(return_value={1: {'type': 'movie', 'title': 'Man of Steel', 'year': 2013}})
+        provider.iter_archives = Mock(return_value=iter(archives))
+        provider.download_archive = download_archive
+        subtitles = provider.query(Language('por', 'BR'), 'Man of Steel', year=2013)
+
+    assert [(s.archive.id, s.name) for s in subtitles] == [(a.id, a.name + '.srt') for a in archives]
+    assert max(max_running) == max_workers
+
+
+def test_query_cached_archives(monkeypatch):
+    monkeypatch.setattr(region, 'backend', MemoryBackend({}))
+    page = (b'<div class="list_element"><article><div class="f_left"><p><a href="/download/525d8c2444851/'
+            b'Man_of_Steel/Man_Of_Steel_2013_BluRay">Man.Of.Steel.2013.[BluRay.BRRip.BDRip]</a></p>'
+            b'<p class="data">1000 downloads, nota 10, enviado por <a href="/user">user</a> em 15/10/2013 - 22:04 '
+            b'</p></div></article></div>')
+    content = io.BytesIO()
+    with ZipFile(content, 'w') as f:
+        f.writestr('Man.Of.Steel.2013.[BluRay.BRRip.BDRip].srt', b'')
+
+    def get(url, *args, **kwargs):
+        return Mock(content=page if 'carrega_legendas_busca_filme' in url else content.getvalue())
+
+    with LegendasTVProvider(max_workers=1) as provider:
+        provider.search_titles = Mock(return_value={1: {'type': 'movie', 'title': 'Man of Steel', 'year': 2013}})
+        provider.session = Mock()
+        provider.session.get.side_effect = get
+        for _ in range(2):
+            subtitles = provider.query(Language('por', 'BR'), 'Man of Steel', year=2013)
+            assert [(s.archive.id, s.name) for s in subtitles] == [
+                ('525d8c2444851', 'Man.Of.Steel.2013.[BluRay.BRRip.BDRip].srt')]
+
+    # the second query requests neither the page of archives nor the archive
+    assert provider.session.get.call_count == 2
+
+
 @pytest.mark.integration
 @vcr.use_cassette
 def test_query_movie(movies):
@@ -1,12 +1,21 @@
 # -*- coding: utf-8 -*-
+import base64
 import os
+import zlib
 
 from babelfish import Language
+from dogpile.cache import make_region
 import pytest
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
 from vcr import VCR
 
 from subliminal.exceptions import ConfigurationError
-from subliminal.providers.opensubtitles import OpenSubtitlesProvider, OpenSubtitlesSubtitle, Unauthorized
+from subliminal.providers import opensubtitles
+from subliminal.providers.opensubtitles import (OpenSubtitlesProvider, OpenSubtitlesSubtitle, Unauthorized,
+                                                get_criteria_indexes)
 
 
 vcr = VCR(path_transformer=lambda path: path + '.yaml',
@@ -108,7 +117,49 @@ def test_login_bad_password():
 def test_logout():
     provider = OpenSubtitlesProvider('python-subliminal', 'subliminal')
     provider.initialize()
-    provider.terminate()
+    provider.logout()
+    assert provider.token is None
+
+
+def test_token_reuse(tmpdir, monkeypatch):
+    monkeypatch.setattr(opensubtitles, 'region', make_region().configure(
+        'subliminal.sqlite', arguments={'filename': str(tmpdir.join('cache.sqlite'))}))
+    server = Mock(LogIn=Mock(side_effect=[{'status': '200 OK', 'token': 'a'}, {'status': '200 OK', 'token': 'b'}]),
+                  NoOperation=Mock(return_value={'status': '200 OK'}),
+                  SearchSubtitles=Mock(side_effect=[{'status': '406 No session'}, {'status': '200 OK', 'data': []}]))
+
+    # the token is kept at termination
+    provider = OpenSubtitlesProvider()
+    provider.server = server
+    with provider:
+        assert provider.token == 'a'
+    assert provider.token is None
+    assert not server.LogOut.called
+
+    # the token is verified before use, and renewed when the session has expired
+    provider = OpenSubtitlesProvider()
+    provider.server = server
+    with provider:
+        assert provider.token == 'a'
+        server.NoOperation.assert_called_once_with('a')
+        assert provider.search([{'tag': 'movie.mkv'}]) == []
+        assert provider.token == 'b'
+    assert server.LogIn.call_count == 2
+    assert [c[0][0] for c in server.SearchSubtitles.call_args_list] == ['a', 'b']
+    assert opensubtitles.region.get(opensubtitles.token_key.format(username='')) == 'b'
+
+
+def test_token_without_region(monkeypatch):
+    monkeypatch.setattr(opensubtitles, 'region', make_region())
+    server = Mock(LogIn=Mock(return_value={'status': '200 OK', 'token': 'a'}),
+                  LogOut=Mock(return_value={'status': '200 OK'}))
+
+    # the token is not cached, and its session ended at termination
+    provider = OpenSubtitlesProvider()
+    provider.server = server
+    with provider:
+        assert provider.token == 'a'
+    server.LogOut.assert_called_once_with('a')
     assert provider.token is None
 
 
@@ -249,6 +300,64 @@ def test_list_subtitles_episode(episodes):
     assert {subtitle.language for subtitle in subtitles} == languages
 
 
+def make_subtitle_item(subtitle_id, criterion, query_number=None):
+    item = {'SubLanguageID': 'eng', 'SubHearingImpaired': '0', 'SubtitlesLink': None, 'IDSubtitleFile': subtitle_id,
+            'MatchedBy': 'moviehash' if 'moviehash' in criterion else 'tag', 'MovieKind': 'episode', 'MovieHash': '0',
+            'MovieName': '"Series" Title', 'MovieReleaseName': '', 'MovieYear': '', 'IDMovieImdb': '0',
+            'SeriesSeason': '', 'SeriesEpisode': '', 'SubFileName': 'subtitle.srt', 'QueryParameters': criterion}
+    if 'moviehash' in criterion:
+        item['MovieHash'] = criterion['moviehash']
+    if query_number is not None:
+        item['QueryNumber'] = str(query_number)
+    return item
+
+
+def test_list_subtitles_batch(episodes, monkeypatch):
+    videos = [episodes['bbt_s07e05'], episodes['got_s03e10'], episodes['dallas_s01e03']]
+    languages = {Language('eng')}
+    provider = OpenSubtitlesProvider()
+    monkeypatch.setattr(provider, 'search_max_criteria', 8)
+
+    def search(token, criteria):
+        return {'status': '200 OK', 'data': [make_subtitle_item(str(100 * n + i), c, n)
+                                             for n, c in enumerate(criteria) for i in range(2)]}
+    provider.server = Mock(SearchSubtitles=Mock(side_effect=search))
+
+    subtitles = provider.list_subtitles_batch([(video, languages) for video in videos])
+    criteria = [provider.get_criteria(languages, **provider.get_query_params(v)) for v in videos]
+    assert [len(s) for s in subtitles] == [2 * len(c) for c in criteria]
+    assert provider.server.SearchSubtitles.call_count == 2
+    for video, video_subtitles in zip(videos, subtitles):
+        assert {s.filename for s in video_subtitles} == {'subtitle.srt'}
+    assert subtitles[0][0].hash == episodes['bbt_s07e05'].hashes['opensubtitles']
+
+
+def test_get_criteria_indexes():
+    criteria = [(0, {'moviehash': 'abc', 'moviebytesize': '1', 'sublanguageid': 'eng'}),
+                (0, {'tag': 'Video.S01E01.mkv', 'sublanguageid': 'eng'}),
+                (1, {'tag': 'Other.S01E01.mkv', 'sublanguageid': 'eng'})]
+    assert get_criteria_indexes(make_subtitle_item('1', criteria[2][1], 2), criteria) == {1}
+    assert get_criteria_indexes(make_subtitle_item('1', criteria[0][1]), criteria) == {0}
+    assert get_criteria_indexes(make_subtitle_item('1', {'tag': 'other.s01e01.mkv', 'sublanguageid': 'eng'}),
+                                criteria) == {1}
+
+
+def test_download_subtitles(monkeypatch):
+    subtitles = [OpenSubtitlesSubtitle(Language('eng'), False, None, str(i), 'tag', 'movie', '0', 'Movie', '', None,
+                                       'tt0000000', None, None, 'movie.srt', None) for i in range(3)]
+    provider = OpenSubtitlesProvider()
+    monkeypatch.setattr(provider, 'download_max_subtitles', 2)
+
+    def download(token, ids):
+        return {'status': '200 OK', 'data': [{'idsubtitlefile': i, 'data': base64.b64encode(
+            zlib.compress(('subtitle %s\r\n' % i).encode('utf-8'))).decode('ascii')} for i in ids if i != '1']}
+    provider.server = Mock(DownloadSubtitles=Mock(side_effect=download))
+
+    provider.download_subtitles(subtitles)
+    assert [c[0][1] for c in provider.server.DownloadSubtitles.call_args_list] == [['0', '1'], ['2']]
+    assert [s.content for s in subtitles] == [b'subtitle 0\n', None, b'subtitle 2\n']
+
+
 @pytest.mark.integration
 @vcr.use_cassette
 def test_download_subtitle(movies):
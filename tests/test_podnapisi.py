@@ -3,6 +3,10 @@ import os
 
 from babelfish import Language
 import pytest
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
 from vcr import VCR
 
 from subliminal.providers.podnapisi import PodnapisiProvider, PodnapisiSubtitle
@@ -85,6 +89,21 @@ def test_query_episode(episodes):
     assert {subtitle.language for subtitle in subtitles} == {language}
 
 
+def test_iter_query_pages(movies, monkeypatch):
+    video = movies['man_of_steel']
+    pages = [([PodnapisiSubtitle(Language('eng'), False, None, 'a', [], video.title)], 2),
+             ([PodnapisiSubtitle(Language('eng'), False, None, 'b', [], video.title)], None)]
+    monkeypatch.setattr(PodnapisiProvider, 'parse_search_page', Mock(side_effect=pages))
+    provider = PodnapisiProvider()
+    provider.session = Mock()
+    subtitles = provider.iter_query(Language('eng'), video.title, year=video.year)
+    assert next(subtitles).pid == 'a'
+    assert provider.session.get.call_count == 1
+    assert [s.pid for s in subtitles] == ['b']
+    assert provider.session.get.call_count == 2
+    assert provider.session.get.call_args[1]['params']['page'] == 2
+
+
 @pytest.mark.integration
 @vcr.use_cassette
 def test_list_subtitles_movie(movies):
@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
+from babelfish import Language
 from bs4 import FeatureNotFound
 import pytest
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
 
 from subliminal.providers import ParserBeautifulSoup, Provider
 from subliminal.video import Episode, Movie
@@ -49,3 +54,10 @@ def test_check_required_hash(episodes, movies):
     Provider.required_hash = 'opensubtitles'
     assert Provider.check(movies['man_of_steel']) is True
     assert Provider.check(episodes['dallas_s01e03']) is False
+
+
+def test_iter_subtitles(movies):
+    provider = Provider()
+    provider.list_subtitles = Mock(return_value=['a', 'b'])
+    assert list(provider.iter_subtitles(movies['man_of_steel'], {Language('eng')})) == ['a', 'b']
+    provider.list_subtitles.assert_called_once_with(movies['man_of_steel'], {Language('eng')})
@@ -1,12 +1,19 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
+import random
 
 from babelfish import Language
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
 
+from subliminal import Episode
 from subliminal.providers.addic7ed import Addic7edSubtitle
 from subliminal.providers.opensubtitles import OpenSubtitlesSubtitle
 from subliminal.providers.podnapisi import PodnapisiSubtitle
-from subliminal.score import compute_score, episode_scores, movie_scores, solve_episode_equations, solve_movie_equations
+from subliminal.score import (compute_score, episode_scores, match_bits, movie_scores, score_subtitles,
+                              solve_episode_equations, solve_movie_equations)
 
 
 def test_episode_equations():
@@ -66,3 +73,20 @@ def test_compute_score_hash_hearing_impaired(movies):
                                      None, None, '', 'utf-8')
     assert compute_score(subtitle, video, hearing_impaired=True) == (movie_scores['hash'] +
                                                                      movie_scores['hearing_impaired'])
+
+
+def test_score_subtitles(episodes, movies):
+    rng = random.Random(42)
+    for video in list(episodes.values()) + list(movies.values()):
+        subtitles = []
+        if isinstance(video, Episode):
+            subtitles.append(Addic7edSubtitle(Language('eng'), True, None, video.series, video.season, video.episode,
+                                              video.title, video.year, '1080p', video.release_group))
+        for _ in range(100):
+            matches = set(rng.sample(sorted(match_bits), rng.randint(0, 6))) | {'unknown'}
+            subtitles.append(Mock(get_matches=lambda v, matches=matches: set(matches),
+                                  hearing_impaired=rng.choice([True, False])))
+
+        for hearing_impaired in (None, True, False):
+            expected = [compute_score(s, video, hearing_impaired=hearing_impaired) for s in subtitles]
+            assert score_subtitles(video, subtitles, hearing_impaired=hearing_impaired) == expected
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 import os
+import pickle
 
 from babelfish import Language
 
+from subliminal.providers.addic7ed import Addic7edSubtitle
+from subliminal.providers.opensubtitles import OpenSubtitlesSubtitle
 from subliminal.subtitle import Subtitle, fix_line_ending, get_subtitle_path, guess_matches
 
 
@@ -125,3 +128,32 @@ def test_subtitle_empty_encoding():
 def test_subtitle_invalid_encoding():
     subtitle = Subtitle(Language('deu'), False, None, 'rubbish')
     assert subtitle.encoding is None
+
+
+def test_subtitle_pickle():
+    subtitles = [Addic7edSubtitle(Language('eng'), True, None, 'The Big Bang Theory', 7, 5, 'The Workplace Proximity',
+                                  2007, 'DIMENSION', '/updated/1/8303/0'),
+                 OpenSubtitlesSubtitle(Language('eng'), False, None, '1', 'moviehash', 'movie', '5b8f8f4e41ccb21e',
+                                       'Man of Steel', 'Man.of.Steel.2013.720p.BluRay.x264-Felony', 2013, 770828, None,
+                                       None, 'man.of.steel.2013.720p.bluray.x264-felony.srt', 'utf-8')]
+    subtitles[0].content = b'Some content'
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        for subtitle in subtitles:
+            assert not hasattr(subtitle, '__dict__')
+            loaded = pickle.loads(pickle.dumps(subtitle, protocol))
+            assert type(loaded) is type(subtitle)
+            assert loaded.__getstate__() == subtitle.__getstate__()
+            assert loaded.id == subtitle.id
+
+
+class MySubtitle(Subtitle):
+    def __init__(self, language, subtitle_id):
+        super(MySubtitle, self).__init__(language)
+        self.subtitle_id = subtitle_id
+
+
+def test_subtitle_subclass_without_slots():
+    subtitle = MySubtitle(Language('eng'), 'my-id')
+    loaded = pickle.loads(pickle.dumps(subtitle, 2))
+    assert loaded.subtitle_id == 'my-id'
+    assert loaded.language == Language('eng')
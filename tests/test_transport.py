@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from subliminal.transport import PooledHTTPAdapter, SessionFactory, XMLRPCTransport, connection_stats
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:%d/' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stats():
+    connection_stats.reset()
+    yield connection_stats
+    connection_stats.reset()
+
+
+def test_session_factory_shares_adapter():
+    factory = SessionFactory(pool_connections=5, pool_maxsize=2)
+    sessions = [factory(headers={'User-Agent': 'test'}), factory()]
+    adapter = sessions[0].get_adapter('https://example.com')
+    assert isinstance(adapter, PooledHTTPAdapter)
+    assert adapter is sessions[1].get_adapter('http://example.com')
+    assert adapter._pool_connections == 5
+    assert adapter._pool_maxsize == 2
+    assert sessions[0].headers['User-Agent'] == 'test'
+
+
+def test_session_factory_configure():
+    factory = SessionFactory()
+    adapter = factory.get_adapter()
+    factory.configure(pool_maxsize=4)
+    assert factory.get_adapter() is not adapter
+    assert factory.get_adapter()._pool_maxsize == 4
+    assert factory.get_adapter()._pool_connections == 20
+
+
+def test_session_factory_configure_existing_sessions():
+    factory = SessionFactory()
+    session = factory()
+    factory.configure(pool_maxsize=4)
+    assert session.get_adapter('https://example.com') is factory.get_adapter()
+    assert session.get_adapter('https://example.com')._pool_maxsize == 4
+
+
+def test_session_factory_reuse_connections(server, stats):
+    factory = SessionFactory()
+    session = factory()
+    assert session.get(server).content == b'ok'
+    session.close()
+    assert factory().get(server).content == b'ok'
+    assert (stats.opened, stats.reused) == (1, 1)
+    factory.close()
+    assert factory().get(server).content == b'ok'
+    assert (stats.opened, stats.reused) == (2, 1)
+
+
+def test_xmlrpc_transport_reuse_connection(stats):
+    connection = Mock(sock=None)
+    transport = XMLRPCTransport(10)
+    transport._connection = ('example.com', connection)
+    assert transport.make_connection('example.com') is connection
+    assert connection.timeout == 10
+    connection.sock = object()
+    transport.make_connection('example.com')
+    assert (stats.opened, stats.reused) == (1, 1)
@@ -1,7 +1,25 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import re
+import time
+
+import pytest
 from six import text_type as str
 
-from subliminal.utils import hash_opensubtitles, hash_thesubdb, sanitize
+from subliminal.utils import (LRUCache, hash_opensubtitles, hash_thesubdb, hash_video, iter_buffered, merge_ranges,
+                              sanitize, sanitize_cache, sanitize_release_group, sanitize_release_group_cache)
+
+
+@pytest.fixture
+def video_path(tmpdir):
+    block = b''.join(hashlib.md5(str(i).encode('ascii')).digest() for i in range(4096))[:65521]
+
+    def make_video_path(size):
+        path = tmpdir.join('video_%d.mkv' % size)
+        path.write_binary((block * (size // len(block) + 1))[:size])
+        return str(path)
+
+    return make_video_path
 
 
 def test_hash_opensubtitles(mkv):
@@ -13,6 +31,12 @@ def test_hash_opensubtitles_too_small(tmpdir):
     assert hash_opensubtitles(str(path)) is None
 
 
+def test_hash_opensubtitles_overflow(tmpdir):
+    path = tmpdir.join('test_overflow.mkv')
+    path.write_binary(b'\xff' * 65536 * 2)
+    assert hash_opensubtitles(str(path)) == '000000000001c000'
+
+
 def test_hash_thesubdb(mkv):
     assert hash_thesubdb(mkv['test1']) == '054e667e93e254f8fa9f9e8e6d4e73ff'
 
@@ -22,5 +46,132 @@ def test_hash_thesubdb_too_small(tmpdir):
     assert hash_thesubdb(str(path)) is None
 
 
+def test_hash_video(video_path):
+    assert hash_video(video_path(11 * 1024 * 1024)) == {
+        'napiprojekt': 'fc4f66e336f16a9e9b205aacac746e4f',
+        'opensubtitles': '3869767e43e2ac59',
+        'shooter': '6438cd10faf705009b68d612cff7469b;46f767026c30ad96abae0552dc8d2d2e;'
+                   '263ab958567daee13c7be3fd25f14290;41f5b5ac85c34e62674d85ee6ced9020',
+        'thesubdb': 'cec0b34e80aafd845dc50282b2710333'}
+
+
+def test_hash_video_small(video_path):
+    assert hash_video(video_path(200000)) == {
+        'napiprojekt': '2cc126845d73ed0e688967e4ddd3db65',
+        'opensubtitles': '170b61695c679cba',
+        'shooter': '6438cd10faf705009b68d612cff7469b;9e04a520e4cb25db864f2dd018a0666a;'
+                   'ae606c279351064e838cc6bb827c18d7;3a8e079c2ba2f10d4d95f03fdf07894b',
+        'thesubdb': '9e14f4dd20a5a19a8e8baa20a7d11383'}
+
+
+def test_hash_video_names(video_path):
+    assert hash_video(video_path(200000), ['opensubtitles', 'thesubdb']) == {
+        'opensubtitles': '170b61695c679cba',
+        'thesubdb': '9e14f4dd20a5a19a8e8baa20a7d11383'}
+
+
+def test_hash_video_too_small(tmpdir):
+    path = tmpdir.ensure('test_too_small.mkv')
+    assert hash_video(str(path)) == {'napiprojekt': 'd41d8cd98f00b204e9800998ecf8427e', 'opensubtitles': None,
+                                     'shooter': None, 'thesubdb': None}
+
+
+def test_merge_ranges():
+    assert merge_ranges([(10, 5), (0, 65536), (0, 10485760), (4096, 4096), (20971520, 4096),
+                         (20971520 + 4096, 10)]) == [(0, 10485760), (20971520, 4106)]
+
+
 def test_sanitize():
     assert sanitize('Marvel\'s Agents of S.H.I.E.L.D.') == 'marvels agents of s h i e l d'
+
+
+def sanitize_reference(string, ignore_characters=None):
+    ignore_characters = ignore_characters or set()
+    characters = {'-', ':', '(', ')', '.'} - ignore_characters
+    if characters:
+        string = re.sub(r'[%s]' % re.escape(''.join(characters)), ' ', string)
+    characters = {'\''} - ignore_characters
+    if characters:
+        string = re.sub(r'[%s]' % re.escape(''.join(characters)), '', string)
+    string = re.sub(r'\s+', ' ', string)
+    return string.strip().lower()
+
+
+@pytest.mark.parametrize('ignore_characters', [None, set(), {'.'}, {'\'', '-'}, {'-', ':', '(', ')', '.', '\''}])
+def test_sanitize_ignore_characters(ignore_characters):
+    for string in ['Marvel\'s Agents of S.H.I.E.L.D.', 'Mr. Robot (2015)', '  Star Trek:\tDeep-Space  Nine ',
+                   u'Les Revenants \u00e9', 'L\'Odyssée - (part.1)']:
+        assert sanitize(string, ignore_characters) == sanitize_reference(string, ignore_characters)
+
+
+def test_sanitize_cache():
+    sanitize_cache.clear()
+    assert sanitize('The.Office') == 'the office'
+    assert sanitize('The.Office') == 'the office'
+    assert sanitize('The.Office', ignore_characters={'.'}) == 'the.office'
+    assert (sanitize_cache.hits, sanitize_cache.misses) == (1, 2)
+
+
+def test_sanitize_release_group_cache():
+    sanitize_release_group_cache.clear()
+    assert sanitize_release_group('lol[ettv] ') == 'LOL'
+    assert sanitize_release_group('lol[ettv] ') == 'LOL'
+    assert (sanitize_release_group_cache.hits, sanitize_release_group_cache.misses) == (1, 1)
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    assert cache.get('a', lambda: 1) == 1
+    assert cache.get('b', lambda: 2) == 2
+    assert cache.get('a', lambda: 3) == 1
+    assert cache.get('c', lambda: 4) == 4
+    assert len(cache) == 2
+    assert cache.get('b', lambda: 5) == 5
+    assert cache.get('a', lambda: 6) == 6
+    assert (cache.hits, cache.misses) == (1, 5)
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(ttl=0.1)
+    cache.set('a', 1)
+    assert cache.get('a', lambda: 2) == 1
+    time.sleep(0.2)
+    assert cache.get('a', lambda: 3) == 3
+    cache.delete('a')
+    assert cache.get('a', lambda: None, should_cache_fn=lambda v: v is not None) is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_iter_buffered():
+    assert list(iter_buffered(range(100), maxsize=3)) == list(range(100))
+
+
+def test_iter_buffered_error():
+    def items():
+        yield 1
+        raise ValueError('Oops')
+
+    buffered = iter_buffered(items())
+    assert next(buffered) == 1
+    with pytest.raises(ValueError) as excinfo:
+        next(buffered)
+    assert str(excinfo.value) == 'Oops'
+
+
+def test_iter_buffered_close():
+    consumed = []
+
+    def items():
+        try:
+            for i in range(100):
+                consumed.append(i)
+                yield i
+        finally:
+            consumed.append('closed')
+
+    buffered = iter_buffered(items(), maxsize=2)
+    assert next(buffered) == 0
+    buffered.close()
+    assert consumed[-1] == 'closed'
+    assert len(consumed) < 10
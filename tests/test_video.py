@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime, timedelta
+import pickle
 
 import pytest
 from six import text_type as str
@@ -171,3 +172,39 @@ def test_episode_fromname(episodes):
     assert video.title is None
     assert video.year is None
     assert video.tvdb_id is None
+
+
+@pytest.mark.parametrize('protocol', range(pickle.HIGHEST_PROTOCOL + 1))
+def test_video_pickle(episodes, movies, protocol):
+    for video in (episodes['bbt_s07e05'], movies['man_of_steel']):
+        video.mtime = 1000.0
+        loaded = pickle.loads(pickle.dumps(video, protocol))
+        assert type(loaded) is type(video)
+        assert loaded.__getstate__() == video.__getstate__()
+
+
+def test_video_setstate_dict():
+    video = Episode.__new__(Episode)
+    video.__setstate__({'name': 'bbt.mkv', 'series': 'The Big Bang Theory', 'season': 7, 'episode': 5,
+                        'format': ''.join(['HD', 'TV'])})
+    assert video.series == 'The Big Bang Theory'
+    assert video.format is Episode('other.mkv', 'Other', 1, 1, format='HDTV').format
+    assert video.mtime is None
+    assert video.release_group is None
+
+
+def test_video_slots(episodes, movies):
+    for video in (episodes['bbt_s07e05'], movies['man_of_steel']):
+        assert not hasattr(video, '__dict__')
+        with pytest.raises(AttributeError):
+            video.unknown = None
+
+
+def test_video_interned_strings():
+    video = Episode('bbt.mkv', ''.join(['The Big ', 'Bang Theory']), 7, 5, format=''.join(['HD', 'TV']),
+                    release_group=''.join(['DIMEN', 'SION']))
+    other = Episode('bbt2.mkv', ''.join(['The Big Bang ', 'Theory']), 7, 6, format=''.join(['H', 'DTV']),
+                    release_group=''.join(['DIM', 'ENSION']))
+    assert video.series is other.series
+    assert video.format is other.format
+    assert video.release_group is other.release_group